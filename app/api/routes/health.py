@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.services.cache_service import get_ai_cache, get_solver_cache
 
 router = APIRouter(tags=["health"])
 
@@ -7,4 +9,23 @@ async def health_check():
     """
     Health check endpoint to verify the service is running.
     """
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+@router.get("/health/cache")
+async def cache_stats():
+    """
+    Hit, miss and eviction counters of the schedule result caches.
+    """
+    return {
+        "solver": get_solver_cache().stats(),
+        "ai": get_ai_cache().stats()
+    }
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: phase durations, model size, solver status and gap,
+    cache lookups and Gemini latency.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
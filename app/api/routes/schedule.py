@@ -1,6 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.models.schedule import ScheduleRequest, ScheduleResponse
-from app.services.ai_service import AIService
+from typing import Optional
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from app.config import get_settings
+from app.models.schedule import (
+    EvaluateBatchRequest, EvaluateBatchResponse, EvaluateRequest, ScheduleEvaluation,
+    ScheduleRequest, ScheduleResponse
+)
+from app.models.solver import SolveOptions
+from app.services.ai_service import AIService, get_ai_service
+from app.services.evaluation_service import ScheduleEvaluator
+from app.services.job_service import JobManager, get_job_manager
+from app.services.hybrid_service import HybridService
+from app.services.race_service import RaceService
+from app.utils.metrics import observe_phase
+from app.utils.responses import ResponseFormat, error_detail, schedule_response
 from app.utils.validators import validate_schedule_data
 import structlog
 import traceback
@@ -9,17 +23,18 @@ logger = structlog.get_logger()
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
-@router.post("/generate", response_model=ScheduleResponse)
+@router.post("/generate", response_model=ScheduleResponse, response_model_exclude_none=True)
 async def generate_schedule(
     request: ScheduleRequest,
-    ai_service: AIService = Depends(lambda: AIService())
+    ai_service: AIService = Depends(get_ai_service)
 ) -> ScheduleResponse:
     """
     Generate a work schedule for a team based on worker preferences and restrictions.
     """
     try:
         # Validate request data
-        validate_schedule_data(request)
+        with observe_phase("ai", "validation"):
+            validate_schedule_data(request)
         
         # Generate schedule using AI service
         schedule = await ai_service.generate_schedule(request)
@@ -29,10 +44,83 @@ async def generate_schedule(
             
         return ScheduleResponse(**schedule)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(
             "Error in generate_schedule",
             error=str(e),
             traceback=traceback.format_exc()
         )
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@router.post("/race", response_model=ScheduleResponse, response_model_exclude_none=True)
+async def race_schedule(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    graceSeconds: Optional[float] = Query(None, ge=0, description="Extra time for the other engine after the first valid schedule"),
+    ai_service: AIService = Depends(get_ai_service),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> ScheduleResponse:
+    """
+    Run the AI model and the OR-Tools solver concurrently and return the first schedule
+    that satisfies the hard constraints, or the better one if both finish within the
+    grace window. `raceInfo` reports each engine's outcome.
+    """
+    validate_schedule_data(request)
+    race = RaceService(ai_service, job_manager, grace_seconds=get_settings().RACE_GRACE_SECONDS)
+    result = await race.race(request, options, graceSeconds)
+
+    if "error" in result:
+        raise HTTPException(status_code=400, detail={"message": result["error"], "engines": result["engines"]})
+
+    return ScheduleResponse(**result)
+
+@router.post("/hybrid", response_model=ScheduleResponse, response_model_exclude_none=True)
+async def hybrid_schedule(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    responseFormat: ResponseFormat = Query("full", description="'full' or 'columnar' (per-day worker indices and minute offsets)"),
+    ai_service: AIService = Depends(get_ai_service),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> ORJSONResponse:
+    """
+    Generate a schedule with the AI model and let the OR-Tools solver repair and improve
+    it, using the AI schedule as its starting point. The repair budget is `timeLimit`
+    (default `HYBRID_REPAIR_SECONDS`); `hybridInfo` reports the AI schedule's violations.
+    """
+    compiled = validate_schedule_data(request)
+    hybrid = HybridService(ai_service, job_manager, repair_seconds=get_settings().HYBRID_REPAIR_SECONDS)
+    result = await hybrid.generate(request, options)
+
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=error_detail(result))
+
+    return schedule_response(result, compiled, responseFormat)
+
+@router.post("/evaluate", response_model=ScheduleEvaluation)
+def evaluate_schedule(body: EvaluateRequest) -> ScheduleEvaluation:
+    """
+    Check a schedule against the solver's hard constraints (restrictions, mandatory
+    windows, daily and weekly hours, 1-hour minimum shifts) and score it with the
+    solver's objective.
+    """
+    compiled = validate_schedule_data(body.request)
+    evaluator = ScheduleEvaluator()
+    context = evaluator.context(compiled, body.slotMinutes)
+    schedule = {day: [shift.model_dump() for shift in shifts] for day, shifts in body.commonSchedule.items()}
+    return ScheduleEvaluation(**evaluator.evaluate_many(context, [schedule])[0])
+
+@router.post("/evaluate/batch", response_model=EvaluateBatchResponse)
+def evaluate_schedules(body: EvaluateBatchRequest) -> EvaluateBatchResponse:
+    """
+    Check and score many candidate schedules for the same request in one vectorized
+    pass, for batch audits.
+    """
+    compiled = validate_schedule_data(body.request)
+    started = time.perf_counter()
+    evaluator = ScheduleEvaluator()
+    context = evaluator.context(compiled, body.slotMinutes)
+    evaluations = evaluator.evaluate_many(context, body.schedules)
+    logger.info("Horarios evaluados", horarios=len(body.schedules), segundos=round(time.perf_counter() - started, 4))
+    return EvaluateBatchResponse(evaluations=evaluations, wallTime=round(time.perf_counter() - started, 4))
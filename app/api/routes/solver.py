@@ -1,36 +1,270 @@
-from fastapi import APIRouter, HTTPException, Depends
+import time
+from typing import Any, Dict, List
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from app.models.schedule import ScheduleRequest, ScheduleResponse
+from app.models.solver import ResolveRequest, SolveJobInfo, SolveOptions
+from app.services.job_service import JobManager, _run_compare, _run_resolve, get_job_manager, solve_cache_key
+from app.services.heuristic_service import HeuristicService
 from app.services.solver_service import SolverService
+from app.utils.metrics import observe_phase, record_solve
+from app.utils.responses import ResponseFormat, error_detail, schedule_response
 from app.utils.validators import validate_schedule_data
 
 router = APIRouter(prefix="/solver", tags=["solver"])
 
-@router.post("/optimize", response_model=ScheduleResponse)
+RESPONSE_FORMAT_DESCRIPTION = (
+    "'full' (commonSchedule with HH:MM:SS shifts) or 'columnar' (per-day worker indices "
+    "and minute offsets from the activity start)"
+)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    # orjson serializa los dicts de los servicios directamente; jsonable_encoder solo para tipos que no conoce
+    payload = orjson.dumps(data, default=jsonable_encoder, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return f"event: {event}\ndata: {payload}\n\n"
+
+@router.post("/optimize", response_model=ScheduleResponse, response_model_exclude_none=True)
 async def optimize_schedule(
     request: ScheduleRequest,
-    solver_service: SolverService = Depends(lambda: SolverService())
-) -> ScheduleResponse:
+    options: SolveOptions = Depends(),
+    responseFormat: ResponseFormat = Query("full", description=RESPONSE_FORMAT_DESCRIPTION),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> ORJSONResponse:
     """
     Optimiza el horario usando OR-Tools constraint programming solver.
-    
+
     Este endpoint utiliza programación con restricciones para generar un horario
     optimizado que:
     - Respeta las restricciones de cada trabajador
     - Maximiza el cumplimiento de las preferencias
     - Cumple con las horas mínimas y máximas diarias
     - Cumple con las horas semanales requeridas
+
+    El presupuesto se controla con `tier` (fast, balanced, thorough), `timeLimit` y
+    `relativeGap`; `solverInfo` indica qué criterio detuvo la búsqueda.
+
+    La resolución se ejecuta como un trabajo en el pool de procesos y se espera
+    sin bloquear el event loop. La respuesta se serializa una sola vez con orjson;
+    `responseFormat=columnar` la devuelve en columnas por día.
     """
     try:
         # Validate request data
-        validate_schedule_data(request)
-        
-        # Convert Pydantic model to dict and solve
-        result = solver_service.solve_schedule(request.model_dump())
-        
+        with observe_phase("solver", "validation"):
+            compiled = validate_schedule_data(request)
+
+        # La petición compilada (minutos y arrays) se resuelve en el pool de procesos
+        job = job_manager.submit(compiled, options, solve_cache_key(request, options))
+        result = await job_manager.wait(job)
+
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=error_detail(result))
+
+        return schedule_response(result, compiled, responseFormat)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/heuristic", response_model=ScheduleResponse, response_model_exclude_none=True)
+def heuristic_schedule(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    responseFormat: ResponseFormat = Query("full", description=RESPONSE_FORMAT_DESCRIPTION)
+) -> ORJSONResponse:
+    """
+    Genera un horario al instante con la heurística voraz (un turno por trabajador
+    y día), respetando las mismas reglas que el solver. No optimiza: sirve como
+    respuesta rápida o como punto de partida del solver (`greedyHint`).
+    """
+    compiled = validate_schedule_data(request)
+    result = HeuristicService().build_schedule(compiled, options.slotMinutes)
+
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+
+    return schedule_response(result, compiled, responseFormat)
+
+@router.post("/optimize/stream")
+async def optimize_schedule_stream(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> StreamingResponse:
+    """
+    Optimiza el horario y transmite cada solución mejorada como Server-Sent Events.
+
+    - `event: solution`: `commonSchedule`, `objective`, `bestBound`, `wallTime`, número de solución
+      y `source`; la primera es el horario de la heurística voraz (`source: heuristic`)
+    - `event: result`: resultado final (`commonSchedule`) o `error`
+
+    Si el cliente se desconecta, la búsqueda se detiene en la siguiente solución.
+    Con la cola del solver llena responde 429 con `Retry-After`.
+    """
+    compiled = validate_schedule_data(request)
+    job_manager.admission.check()
+
+    async def events():
+        async for event, payload in job_manager.stream(compiled, options, solve_cache_key(request, options)):
+            yield _sse(event, payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/resolve", response_model=ScheduleResponse, response_model_exclude_none=True)
+async def resolve_schedule(
+    request: ResolveRequest,
+    options: SolveOptions = Depends(),
+    responseFormat: ResponseFormat = Query("full", description=RESPONSE_FORMAT_DESCRIPTION),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> ORJSONResponse:
+    """
+    Re-optimiza un horario ya resuelto tras un conjunto de cambios (trabajadores
+    añadidos, eliminados o con restricciones/preferencias editadas).
+
+    El horario previo se usa como punto de partida del solver. Con `freezeUnchanged`
+    (por defecto) los trabajadores no afectados conservan sus turnos y solo se
+    resuelven los modificados.
+    """
+    try:
+        input_data, changed_ids = SolverService.apply_changes(
+            request.base.model_dump(), request.changes.model_dump()
+        )
+        compiled = validate_schedule_data(ScheduleRequest(**input_data))
+
+        previous_schedule = request.previous.model_dump()["commonSchedule"]
+        result = await job_manager.run(
+            _run_resolve, input_data, previous_schedule, changed_ids, request.freezeUnchanged, options=options
+        )
+        record_solve(result)
+
         if "error" in result:
-            raise HTTPException(status_code=400, detail=result["error"])
-            
-        return ScheduleResponse(**result)
-        
+            raise HTTPException(status_code=400, detail=error_detail(result))
+
+        return schedule_response(result, compiled, responseFormat)
+
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/optimize/batch")
+async def optimize_schedule_batch(
+    requests: List[ScheduleRequest],
+    options: SolveOptions = Depends(),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> StreamingResponse:
+    """
+    Optimiza los horarios de varios equipos en paralelo y transmite cada resultado
+    como Server-Sent Events a medida que termina.
+
+    - `event: team`: `index`, `idEquipo` y `result` (`commonSchedule`, `solverInfo`) o `error`
+    - `event: summary`: totales del lote, soluciones en paralelo e hilos por solución
+
+    El número de soluciones simultáneas se limita para que soluciones en paralelo ×
+    hilos de búsqueda no supere `SOLVER_CPU_BUDGET`.
+    """
+    parallel, threads = job_manager.batch_parallelism(options)
+
+    items = []
+    invalid: Dict[int, str] = {}
+    for index, request in enumerate(requests):
+        try:
+            compiled = validate_schedule_data(request)
+        except HTTPException as e:
+            invalid[index] = e.detail
+            continue
+        items.append((index, (compiled, solve_cache_key(request, options))))
+
+    async def events():
+        started = time.monotonic()
+        failed = 0
+        for index, detail in invalid.items():
+            failed += 1
+            yield _sse("team", {"index": index, "idEquipo": requests[index].equipo.idEquipo, "error": detail})
+
+        async for position, result in job_manager.batch([item for _, item in items], options):
+            index = items[position][0]
+            payload = {"index": index, "idEquipo": requests[index].equipo.idEquipo}
+            if "error" in result:
+                failed += 1
+                payload["error"] = result["error"]
+                if result.get("conflicts"):
+                    payload["conflicts"] = result["conflicts"]
+            else:
+                payload["result"] = result
+            yield _sse("team", payload)
+
+        yield _sse("summary", {
+            "teams": len(requests),
+            "completed": len(requests) - failed,
+            "failed": failed,
+            "parallelSolves": parallel,
+            "threadsPerSolve": threads,
+            "cpuBudget": job_manager.cpu_budget,
+            "elapsed": round(time.monotonic() - started, 3),
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/jobs", response_model=SolveJobInfo, status_code=202)
+async def create_solve_job(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    job_manager: JobManager = Depends(get_job_manager)
+) -> SolveJobInfo:
+    """
+    Encola la optimización del horario y devuelve inmediatamente el id del trabajo.
+    Si el mismo horario ya está en caché o en cálculo, se reutiliza.
+    """
+    compiled = validate_schedule_data(request)
+    job = job_manager.submit(compiled, options, solve_cache_key(request, options))
+    return SolveJobInfo(**job.to_dict())
+
+@router.get("/jobs/{job_id}", response_model=SolveJobInfo)
+async def get_solve_job(
+    job_id: str,
+    job_manager: JobManager = Depends(get_job_manager)
+) -> SolveJobInfo:
+    """
+    Devuelve el estado del trabajo y, si terminó, su horario o su error.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    return SolveJobInfo(**job.to_dict())
+
+@router.delete("/jobs/{job_id}", response_model=SolveJobInfo)
+async def cancel_solve_job(
+    job_id: str,
+    job_manager: JobManager = Depends(get_job_manager)
+) -> SolveJobInfo:
+    """
+    Cancela un trabajo pendiente o descarta el resultado de uno en ejecución.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    return SolveJobInfo(**job.to_dict())
+
+@router.post("/compare")
+async def compare_formulations(
+    request: ScheduleRequest,
+    options: SolveOptions = Depends(),
+    job_manager: JobManager = Depends(get_job_manager)
+):
+    """
+    Resuelve el mismo horario con cada formulación del modelo ("classic" y "compact")
+    y reporta tamaño del modelo, tiempos de construcción y resolución y objetivo.
+    """
+    compiled = validate_schedule_data(request)
+    return await job_manager.run(_run_compare, compiled, options=options)
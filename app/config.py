@@ -12,6 +12,22 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     MODEL_NAME: str = "gemini-2.5-pro-preview-06-05"
     DEBUG: bool = False
+    AI_BACKEND: str = "gemini"  # "local": heuristic stand-in for Gemini, no API key needed
+    LOCAL_MODEL_LATENCY_SECONDS: float = 0.0
+    AI_TIMEOUT_SECONDS: float = 120.0
+    AI_MAX_CONCURRENCY: int = 4
+    AI_PROMPT_FORMAT: str = "compact"  # "json": the request as indented JSON
+    AI_PROMPT_TOKEN_BUDGET: int = 30000
+    AI_CHUNK_WORKERS: int = 25
+    AI_CHUNK_RETRIES: int = 1
+    SOLVER_POOL_SIZE: int = max(1, (os.cpu_count() or 1) // 4)
+    SOLVER_JOB_TTL_SECONDS: int = 3600
+    SOLVER_CPU_BUDGET: int = os.cpu_count() or 1
+    SOLVER_QUEUE_SIZE: int = 8
+    CACHE_MAX_ENTRIES: int = 256
+    CACHE_TTL_SECONDS: int = 3600
+    RACE_GRACE_SECONDS: float = 2.0
+    HYBRID_REPAIR_SECONDS: float = 10.0
 
     class Config:
         env_file = ".env"
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import health, schedule, solver
 from app.config import get_settings
+from app.services.job_service import get_job_manager
 import structlog
 
 # Configure structured logging
@@ -39,6 +40,7 @@ def create_application() -> FastAPI:
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("Application shutting down")
+        get_job_manager().shutdown()
 
     return app
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 class TimeSlot(BaseModel):
     horaInicio: str = Field(..., description="Start time in HH:MM:SS format")
@@ -105,8 +105,85 @@ class WorkerShift(BaseModel):
     startTime: str = Field(..., description="Shift start time in HH:MM:SS format")
     endTime: str = Field(..., description="Shift end time in HH:MM:SS format")
 
+class SolverInfo(BaseModel):
+    status: str = Field(..., description="CP-SAT status name")
+    stopReason: str = Field(..., description="Stop criterion that ended the search: optimal, relative_gap, time_limit, stopped, infeasible or capacity_check")
+    tier: str = Field(..., description="Budget tier used for the solve")
+    timeLimit: float = Field(..., description="Time limit in seconds")
+    relativeGapLimit: float = Field(..., description="Relative gap limit")
+    numWorkers: int = Field(..., description="Search worker threads")
+    objective: Optional[float] = Field(None, description="Objective value of the returned schedule")
+    bestBound: Optional[float] = Field(None, description="Best proven objective bound")
+    relativeGap: Optional[float] = Field(None, description="Relative gap between objective and bound")
+    wallTime: float = Field(..., description="Solver wall time in seconds")
+    variables: Optional[int] = Field(None, description="CP-SAT model variables")
+    constraints: Optional[int] = Field(None, description="CP-SAT model constraints")
+    phaseSeconds: Optional[Dict[str, float]] = Field(None, description="Duration of the build, solve and extract phases in seconds")
+    resolutionLevels: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Per-level slotMinutes, status, objective and wall time of a multi-resolution solve"
+    )
+    resolvedWorkers: Optional[int] = Field(None, description="Workers re-solved by an incremental re-solve")
+    frozenWorkers: Optional[int] = Field(None, description="Workers whose previous shifts were kept by an incremental re-solve")
+    modelledWorkers: Optional[int] = Field(None, description="Workers in the CP-SAT model when identical workers were merged")
+    lnsIterations: Optional[List[Dict[str, Any]]] = Field(
+        None, description="Per-neighbourhood kind, size, day, status, improvement, team objective and seconds of a large-neighbourhood search"
+    )
+
+class HeuristicInfo(BaseModel):
+    objective: float = Field(..., description="Objective value under the solver's objective function")
+    wallTime: float = Field(..., description="Heuristic run time in seconds")
+    slotMinutes: int = Field(..., description="Slot granularity in minutes")
+
+class EngineOutcome(BaseModel):
+    engine: str = Field(..., description="Engine name: ai or solver")
+    status: str = Field(..., description="valid, invalid, error or cancelled")
+    seconds: Optional[float] = Field(None, description="Seconds from the start of the race until the engine finished")
+    objective: Optional[float] = Field(None, description="Objective value under the solver's objective function")
+    violations: List[str] = Field(default_factory=list, description="Hard constraint violations")
+    error: Optional[str] = Field(None, description="Engine error")
+
+class RaceInfo(BaseModel):
+    winner: str = Field(..., description="Engine whose schedule was returned")
+    graceSeconds: float = Field(..., description="Grace window granted to the other engine after the first valid result")
+    engines: List[EngineOutcome] = Field(..., description="Outcome of each engine")
+
+class HybridInfo(BaseModel):
+    aiSeconds: float = Field(..., description="AI generation time in seconds")
+    aiObjective: Optional[float] = Field(None, description="Objective of the AI schedule under the solver's objective function")
+    aiViolations: List[str] = Field(default_factory=list, description="Hard constraint violations in the AI schedule")
+    aiError: Optional[str] = Field(None, description="AI error; the solver then runs without the AI warm start")
+    repairSeconds: float = Field(..., description="Solver repair time in seconds")
+
 class ScheduleResponse(BaseModel):
     commonSchedule: Dict[str, List[WorkerShift]] = Field(
         ..., 
         description="Schedule organized by day, with list of worker shifts"
-    ) 
\ No newline at end of file
+    )
+    solverInfo: Optional[SolverInfo] = Field(None, description="Solver statistics, only for solver-generated schedules")
+    heuristicInfo: Optional[HeuristicInfo] = Field(None, description="Greedy heuristic statistics, only for heuristic schedules")
+    raceInfo: Optional[RaceInfo] = Field(None, description="Per-engine outcome, only for hedged AI/solver races")
+    hybridInfo: Optional[HybridInfo] = Field(None, description="AI warm start statistics, only for hybrid schedules") 
+
+class EvaluateRequest(BaseModel):
+    request: ScheduleRequest = Field(..., description="Team and workers the schedule was built for")
+    commonSchedule: Dict[str, List[WorkerShift]] = Field(..., description="Schedule to check, organized by day")
+    slotMinutes: Literal[15, 30, 60] = Field(15, description="Slot grid the shift times must fall on")
+
+class EvaluateBatchRequest(BaseModel):
+    request: ScheduleRequest = Field(..., description="Team and workers the schedules were built for")
+    schedules: List[Dict[str, List[Dict[str, str]]]] = Field(
+        ..., description="Candidate schedules, organized by day, with workerId/startTime/endTime shifts"
+    )
+    slotMinutes: Literal[15, 30, 60] = Field(15, description="Slot grid the shift times must fall on")
+
+class ScheduleEvaluation(BaseModel):
+    valid: bool = Field(..., description="Whether the schedule satisfies every hard constraint")
+    violations: List[str] = Field(default_factory=list, description="Hard constraint violations")
+    objective: float = Field(..., description="Objective value under the solver's objective function")
+    preferredSlots: int = Field(..., description="Worked slots inside worker preferences")
+    deviationMinutes: int = Field(..., description="Minutes below the weekly hour targets")
+    extraShifts: int = Field(..., description="Shifts beyond the first per worker and day")
+
+class EvaluateBatchResponse(BaseModel):
+    evaluations: List[ScheduleEvaluation] = Field(..., description="One evaluation per schedule, in request order")
+    wallTime: float = Field(..., description="Evaluation time in seconds")
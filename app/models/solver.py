@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, List, Literal, Optional
+from app.models.schedule import ScheduleRequest, ScheduleResponse, WorkerSchedule
 
 class TimeInterval(BaseModel):
     horaInicio: str
@@ -13,4 +14,78 @@ class WorkerScheduleResult(BaseModel):
 class SolverResponse(BaseModel):
     equipo: Dict
     scheduleTrabajadores: List[WorkerScheduleResult]
-    error: Optional[str] = None 
\ No newline at end of file
+    error: Optional[str] = None 
+
+class ScheduleConflict(BaseModel):
+    rule: str = Field(
+        ...,
+        description="Rule in conflict: mandatoryDay, restriction, dailyMinimum, dailyMaximum, weeklyMinimum, weeklyMaximum or minimumShift"
+    )
+    workerId: str = Field(..., description="Worker the rule applies to")
+    day: Optional[str] = Field(None, description="Day of a per-day rule")
+    requiredMinutes: Optional[int] = Field(None, description="Minutes the rule requires (capacity pre-check)")
+    availableMinutes: Optional[int] = Field(None, description="Minutes the worker's availability allows (capacity pre-check)")
+
+class SolveJobInfo(BaseModel):
+    jobId: str
+    status: str
+    result: Optional[ScheduleResponse] = None
+    error: Optional[str] = None
+    conflicts: Optional[List[ScheduleConflict]] = None
+
+
+class SolveOptions(BaseModel):
+    formulation: Literal["classic", "compact"] = Field(
+        "classic",
+        description="Shift model encoding: 'classic' per-slot start/end reification or 'compact' (same rules, smaller model)"
+    )
+    slotMinutes: int = Field(15, description="Slot granularity in minutes: 15, 30 or 60")
+    multiResolution: bool = Field(
+        False,
+        description="Solve at 60, then 30, then slotMinutes granularity, each level warm-started from and restricted around the previous one"
+    )
+    greedyHint: bool = Field(False, description="Warm-start CP-SAT with the greedy heuristic schedule")
+    mergeIdenticalWorkers: bool = Field(
+        True,
+        description="Model one representative per group of workers with identical hours, windows and preferences and give its shifts to the whole group"
+    )
+    lns: Optional[bool] = Field(
+        None,
+        description="Solve by large-neighbourhood search over worker subsets and days; by default used from 300 workers"
+    )
+    tier: Literal["fast", "balanced", "thorough"] = Field(
+        "balanced",
+        description="Solve budget preset: 'fast' for interactive previews, 'thorough' for production rosters"
+    )
+    timeLimit: Optional[float] = Field(None, gt=0, description="Deadline in seconds, overrides the tier's time limit")
+    relativeGap: Optional[float] = Field(
+        None, ge=0, lt=1,
+        description="Stop once the relative gap between objective and bound is below this value"
+    )
+
+    @field_validator("slotMinutes")
+    @classmethod
+    def _check_slot_minutes(cls, value: int) -> int:
+        # Literal[15, 30, 60] no acepta los valores de query string ("30")
+        if value not in (15, 30, 60):
+            raise ValueError("slotMinutes must be 15, 30 or 60")
+        return value
+
+
+class ScheduleChanges(BaseModel):
+    addedWorkers: List[WorkerSchedule] = Field(default_factory=list, description="Workers to add to the team")
+    removedWorkerIds: List[str] = Field(default_factory=list, description="IDs of workers to remove")
+    updatedWorkers: List[WorkerSchedule] = Field(
+        default_factory=list,
+        description="Workers whose restrictions, preferences or general schedule changed (replaced by ID)"
+    )
+
+
+class ResolveRequest(BaseModel):
+    base: ScheduleRequest = Field(..., description="Request the previous schedule was solved for")
+    previous: ScheduleResponse = Field(..., description="Previously returned schedule, used as the warm start")
+    changes: ScheduleChanges = Field(..., description="Edits to apply to the base request")
+    freezeUnchanged: bool = Field(
+        True,
+        description="Keep the previous shifts of workers the changes do not touch and only re-solve the rest"
+    )
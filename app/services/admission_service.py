@@ -0,0 +1,157 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Optional, Set
+import structlog
+from fastapi import HTTPException
+from app.utils.metrics import SOLVER_ADMISSIONS, SOLVER_QUEUE_DEPTH, SOLVER_QUEUE_WAIT, SOLVER_RUNNING
+
+logger = structlog.get_logger()
+
+
+class AdmissionRejected(HTTPException):
+    """
+    Raised when the solver queue is full; answered as 429 with a Retry-After header.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=429,
+            detail="La cola del solver está llena, reintente más tarde.",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.retry_after = retry_after
+
+
+class Admission:
+    """
+    A place in the solver queue holding `threads` search threads once admitted, for
+    a solve expected to take at most `seconds`.
+    """
+
+    def __init__(self, controller: "AdmissionController", threads: int, seconds: float):
+        self.controller = controller
+        self.threads = threads
+        self.seconds = seconds
+        self.queued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.released = False
+        self._turn: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def admitted(self) -> bool:
+        return self.started_at is not None
+
+    async def wait(self) -> None:
+        """
+        Waits until this admission's turn; cancelling the wait gives up the place.
+        """
+        try:
+            await asyncio.shield(self._turn)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """
+    Admits solver work in arrival order so that at most `max_running` solves and
+    `cpu_budget` search threads are busy at once; each solve holds its tier's search
+    threads. At most `max_queue` solves wait (unbounded when None); past that,
+    requests are rejected with AdmissionRejected instead of slowing every solve down.
+    """
+
+    def __init__(self, cpu_budget: int, max_running: int, max_queue: Optional[int] = None):
+        self.cpu_budget = cpu_budget
+        self.max_running = max_running
+        self.max_queue = max_queue
+        self._waiting: Deque[Admission] = deque()
+        self._active: Set[Admission] = set()
+        self._threads = 0
+        # Media móvil de la fracción del límite de tiempo que usa cada solución (muchas
+        # terminan antes al probar el óptimo), para estimar Retry-After
+        self._time_share = 1.0
+
+    @property
+    def running(self) -> int:
+        return len(self._active)
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a queue place is likely to free up: the time left, within its
+        time limit, of the running solve that should finish first, scaled by the
+        share of the limit solves have been using.
+        """
+        now = time.monotonic()
+        remaining = min((admission.seconds - (now - admission.started_at) for admission in self._active),
+                        default=0.0)
+        return max(1, math.ceil(max(remaining, 0.0) * self._time_share))
+
+    def check(self) -> None:
+        """
+        Raises AdmissionRejected if the queue is full, without taking a place.
+        """
+        if self.max_queue is not None and len(self._waiting) >= self.max_queue:
+            SOLVER_ADMISSIONS.labels("rejected").inc()
+            retry_after = self.retry_after()
+            logger.warning("Cola del solver llena, petición rechazada",
+                           en_cola=len(self._waiting),
+                           en_ejecucion=len(self._active),
+                           reintentar_en=retry_after)
+            raise AdmissionRejected(retry_after)
+
+    def reserve(self, threads: int, seconds: float) -> Admission:
+        """
+        Takes a place for a solve with `threads` search threads and a `seconds` time
+        limit: admitted at once if capacity allows and nobody is waiting, queued
+        otherwise. Raises AdmissionRejected if the queue is full.
+        """
+        admission = Admission(self, max(1, min(threads, self.cpu_budget)), seconds)
+        if not self._waiting and self._fits(admission):
+            SOLVER_ADMISSIONS.labels("immediate").inc()
+            self._admit(admission)
+        else:
+            self.check()
+            SOLVER_ADMISSIONS.labels("queued").inc()
+            self._waiting.append(admission)
+            logger.info("Resolución en cola", en_cola=len(self._waiting), en_ejecucion=len(self._active))
+        self._update_gauges()
+        return admission
+
+    def _fits(self, admission: Admission) -> bool:
+        return len(self._active) < self.max_running and self._threads + admission.threads <= self.cpu_budget
+
+    def _admit(self, admission: Admission) -> None:
+        self._active.add(admission)
+        self._threads += admission.threads
+        admission.started_at = time.monotonic()
+        SOLVER_QUEUE_WAIT.observe(admission.started_at - admission.queued_at)
+        admission._turn.set_result(None)
+
+    def _release(self, admission: Admission) -> None:
+        if admission.released:
+            return
+        admission.released = True
+        if admission.admitted:
+            self._active.discard(admission)
+            self._threads -= admission.threads
+            share = (time.monotonic() - admission.started_at) / max(admission.seconds, 1e-3)
+            self._time_share = 0.8 * self._time_share + 0.2 * min(share, 1.0)
+        elif admission in self._waiting:
+            self._waiting.remove(admission)
+        # El primero de la cola entra en cuanto cabe; nadie lo adelanta
+        while self._waiting and self._fits(self._waiting[0]):
+            self._admit(self._waiting.popleft())
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        SOLVER_QUEUE_DEPTH.set(len(self._waiting))
+        SOLVER_RUNNING.set(len(self._active))
@@ -1,26 +1,26 @@
 import google.generativeai as genai
+import asyncio
 import json
-from typing import Dict, Any
+import time
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 import structlog
 import traceback
 from app.config import get_settings
 from app.models.schedule import ScheduleRequest
+from app.services.cache_service import get_ai_cache
+from app.services.local_model import LocalScheduleModel
+from app.utils.fingerprint import schedule_request_fingerprint
+from app.utils.metrics import AI_CHUNKS, AI_PROMPT_TOKENS, GEMINI_SECONDS, observe_phase
+from app.utils.prompt_encoding import (COMPACT_LEGEND, PROMPT_DATA_MARKER, can_encode, encode_request,
+                                       estimate_tokens)
 from fastapi import HTTPException
 
 logger = structlog.get_logger()
 
-class AIService:
-    def __init__(self):
-        settings = get_settings()
-        if not settings.GOOGLE_API_KEY:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(settings.MODEL_NAME)
-
-    def _create_prompt(self, request: ScheduleRequest) -> str:
-        system_prompt = """You are an expert assistant in generating work schedules for teams. You must respond ONLY with a JSON object containing the schedule, no explanations or additional text."""
-        
-        task_instructions = """
+SYSTEM_PROMPT = """You are an expert assistant in generating work schedules for teams. You must respond ONLY with a JSON object containing the schedule, no explanations or additional text."""
+
+TASK_INSTRUCTIONS = """
 Given the team and worker data below, generate an optimized weekly schedule that:
 
 1. Respects each worker's restrictions (never assign work during restricted hours)
@@ -39,7 +39,7 @@ Remember:
 - Only include days that have assigned shifts
 - Ensure shifts don't overlap for the same worker"""
 
-        output_format = """
+OUTPUT_FORMAT = """
 The response must be EXACTLY in this format (only the JSON, no other text):
 {
   "commonSchedule": {
@@ -68,46 +68,175 @@ IMPORTANT RULES FOR THE OUTPUT:
 5. Only include days that have shifts assigned
 6. Each day MUST have a non-empty array of shifts
 7. DO NOT include any additional fields or properties"""
-        
+
+COMPACT_OUTPUT_FORMAT = """
+Respond with ONLY this JSON, no other text:
+{"commonSchedule":{"Lunes":[{"workerId":"T001","startTime":"09:00:00","endTime":"13:00:00"}]}}
+Days in Spanish ("Lunes" ... "Domingo"), times in "HH:MM:SS", only days with shifts, no other fields."""
+
+
+@lru_cache()
+def _prompt_prefix(prompt_format: str) -> str:
+    """
+    Static part of the prompt, built once per format. It always comes first so
+    repeated requests share the same prefix.
+    """
+    if prompt_format == "compact":
+        return f"{SYSTEM_PROMPT}\n\n{TASK_INSTRUCTIONS}\n\nRequired Output Format:\n{COMPACT_OUTPUT_FORMAT}\n\n{COMPACT_LEGEND}"
+    return f"{SYSTEM_PROMPT}\n\n{TASK_INSTRUCTIONS}\n\nRequired Output Format:\n{OUTPUT_FORMAT}"
+
+
+class AIService:
+    def __init__(self):
+        settings = get_settings()
+        if settings.AI_BACKEND == "local":
+            self.model = LocalScheduleModel(settings.LOCAL_MODEL_LATENCY_SECONDS)
+        else:
+            if not settings.GOOGLE_API_KEY:
+                raise ValueError("GOOGLE_API_KEY not found in environment variables")
+            genai.configure(api_key=settings.GOOGLE_API_KEY)
+            self.model = genai.GenerativeModel(settings.MODEL_NAME)
+        self.timeout = settings.AI_TIMEOUT_SECONDS
+        # Limita las llamadas simultáneas al modelo; el resto espera su turno sin bloquear el event loop
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
+        self.prompt_format = settings.AI_PROMPT_FORMAT
+        self.token_budget = settings.AI_PROMPT_TOKEN_BUDGET
+        self.chunk_workers = settings.AI_CHUNK_WORKERS
+        self.chunk_retries = settings.AI_CHUNK_RETRIES
+
+    def _create_prompt(self, request: ScheduleRequest) -> Tuple[str, str]:
+        """
+        Returns the prompt for `request` and the format it was encoded in, which is
+        JSON when the configured compact format cannot hold the worker IDs.
+        """
         try:
-            input_data = json.dumps(request.model_dump(), ensure_ascii=False, indent=2)
-            prompt = f"{system_prompt}\n\n{task_instructions}\n\nRequired Output Format:\n{output_format}\n\nInput Data:\n{input_data}"
+            input_data = request.model_dump()
+            prompt_format = self.prompt_format
+            if prompt_format == "compact" and not can_encode(input_data):
+                # IDs con '|', ',' o saltos de línea no caben en la codificación compacta
+                logger.warning("Worker IDs cannot be encoded compactly, using JSON prompt")
+                prompt_format = "json"
+            if prompt_format == "compact":
+                encoded = encode_request(input_data)
+            else:
+                encoded = json.dumps(input_data, ensure_ascii=False, indent=2)
+            prompt = f"{_prompt_prefix(prompt_format)}\n\n{PROMPT_DATA_MARKER}{encoded}"
             
             # Log the complete prompt
             logger.info(
                 "Generated prompt for AI model",
-                system_prompt=system_prompt,
-                task_instructions=task_instructions,
-                output_format=output_format,
-                input_data=input_data
+                prompt_format=prompt_format,
+                input_data=encoded
             )
             
-            return prompt
+            return prompt, prompt_format
             
         except Exception as e:
             logger.error("Error creating prompt", error=str(e), traceback=traceback.format_exc())
             raise
 
     async def generate_schedule(self, request: ScheduleRequest) -> Dict[str, Any]:
+        # Identical requests are answered from the cache or share the in-flight model call
+        key = schedule_request_fingerprint(request, namespace=self.model.model_name)
+        return await get_ai_cache().get_or_compute(key, lambda: self._generate_schedule(request))
+
+    def _split(self, request: ScheduleRequest) -> List[ScheduleRequest]:
+        """
+        Splits the roster into groups of at most `chunk_workers` workers, each with
+        the full team data. The model schedules every worker independently.
+        """
+        workers = request.scheduleTrabajadores
+        if len(workers) <= self.chunk_workers:
+            return [request]
+        return [
+            ScheduleRequest(equipo=request.equipo, scheduleTrabajadores=workers[i:i + self.chunk_workers])
+            for i in range(0, len(workers), self.chunk_workers)
+        ]
+
+    @staticmethod
+    def _merge(chunks: List[ScheduleRequest], results: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        merged: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk, result in zip(chunks, results):
+            # Solo se aceptan turnos de los trabajadores de cada grupo
+            ids = {t.id for t in chunk.scheduleTrabajadores}
+            for day, shifts in result["commonSchedule"].items():
+                kept = [shift for shift in shifts if isinstance(shift, dict) and shift.get("workerId") in ids]
+                if len(kept) < len(shifts):
+                    logger.warning("Discarding shifts for workers outside the chunk", day=day,
+                                   discarded=len(shifts) - len(kept))
+                if kept:
+                    merged.setdefault(day, []).extend(kept)
+        return merged
+
+    async def _generate_chunk(self, index: int, prompt: str) -> Dict[str, Any]:
+        # Solo se reintenta el grupo que falla; los demás conservan su resultado
+        for attempt in range(1, self.chunk_retries + 2):
+            result = await self._call_model(prompt)
+            if "error" not in result:
+                AI_CHUNKS.labels("ok" if attempt == 1 else "retried").inc()
+                return result
+            logger.warning("AI chunk failed", chunk=index, attempt=attempt, error=result["error"])
+        AI_CHUNKS.labels("failed").inc()
+        return result
+
+    async def _generate_schedule(self, request: ScheduleRequest) -> Dict[str, Any]:
         try:
-            prompt = self._create_prompt(request)
-            
-            # Log the exact prompt being sent
-            print("\n=== PROMPT ENVIADO AL MODELO ===")
-            print(prompt)
-            print("\n=== FIN DEL PROMPT ===\n")
-            
-            response = self.model.generate_content(prompt)
+            chunks = self._split(request)
+            with observe_phase("ai", "prompt"):
+                prompts, formats = zip(*(self._create_prompt(chunk) for chunk in chunks))
+                tokens = [estimate_tokens(prompt) for prompt in prompts]
+            for prompt_format, chunk_tokens in zip(formats, tokens):
+                AI_PROMPT_TOKENS.labels(prompt_format).observe(chunk_tokens)
+            logger.info("Prompt tokens estimated", tokens=tokens, budget=self.token_budget)
+            if max(tokens) > self.token_budget:
+                logger.error("Prompt exceeds token budget", tokens=max(tokens), budget=self.token_budget)
+                return {"error": f"El prompt estimado ({max(tokens)} tokens) supera el presupuesto de "
+                                 f"{self.token_budget} tokens"}
+
+            if len(chunks) > 1:
+                logger.info("Generating schedule in chunks", chunks=len(chunks),
+                            workers=len(request.scheduleTrabajadores))
+            # Los grupos se lanzan a la vez; el semáforo limita las llamadas simultáneas al modelo
+            results = await asyncio.gather(*(self._generate_chunk(i, prompt) for i, prompt in enumerate(prompts)))
+            failed = [i for i, result in enumerate(results) if "error" in result]
+            if failed:
+                if len(chunks) == 1:
+                    return results[0]
+                return {"error": f"No se pudo generar el horario de {len(failed)} de {len(chunks)} grupos "
+                                 f"de trabajadores: {results[failed[0]]['error']}"}
+            return {"commonSchedule": self._merge(chunks, results)}
+
+        except Exception as e:
+            logger.error(
+                "Error generating schedule",
+                error=str(e),
+                traceback=traceback.format_exc()
+            )
+            return {"error": f"Error al generar el horario: {str(e)}"}
+
+    async def _call_model(self, prompt: str) -> Dict[str, Any]:
+        try:
+            logger.debug("Prompt sent to AI model", prompt=prompt)
+
+            async with self._semaphore:
+                started = time.perf_counter()
+                try:
+                    with observe_phase("ai", "model"):
+                        response = await asyncio.wait_for(self.model.generate_content_async(prompt), timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    GEMINI_SECONDS.labels("timeout").observe(time.perf_counter() - started)
+                    logger.error("AI model call timed out", timeout=self.timeout)
+                    return {"error": f"El modelo no respondió en {self.timeout:g} segundos"}
+                except Exception:
+                    GEMINI_SECONDS.labels("error").observe(time.perf_counter() - started)
+                    raise
+                GEMINI_SECONDS.labels("ok").observe(time.perf_counter() - started)
+                logger.info("Gemini response time", seconds=round(time.perf_counter() - started, 3))
             
             if not response.text:
                 logger.error("Empty response from AI model")
                 return {"error": "No se pudo generar el horario: respuesta vacía del modelo"}
             
-            # Log the AI response
-            print("\n=== RESPUESTA DEL MODELO ===")
-            print(response.text)
-            print("\n=== FIN DE LA RESPUESTA ===\n")
-            
             try:
                 logger.info("AI response received", response_text=response.text)
                 # Clean the response text by removing markdown code block markers
@@ -152,4 +281,13 @@ IMPORTANT RULES FOR THE OUTPUT:
                 error=str(e),
                 traceback=traceback.format_exc()
             )
-            return {"error": f"Error al generar el horario: {str(e)}"} 
\ No newline at end of file
+            return {"error": f"Error al generar el horario: {str(e)}"} 
+
+
+@lru_cache()
+def get_ai_service() -> AIService:
+    """
+    Application-lifetime AIService: the Gemini client and its connections are
+    created once and shared by every request.
+    """
+    return AIService()
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import structlog
+from app.config import get_settings
+from app.utils.metrics import CACHE_REQUESTS
+
+logger = structlog.get_logger()
+
+
+class ResultCache:
+    """
+    Bounded in-memory LRU cache with per-entry TTL for schedule results.
+
+    Error results are never stored. Concurrent `get_or_compute` calls for the same
+    key share a single in-flight computation.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Los trabajos del pool de procesos completan desde otro hilo
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.deduplicated = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                CACHE_REQUESTS.labels(self.name, "miss").inc()
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                CACHE_REQUESTS.labels(self.name, "miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if "error" in value:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.deduplicated += 1
+            CACHE_REQUESTS.labels(self.name, "deduplicated").inc()
+            logger.info("Reutilizando cálculo en curso", cache=self.name)
+
+        # shield: si un cliente se desconecta, el cálculo compartido sigue para los demás
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        result = await factory()
+        self.set(key, result)
+        return result
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Marca la excepción como recuperada aunque nadie esté esperando
+            task.exception()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "deduplicated": self.deduplicated,
+                "inFlight": len(self._inflight),
+            }
+
+
+@lru_cache()
+def get_solver_cache() -> ResultCache:
+    settings = get_settings()
+    return ResultCache("solver", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+
+
+@lru_cache()
+def get_ai_cache() -> ResultCache:
+    settings = get_settings()
+    return ResultCache("ai", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
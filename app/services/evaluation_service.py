@@ -0,0 +1,216 @@
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+import numpy as np
+from app.services.solver_service import SolverService
+from app.utils.availability import NUM_DAYS, SlotMasks
+from app.utils.compiled_request import RequestData, compile_request, parse_time
+
+
+@lru_cache(maxsize=4096)
+def _minutes(t_str: str) -> int:
+    # Los horarios candidatos repiten pocas horas distintas: se parsean una sola vez
+    return parse_time(t_str)
+
+
+class EvaluationContext(NamedTuple):
+    """
+    Everything derived from the request once and shared by every evaluated schedule.
+    """
+    worker_ids: List[str]
+    worker_idx: Dict[str, int]
+    active_days: Set[int]
+    hora_inicio_act: int
+    slot_minutes: int
+    num_slots: int
+    masks: SlotMasks
+    preferred: np.ndarray
+    min_daily: int
+    max_daily: int
+    targets: np.ndarray
+    floors: np.ndarray
+    mandatory_day: np.ndarray
+    mandatory_required: np.ndarray
+
+
+class ScheduleEvaluator:
+    """
+    Checks a commonSchedule against the solver's hard constraints and scores it with
+    the solver's objective, whichever engine produced it.
+
+    Candidates are mapped onto a (schedules, workers, 7, slots) boolean array and
+    every check is a vectorized operation over it, so a batch of schedules for the
+    same request is scored at once.
+    """
+
+    MAX_CHUNK_CELLS = 4_000_000
+
+    def __init__(self, solver: Optional[SolverService] = None):
+        self.solver = solver or SolverService()
+
+    def context(self, input_data: RequestData, slot_minutes: int = 15) -> EvaluationContext:
+        request = compile_request(input_data)
+        num_slots = request.num_slots(slot_minutes)
+        masks = self.solver.build_slot_masks(request, num_slots, slot_minutes)
+        # Como el modelo, no se exige nada en días obligatorios cuya ventana no contiene un slot entero
+        mandatory_day = masks.mandatory_day & masks.mandatory.any(axis=2)
+        return EvaluationContext(
+            worker_ids=request.worker_ids,
+            worker_idx={worker_id: t_idx for t_idx, worker_id in enumerate(request.worker_ids)},
+            active_days=set(request.active_days),
+            hora_inicio_act=request.start_minute,
+            slot_minutes=slot_minutes,
+            num_slots=num_slots,
+            masks=masks,
+            preferred=masks.preferred & masks.available,
+            min_daily=request.min_daily_minutes,
+            max_daily=request.max_daily_minutes,
+            targets=request.weekly_minutes,
+            floors=np.array([int(target * 0.7) for target in request.weekly_minutes], dtype=np.int64),
+            mandatory_day=mandatory_day,
+            mandatory_required=np.where(mandatory_day, np.minimum(request.min_daily_minutes, masks.mandatory_length), 0),
+        )
+
+    def _collect_shifts(self, ctx: EvaluationContext, common_schedule: Dict[str, List[Dict[str, Any]]],
+                        row: int, starts: List[int], ends: List[int]) -> List[str]:
+        """
+        Appends the flat (worker, day) row offsets of each shift's first and past-the-end
+        slot to `starts` and `ends`, and returns the problems found while reading the
+        shifts: unknown days or workers, bad or off-grid times.
+        """
+        day_to_idx = {d: i for i, d in enumerate(self.solver.DAYS)}
+        slot_minutes = ctx.slot_minutes
+        width = ctx.num_slots + 1
+        violations: List[str] = []
+        for dia_str, shifts in common_schedule.items():
+            if not shifts:
+                continue
+            d_idx = day_to_idx.get(dia_str)
+            if d_idx is None or d_idx not in ctx.active_days:
+                violations.append(f"{dia_str}: not an active day")
+                continue
+            for shift in shifts:
+                t_idx = ctx.worker_idx.get(shift.get("workerId"))
+                if t_idx is None:
+                    violations.append(f"{dia_str}: unknown worker {shift.get('workerId')}")
+                    continue
+                try:
+                    start = _minutes(shift["startTime"]) - ctx.hora_inicio_act
+                    end = _minutes(shift["endTime"]) - ctx.hora_inicio_act
+                except (KeyError, ValueError):
+                    violations.append(f"{dia_str}: invalid shift times for worker {shift.get('workerId')}")
+                    continue
+                if start >= end or start < 0 or end > ctx.num_slots * slot_minutes:
+                    violations.append(f"{dia_str} {shift['workerId']} {shift['startTime']}-{shift['endTime']}: "
+                                      f"outside the team's activity hours")
+                    continue
+                if start % slot_minutes or end % slot_minutes:
+                    violations.append(f"{dia_str} {shift['workerId']} {shift['startTime']}-{shift['endTime']}: "
+                                      f"not aligned to {slot_minutes}-minute slots")
+                    continue
+                base = ((row + t_idx) * NUM_DAYS + d_idx) * width
+                starts.append(base + start // slot_minutes)
+                ends.append(base + end // slot_minutes)
+        return violations
+
+    def evaluate(self, input_data: RequestData, common_schedule: Dict[str, List[Dict[str, Any]]],
+                 slot_minutes: int = 15) -> Dict[str, Any]:
+        """
+        Returns {"valid", "violations", "objective", ...} for one schedule. Shift times
+        must fall on the slot grid; shifts that do not are reported and left out of
+        the objective.
+        """
+        return self.evaluate_many(self.context(input_data, slot_minutes), [common_schedule])[0]
+
+    def evaluate_many(self, ctx: EvaluationContext,
+                      schedules: List[Dict[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """
+        Evaluates every schedule against one prepared context, in input order.
+        """
+        # Lotes acotados para que el array (horarios, trabajadores, 7, slots) no crezca sin límite
+        chunk = max(1, self.MAX_CHUNK_CELLS // max(1, len(ctx.worker_ids) * NUM_DAYS * ctx.num_slots))
+        results: List[Dict[str, Any]] = []
+        for offset in range(0, len(schedules), chunk):
+            results.extend(self._evaluate_chunk(ctx, schedules[offset:offset + chunk]))
+        return results
+
+    def _evaluate_chunk(self, ctx: EvaluationContext,
+                        schedules: List[Dict[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        days = self.solver.DAYS
+        ids = ctx.worker_ids
+        slot_minutes = ctx.slot_minutes
+        num_slots = ctx.num_slots
+
+        # Array de diferencias: +1 al inicio de cada turno, -1 tras su final, suma acumulada por día
+        starts: List[int] = []
+        ends: List[int] = []
+        violations = [
+            self._collect_shifts(ctx, schedule, b * len(ids), starts, ends)
+            for b, schedule in enumerate(schedules)
+        ]
+        size = len(schedules) * len(ids) * NUM_DAYS * (num_slots + 1)
+        diff = (np.bincount(np.array(starts, dtype=np.int64), minlength=size)
+                - np.bincount(np.array(ends, dtype=np.int64), minlength=size))
+        counts = np.cumsum(diff.reshape(len(schedules), len(ids), NUM_DAYS, num_slots + 1), axis=3)[..., :-1]
+        worked = counts > 0
+
+        for b, t_idx, d_idx in np.argwhere((counts > 1).any(axis=3)).tolist():
+            violations[b].append(f"{days[d_idx]} {ids[t_idx]}: overlapping shifts")
+        for b, t_idx, d_idx in np.argwhere((worked & ~ctx.masks.available).any(axis=3)).tolist():
+            violations[b].append(f"{days[d_idx]} {ids[t_idx]}: works during a restriction "
+                                 f"or outside the mandatory window")
+
+        # Límites diarios con la flexibilidad de ±1 hora del modelo
+        daily_minutes = worked.sum(axis=3, dtype=np.int64) * slot_minutes
+        out_of_range = (((daily_minutes > 0) & (daily_minutes < ctx.min_daily - 60))
+                        | (daily_minutes > ctx.max_daily + 60))
+        for b, t_idx, d_idx in np.argwhere(out_of_range).tolist():
+            violations[b].append(f"{days[d_idx]} {ids[t_idx]}: "
+                                 f"{daily_minutes[b, t_idx, d_idx] / 60:g} daily hours outside the allowed range")
+
+        # Turnos de al menos 1 hora, salvo los que terminan al final del día
+        min_blocks = self.solver._min_shift_blocks(slot_minutes)
+        padded = np.pad(worked, ((0, 0), (0, 0), (0, 0), (1, 1)))
+        starts = padded[..., 1:-1] & ~padded[..., :-2]
+        ends = padded[..., 1:-1] & ~padded[..., 2:]
+        start_idx = np.argwhere(starts)
+        end_idx = np.argwhere(ends)
+        # Inicios y finales aparecen en el mismo orden (horario, trabajador, día, slot)
+        lengths = end_idx[:, 3] - start_idx[:, 3] + 1
+        at_day_end = (start_idx[:, 3] > num_slots - min_blocks) & (end_idx[:, 3] == num_slots - 1)
+        for b, t_idx, d_idx, s in start_idx[(lengths < min_blocks) & ~at_day_end].tolist():
+            violations[b].append(f"{days[d_idx]} {ids[t_idx]}: shift at "
+                                 f"{self.solver.minutes_to_time_str(ctx.hora_inicio_act + s * slot_minutes)} "
+                                 f"shorter than 1 hour")
+
+        # Horas semanales: nunca por encima del objetivo, al menos el 70%
+        weekly_minutes = daily_minutes.sum(axis=2)
+        for b, t_idx in np.argwhere((weekly_minutes > ctx.targets) | (weekly_minutes < ctx.floors)).tolist():
+            violations[b].append(f"{ids[t_idx]}: {weekly_minutes[b, t_idx] / 60:g} weekly hours "
+                                 f"outside [{ctx.floors[t_idx] / 60:g}, {ctx.targets[t_idx] / 60:g}]")
+
+        # Mínimo dentro de la ventana de los días obligatorios
+        mandatory_minutes = (worked & ctx.masks.mandatory).sum(axis=3, dtype=np.int64) * slot_minutes
+        short_mandatory = ctx.mandatory_day & (mandatory_minutes < ctx.mandatory_required)
+        for b, t_idx, d_idx in np.argwhere(short_mandatory).tolist():
+            violations[b].append(f"{days[d_idx]} {ids[t_idx]}: "
+                                 f"{mandatory_minutes[b, t_idx, d_idx] / 60:g} hours in the mandatory window")
+
+        # Mismo objetivo que el modelo CP-SAT
+        preferred_slots = (worked & ctx.preferred).sum(axis=(1, 2, 3))
+        deviation = np.maximum(ctx.targets - weekly_minutes, 0).sum(axis=1)
+        extra_shifts = np.maximum(starts.sum(axis=3) - 1, 0).sum(axis=(1, 2))
+        objective = (self.solver.PREFERENCE_WEIGHT * slot_minutes // 15 * preferred_slots
+                     - self.solver.DEVIATION_WEIGHT * deviation
+                     - self.solver.FRAGMENTATION_WEIGHT * extra_shifts)
+
+        return [
+            {
+                "valid": not violations[b],
+                "violations": violations[b],
+                "objective": int(objective[b]),
+                "preferredSlots": int(preferred_slots[b]),
+                "deviationMinutes": int(deviation[b]),
+                "extraShifts": int(extra_shifts[b]),
+            }
+            for b in range(len(schedules))
+        ]
@@ -0,0 +1,173 @@
+from typing import Any, Dict, List, Optional, Tuple
+import time
+import numpy as np
+import structlog
+from app.services.solver_service import SolverService
+from app.utils.compiled_request import RequestData, compile_request
+
+logger = structlog.get_logger()
+
+
+class HeuristicService:
+    """
+    Constructive greedy scheduler that follows the same rules as SolverService:
+    restrictions, mandatory windows, daily limits with the ±1 hour flexibility,
+    1-hour minimum shifts and the 70% weekly floor.
+
+    Every worker gets at most one shift per day, so there is never a fragmentation
+    penalty. Runs in milliseconds and is meant as a fast answer and as a CP-SAT hint.
+    """
+
+    def __init__(self, solver: Optional[SolverService] = None):
+        self.solver = solver or SolverService()
+
+    @staticmethod
+    def _runs(available: np.ndarray) -> List[Tuple[int, int]]:
+        # Tramos [inicio, fin) de slots disponibles consecutivos
+        padded = np.concatenate(([False], available, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+    @staticmethod
+    def _best_position(run: Tuple[int, int], length: int, mandatory: np.ndarray,
+                       preferred: np.ndarray) -> Tuple[int, int]:
+        """
+        Returns (start slot, mandatory slots covered) of the window of `length` slots
+        inside `run` that covers the most mandatory slots, then the most preferred ones.
+        """
+        start, end = run
+        cum_mandatory = np.concatenate(([0], np.cumsum(mandatory[start:end])))
+        cum_preferred = np.concatenate(([0], np.cumsum(preferred[start:end])))
+        covered = cum_mandatory[length:] - cum_mandatory[:-length]
+        score = covered * (end - start + 1) + (cum_preferred[length:] - cum_preferred[:-length])
+        offset = int(np.argmax(score))
+        return start + offset, int(covered[offset])
+
+    def build_schedule(self, input_data: RequestData, slot_minutes: int = 15) -> Dict[str, Any]:
+        """
+        Returns {"commonSchedule", "heuristicInfo"} or {"error"} when a worker cannot
+        be scheduled greedily (the solver may still find a schedule).
+        """
+        started = time.perf_counter()
+        solver = self.solver
+        request = compile_request(input_data)
+
+        hora_inicio_act = request.start_minute
+        num_slots = request.num_slots(slot_minutes)
+        active_days_idx = request.active_days
+        masks = solver.build_slot_masks(request, num_slots, slot_minutes)
+        min_daily = request.min_daily_minutes
+
+        # Límites diarios en slots, con la misma flexibilidad de ±1 hora que el modelo
+        min_shift_blocks = solver._min_shift_blocks(slot_minutes)
+        min_blocks = max(min_shift_blocks, -(-(min_daily - 60) // slot_minutes))
+        normal_max_blocks = request.max_daily_minutes // slot_minutes
+        flex_max_blocks = (request.max_daily_minutes + 60) // slot_minutes
+        preferred = masks.preferred & masks.available
+
+        shifts: Dict[int, List[Tuple[int, int, int]]] = {d_idx: [] for d_idx in active_days_idx}
+        preferred_slots = 0
+        deviation_minutes = 0
+        failed: List[str] = []
+
+        for t_idx, worker_id in enumerate(request.worker_ids):
+            weekly_minutes = int(request.weekly_minutes[t_idx])
+            target_blocks = weekly_minutes // slot_minutes
+
+            # Por día: tramo elegido, longitud mínima, minutos obligatorios y capacidad
+            days = {}
+            for d_idx in active_days_idx:
+                runs = self._runs(masks.available[t_idx, d_idx])
+                if masks.mandatory_day[t_idx, d_idx]:
+                    required = min(min_daily, int(masks.mandatory_length[t_idx, d_idx]))
+                    mandatory = masks.mandatory[t_idx, d_idx]
+                    runs.sort(key=lambda r: (int(mandatory[r[0]:r[1]].sum()), r[1] - r[0]), reverse=True)
+                    day_min = max(min_blocks, -(-required // slot_minutes))
+                else:
+                    required = 0
+                    runs.sort(key=lambda r: r[1] - r[0], reverse=True)
+                    day_min = min_blocks
+                run = runs[0] if runs else (0, 0)
+                days[d_idx] = {
+                    "run": run,
+                    "min": day_min,
+                    "required": required,
+                    "cap": min(run[1] - run[0], flex_max_blocks),
+                    "preferred": int(preferred[t_idx, d_idx, run[0]:run[1]].sum()),
+                }
+
+            mandatory_days = [d for d in active_days_idx if masks.mandatory_day[t_idx, d]]
+            if any(days[d]["cap"] < days[d]["min"] for d in mandatory_days):
+                failed.append(worker_id)
+                continue
+
+            lengths = {d: days[d]["min"] for d in mandatory_days}
+            remaining = target_blocks - sum(lengths.values())
+            # Primero los días obligatorios, luego los opcionales con más slots preferidos
+            order = mandatory_days + sorted(
+                (d for d in active_days_idx if d not in lengths),
+                key=lambda d: days[d]["preferred"],
+                reverse=True
+            )
+            for cap_blocks in (normal_max_blocks, flex_max_blocks):
+                for d_idx in order:
+                    if remaining <= 0:
+                        break
+                    day = days[d_idx]
+                    if d_idx not in lengths:
+                        if day["cap"] < day["min"] or remaining < day["min"]:
+                            continue
+                        lengths[d_idx] = day["min"]
+                        remaining -= day["min"]
+                    extra = min(min(cap_blocks, day["cap"]) - lengths[d_idx], remaining)
+                    if extra > 0:
+                        lengths[d_idx] += extra
+                        remaining -= extra
+
+            worked_blocks = sum(lengths.values())
+            if remaining < 0 or worked_blocks * slot_minutes < int(weekly_minutes * 0.7):
+                failed.append(worker_id)
+                continue
+
+            placed = []
+            for d_idx, length in lengths.items():
+                day = days[d_idx]
+                start, covered = self._best_position(
+                    day["run"], length, masks.mandatory[t_idx, d_idx], preferred[t_idx, d_idx]
+                )
+                if covered * slot_minutes < day["required"]:
+                    break
+                placed.append((d_idx, start, start + length))
+            else:
+                for d_idx, start, end in placed:
+                    shifts[d_idx].append((t_idx, start, end))
+                    preferred_slots += int(preferred[t_idx, d_idx, start:end].sum())
+                deviation_minutes += weekly_minutes - worked_blocks * slot_minutes
+                continue
+            failed.append(worker_id)
+
+        wall_time = round(time.perf_counter() - started, 4)
+        if failed:
+            logger.info("Heurística voraz sin solución", trabajadores=failed, segundos=wall_time)
+            return {"error": f"La heurística no pudo asignar a los trabajadores: {', '.join(failed)}"}
+
+        common_schedule: Dict[str, List[Dict[str, str]]] = {}
+        for d_idx in active_days_idx:
+            if shifts[d_idx]:
+                common_schedule[solver.DAYS[d_idx]] = [
+                    {
+                        "workerId": request.worker_ids[t_idx],
+                        "startTime": solver.minutes_to_time_str(hora_inicio_act + start * slot_minutes),
+                        "endTime": solver.minutes_to_time_str(hora_inicio_act + end * slot_minutes),
+                    }
+                    for t_idx, start, end in shifts[d_idx]
+                ]
+
+        # Mismo objetivo que el modelo CP-SAT, en unidades de 15 minutos
+        objective = (solver.PREFERENCE_WEIGHT * slot_minutes // 15 * preferred_slots
+                     - solver.DEVIATION_WEIGHT * deviation_minutes)
+        logger.info("Heurística voraz completada", objetivo=objective, segundos=wall_time)
+        return {
+            "commonSchedule": common_schedule,
+            "heuristicInfo": {"objective": objective, "wallTime": wall_time, "slotMinutes": slot_minutes},
+        }
@@ -0,0 +1,59 @@
+import time
+from typing import Any, Dict, Optional
+import structlog
+from fastapi.encoders import jsonable_encoder
+from app.models.schedule import ScheduleRequest
+from app.models.solver import SolveOptions
+from app.services.ai_service import AIService
+from app.services.evaluation_service import ScheduleEvaluator
+from app.services.job_service import JobManager, _run_repair
+from app.utils.compiled_request import compile_request
+from app.utils.metrics import record_solve
+
+logger = structlog.get_logger()
+
+MAX_REPORTED_VIOLATIONS = 20
+
+
+class HybridService:
+    """
+    Generates a schedule with the AI model and hands it to CP-SAT as solution hints,
+    so the solver repairs its violations and improves it within a short budget.
+    """
+
+    def __init__(self, ai_service: AIService, job_manager: JobManager,
+                 evaluator: Optional[ScheduleEvaluator] = None, repair_seconds: float = 10.0):
+        self.ai_service = ai_service
+        self.job_manager = job_manager
+        self.evaluator = evaluator or ScheduleEvaluator()
+        self.repair_seconds = repair_seconds
+
+    async def generate(self, request: ScheduleRequest, options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+        options = options or SolveOptions()
+        if options.timeLimit is None:
+            options = options.model_copy(update={"timeLimit": self.repair_seconds})
+        input_data = compile_request(request)
+
+        started = time.perf_counter()
+        ai_result = await self.ai_service.generate_schedule(request)
+        hybrid_info: Dict[str, Any] = {"aiSeconds": round(time.perf_counter() - started, 3)}
+
+        hints = None
+        if "error" in ai_result:
+            hybrid_info["aiError"] = ai_result["error"]
+            logger.info("Horario de la IA no disponible, reparación sin punto de partida", error=ai_result["error"])
+        else:
+            hints = jsonable_encoder(ai_result["commonSchedule"])
+            evaluation = self.evaluator.evaluate(input_data, hints)
+            hybrid_info["aiObjective"] = evaluation["objective"]
+            hybrid_info["aiViolations"] = evaluation["violations"][:MAX_REPORTED_VIOLATIONS]
+            logger.info("Horario de la IA evaluado",
+                       violaciones=len(evaluation["violations"]),
+                       objetivo=evaluation["objective"])
+
+        started = time.perf_counter()
+        result = await self.job_manager.run(_run_repair, input_data, hints, options=options)
+        record_solve(result)
+        hybrid_info["repairSeconds"] = round(time.perf_counter() - started, 3)
+
+        return {**result, "hybridInfo": hybrid_info}
@@ -0,0 +1,439 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from enum import Enum
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import structlog
+from app.config import get_settings
+from app.models.schedule import ScheduleRequest
+from app.models.solver import SolveOptions
+from app.services.admission_service import Admission, AdmissionController, AdmissionRejected
+from app.services.cache_service import ResultCache, get_solver_cache
+from app.services.heuristic_service import HeuristicService
+from app.services.solver_service import SolverService
+from app.utils.compiled_request import RequestData
+from app.utils.fingerprint import schedule_request_fingerprint
+from app.utils.metrics import record_solve
+
+logger = structlog.get_logger()
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+def solve_cache_key(request: ScheduleRequest, options: SolveOptions) -> str:
+    # Las opciones forman parte de la clave: otro presupuesto u otra formulación es otro resultado
+    return schedule_request_fingerprint(request, namespace=options.model_dump_json())
+
+
+def _greedy_schedule(input_data: RequestData, options: Optional[SolveOptions] = None) -> Optional[Dict[str, Any]]:
+    # Horario voraz en la granularidad pedida, o None si la heurística no encuentra uno
+    greedy = HeuristicService().build_schedule(input_data, (options or SolveOptions()).slotMinutes)
+    return None if "error" in greedy else greedy
+
+
+def _run_solve(input_data: RequestData, options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+    # Se ejecuta en un proceso del pool: el modelo se construye y resuelve fuera del event loop
+    hints = None
+    if options is not None and options.greedyHint:
+        greedy = _greedy_schedule(input_data, options)
+        hints = greedy["commonSchedule"] if greedy is not None else None
+    return SolverService().solve_schedule(input_data, options, hints=hints)
+
+
+def _run_repair(input_data: RequestData, hints: Optional[Dict[str, Any]],
+                options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+    # Horario externo (p. ej. de la IA) como punto de partida de CP-SAT
+    return SolverService().solve_schedule(input_data, options, hints=hints)
+
+
+def _run_solve_streaming(input_data: RequestData, options: Optional[SolveOptions],
+                         events: Any, stop_event: Any,
+                         hints: Optional[Dict[str, Any]] = None) -> None:
+    # Cada solución mejorada se envía al proceso padre por la cola compartida
+    result = SolverService().solve_schedule(
+        input_data,
+        options,
+        on_solution=lambda solution: events.put(("solution", solution)),
+        stop_event=stop_event,
+        hints=hints
+    )
+    events.put(("result", result))
+
+
+def _next_event(events: Any, timeout: float = 0.5) -> Optional[Tuple[str, Dict[str, Any]]]:
+    try:
+        return events.get(timeout=timeout)
+    except queue.Empty:
+        return None
+
+
+def _run_resolve(input_data: Dict[str, Any], previous_schedule: Dict[str, Any], changed_ids: List[str],
+                 freeze_unchanged: bool, options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+    return SolverService().resolve_schedule(input_data, previous_schedule, changed_ids, freeze_unchanged, options)
+
+
+def _run_compare(input_data: RequestData, options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+    return SolverService().compare_formulations(input_data, options)
+
+
+class SolveJob:
+    def __init__(self, job_id: str, future: Future, cache_key: Optional[str] = None, cached: bool = False):
+        self.id = job_id
+        self.future = future
+        self.cache_key = cache_key
+        self.cached = cached
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+
+    @property
+    def status(self) -> JobStatus:
+        if self.cancelled or self.future.cancelled():
+            return JobStatus.CANCELLED
+        if not self.future.done():
+            return JobStatus.RUNNING if self.future.running() else JobStatus.PENDING
+        if self.future.exception() is not None or "error" in self.future.result():
+            return JobStatus.FAILED
+        return JobStatus.COMPLETED
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        if self.status != JobStatus.COMPLETED:
+            return None
+        return self.future.result()
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.status != JobStatus.FAILED:
+            return None
+        exc = self.future.exception()
+        if exc is not None:
+            return f"Error al resolver el horario: {str(exc)}"
+        return self.future.result()["error"]
+
+    @property
+    def conflicts(self) -> Optional[List[Dict[str, Any]]]:
+        if self.status != JobStatus.FAILED or self.future.exception() is not None:
+            return None
+        return self.future.result().get("conflicts")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "status": self.status.value,
+            "result": self.result,
+            "error": self.error,
+            "conflicts": self.conflicts,
+        }
+
+
+class JobManager:
+    """
+    Runs solver jobs in a bounded process pool so CP-SAT never blocks the event loop.
+
+    Jobs submitted with a cache key are served from the result cache when possible,
+    and identical jobs still in flight are shared instead of solved twice. Every
+    solve goes through the admission controller, which bounds the solves running
+    and waiting (`max_queue`) and rejects the rest with 429.
+    """
+
+    def __init__(self, max_workers: int, job_ttl_seconds: int, cache: Optional[ResultCache] = None,
+                 cpu_budget: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers
+        self.job_ttl_seconds = job_ttl_seconds
+        self.cpu_budget = cpu_budget or max_workers * SolverService.TIERS["balanced"][1]
+        self.cache = cache
+        self.admission = AdmissionController(
+            cpu_budget=self.cpu_budget,
+            max_running=max_workers,
+            max_queue=max_queue
+        )
+        self._jobs: Dict[str, SolveJob] = {}
+        self._inflight: Dict[str, SolveJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager: Optional[Any] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" evita heredar hilos (gRPC, event loop) del proceso padre
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @property
+    def manager(self) -> Any:
+        if self._manager is None:
+            # Proveedor de colas y eventos compartidos con los procesos del pool
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        return self._manager
+
+    def submit(self, input_data: RequestData, options: Optional[SolveOptions] = None,
+               cache_key: Optional[str] = None) -> SolveJob:
+        self._prune()
+
+        if cache_key is not None:
+            shared = self._inflight.get(cache_key)
+            if shared is not None and not shared.future.done() and not shared.cancelled:
+                logger.info("Reutilizando trabajo en curso", job_id=shared.id)
+                return shared
+
+            cached = self.cache.get(cache_key) if self.cache is not None else None
+            if cached is not None:
+                future: Future = Future()
+                future.set_result(cached)
+                return self._register(SolveJob(uuid.uuid4().hex, future, cache_key, cached=True))
+
+        # El trabajo se registra ya; se envía al pool cuando el control de admisión le da turno
+        admission = self._reserve(options)
+        future: Future = Future()
+        job = self._register(SolveJob(uuid.uuid4().hex, future, cache_key))
+        dispatch = asyncio.ensure_future(self._dispatch(admission, future, _run_solve, input_data, options))
+        future.add_done_callback(lambda done: dispatch.cancel() if done.cancelled() else None)
+        if cache_key is not None:
+            self._inflight[cache_key] = job
+        logger.info("Trabajo de resolución encolado", job_id=job.id, pendientes=len(self._jobs))
+        return job
+
+    async def _dispatch(self, admission: Admission, future: Future, fn: Callable[..., Any], *args: Any) -> None:
+        # Espera el turno, ejecuta en el pool y copia el resultado en el future del trabajo
+        await admission.wait()
+        if not future.set_running_or_notify_cancel():
+            admission.release()
+            return
+        try:
+            future.set_result(await asyncio.wrap_future(self._start(admission, fn, *args)))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    def _reserve(self, options: Optional[SolveOptions]) -> Admission:
+        options = options or SolveOptions()
+        return self.admission.reserve(self.solve_threads(options),
+                                      options.timeLimit or SolverService.TIERS[options.tier][0])
+
+    def _start(self, admission: Admission, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Submits fn(*args) to the pool for an admitted solve. The admission is released
+        when the pool process finishes it, not when the caller stops waiting: a stopped
+        or abandoned solve keeps its cores until it actually ends.
+        """
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            admission.release()
+            raise
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(admission.release))
+        return future
+
+    def _register(self, job: SolveJob) -> SolveJob:
+        self._jobs[job.id] = job
+        job.future.add_done_callback(lambda _: self._on_done(job))
+        return job
+
+    def _on_done(self, job: SolveJob) -> None:
+        job.finished_at = time.monotonic()
+        if not job.cached and not job.future.cancelled() and job.future.exception() is None:
+            record_solve(job.future.result())
+        if job.cache_key is None:
+            return
+        if self._inflight.get(job.cache_key) is job:
+            self._inflight.pop(job.cache_key, None)
+        if self.cache is not None and job.status == JobStatus.COMPLETED:
+            self.cache.set(job.cache_key, job.result)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, options: Optional[SolveOptions] = None) -> Any:
+        """
+        Runs a picklable function in the solver pool, as fn(*args, options), once
+        admitted, and awaits its result.
+        """
+        admission = self._reserve(options)
+        await admission.wait()
+        return await asyncio.wrap_future(self._start(admission, fn, *args, options))
+
+    async def stream(self, input_data: RequestData, options: Optional[SolveOptions] = None,
+                     cache_key: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Solves in the pool and yields ("solution", ...) for every improving solution,
+        then ("result", ...) with the final result. The greedy heuristic schedule is
+        yielded first, as solution 0, and seeds the search. Closing the iterator early
+        stops the search at the next solution.
+        """
+        cached = self.cache.get(cache_key) if self.cache is not None and cache_key is not None else None
+        if cached is not None:
+            yield "result", cached
+            return
+
+        try:
+            admission = self._reserve(options)
+        except AdmissionRejected as e:
+            yield "result", {"error": e.detail}
+            return
+
+        future = None
+        try:
+            greedy = await asyncio.to_thread(_greedy_schedule, input_data, options)
+            hints = None
+            if greedy is not None:
+                hints = greedy["commonSchedule"]
+                yield "solution", {
+                    "commonSchedule": hints,
+                    "objective": greedy["heuristicInfo"]["objective"],
+                    "wallTime": greedy["heuristicInfo"]["wallTime"],
+                    "solution": 0,
+                    "source": "heuristic",
+                }
+
+            # La solución voraz ya se envió; la búsqueda espera su turno
+            await admission.wait()
+            events = self.manager.Queue()
+            stop_event = self.manager.Event()
+            future = self._start(admission, _run_solve_streaming, input_data, options, events, stop_event, hints)
+            while True:
+                item = await asyncio.to_thread(_next_event, events)
+                if item is None:
+                    if not future.done():
+                        continue
+                    # El proceso terminó: vaciar la cola o informar el fallo
+                    item = _next_event(events, timeout=0)
+                    if item is None:
+                        exc = future.exception()
+                        yield "result", {"error": f"Error al resolver el horario: {str(exc)}"}
+                        break
+                event, payload = item
+                if event == "result":
+                    record_solve(payload)
+                    if cache_key is not None and self.cache is not None:
+                        self.cache.set(cache_key, payload)
+                yield event, payload
+                if event == "result":
+                    break
+        finally:
+            # Con la búsqueda en marcha, la plaza se libera cuando el proceso termina
+            if future is None:
+                admission.release()
+            elif not future.done():
+                stop_event.set()
+
+    @staticmethod
+    def solve_threads(options: Optional[SolveOptions] = None) -> int:
+        return SolverService.TIERS[(options or SolveOptions()).tier][1]
+
+    def batch_parallelism(self, options: Optional[SolveOptions] = None) -> Tuple[int, int]:
+        """
+        Returns (parallel solves, search threads per solve) so that parallel solves
+        times threads per solve stays within the CPU budget and the pool size.
+        """
+        threads = self.solve_threads(options)
+        return max(1, min(self.max_workers, self.cpu_budget // threads)), threads
+
+    async def batch(self, items: List[Tuple[RequestData, Optional[str]]],
+                    options: Optional[SolveOptions] = None) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Solves many requests, given as (input_data, cache_key) pairs, and yields
+        (index, result) in completion order. At most `batch_parallelism` solves are
+        submitted at a time; closing the iterator stops submitting the rest.
+        """
+        parallel, _ = self.batch_parallelism(options)
+        semaphore = asyncio.Semaphore(parallel)
+        finished: asyncio.Queue = asyncio.Queue()
+
+        async def solve(index: int, input_data: RequestData, cache_key: Optional[str]) -> None:
+            result: Dict[str, Any] = {"error": "El trabajo de resolución fue cancelado."}
+            try:
+                async with semaphore:
+                    while True:
+                        try:
+                            job = self.submit(input_data, options, cache_key)
+                            # shield: un trabajo compartido no se cancela si este lote se abandona
+                            result = await asyncio.shield(self.wait(job))
+                            break
+                        except AdmissionRejected as e:
+                            # Cola llena: el equipo espera a que haya capacidad en vez de fallar
+                            logger.info("Lote en espera de capacidad del solver",
+                                        indice=index, reintentar_en=e.retry_after)
+                            await asyncio.sleep(e.retry_after)
+                        except Exception as e:
+                            result = {"error": f"Error al resolver el horario: {str(e)}"}
+                            break
+            finally:
+                # También si se cancela, para que quien consume el lote no espere para siempre
+                finished.put_nowait((index, result))
+
+        tasks = [asyncio.ensure_future(solve(index, input_data, cache_key))
+                 for index, (input_data, cache_key) in enumerate(items)]
+        try:
+            for _ in tasks:
+                yield await finished.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def get(self, job_id: str) -> Optional[SolveJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SolveJob]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if not job.future.done():
+            # Un trabajo ya en ejecución no se puede interrumpir dentro del pool;
+            # se marca como cancelado y su resultado se descarta al terminar.
+            job.future.cancel()
+            job.cancelled = True
+            logger.info("Trabajo de resolución cancelado", job_id=job_id)
+        return job
+
+    async def wait(self, job: SolveJob) -> Dict[str, Any]:
+        try:
+            result = await asyncio.wrap_future(job.future)
+        except asyncio.CancelledError:
+            # wrap_future propaga la cancelación del trabajo como asyncio.CancelledError;
+            # solo se relanza si lo cancelado es quien espera
+            if not job.future.cancelled():
+                raise
+            return {"error": "El trabajo de resolución fue cancelado."}
+        if job.cancelled:
+            return {"error": "El trabajo de resolución fue cancelado."}
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.job_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+@lru_cache()
+def get_job_manager() -> JobManager:
+    settings = get_settings()
+    return JobManager(
+        max_workers=settings.SOLVER_POOL_SIZE,
+        job_ttl_seconds=settings.SOLVER_JOB_TTL_SECONDS,
+        cache=get_solver_cache(),
+        cpu_budget=settings.SOLVER_CPU_BUDGET,
+        max_queue=settings.SOLVER_QUEUE_SIZE
+    )
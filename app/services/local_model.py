@@ -0,0 +1,40 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict
+from app.services.heuristic_service import HeuristicService
+from app.utils.prompt_encoding import PROMPT_DATA_MARKER, decode_request
+
+
+class LocalResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LocalScheduleModel:
+    """
+    Offline stand-in for genai.GenerativeModel used for local runs and tests.
+
+    Reads the request back from the prompt and answers with the greedy heuristic
+    schedule, after an optional simulated latency.
+    """
+
+    model_name = "local-heuristic"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+
+    def _answer(self, prompt: str) -> LocalResponse:
+        encoded = prompt.split(PROMPT_DATA_MARKER, 1)[1]
+        # El prompt lleva la petición en JSON o en la codificación compacta
+        input_data: Dict[str, Any] = json.loads(encoded) if encoded.lstrip().startswith("{") else decode_request(encoded)
+        result = HeuristicService().build_schedule(input_data)
+        return LocalResponse(json.dumps({"commonSchedule": result.get("commonSchedule", {})}, ensure_ascii=False))
+
+    def generate_content(self, prompt: str) -> LocalResponse:
+        time.sleep(self.latency_seconds)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt: str) -> LocalResponse:
+        await asyncio.sleep(self.latency_seconds)
+        return self._answer(prompt)
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional
+import structlog
+from fastapi.encoders import jsonable_encoder
+from app.models.schedule import ScheduleRequest
+from app.models.solver import SolveOptions
+from app.services.ai_service import AIService
+from app.services.evaluation_service import ScheduleEvaluator
+from app.services.job_service import JobManager, solve_cache_key
+from app.utils.compiled_request import CompiledRequest, compile_request
+
+logger = structlog.get_logger()
+
+MAX_REPORTED_VIOLATIONS = 20
+
+
+class RaceService:
+    """
+    Runs the AI and the solver concurrently and returns the first schedule that
+    satisfies the hard constraints, or the better one if the other engine also
+    delivers a valid schedule within the grace window.
+
+    The losing solver search is stopped at its next solution; a cancelled AI call
+    keeps running in the AI cache so its result is reused by later requests.
+    """
+
+    ENGINES = ("ai", "solver")
+
+    def __init__(self, ai_service: AIService, job_manager: JobManager,
+                 evaluator: Optional[ScheduleEvaluator] = None, grace_seconds: float = 2.0):
+        self.ai_service = ai_service
+        self.job_manager = job_manager
+        self.evaluator = evaluator or ScheduleEvaluator()
+        self.grace_seconds = grace_seconds
+
+    async def _run_ai(self, request: ScheduleRequest) -> Dict[str, Any]:
+        return await self.ai_service.generate_schedule(request)
+
+    async def _run_solver(self, request: ScheduleRequest, compiled: CompiledRequest,
+                          options: SolveOptions) -> Dict[str, Any]:
+        # aclosing: al cancelar la carrera se cierra el stream y se detiene la búsqueda
+        async with aclosing(self.job_manager.stream(compiled, options,
+                                                    solve_cache_key(request, options))) as events:
+            async for event, payload in events:
+                if event == "result":
+                    return payload
+        return {"error": "El solver terminó sin resultado"}
+
+    def _judge(self, engine: str, task: asyncio.Task, input_data: CompiledRequest,
+               seconds: float) -> Dict[str, Any]:
+        outcome: Dict[str, Any] = {"engine": engine, "seconds": round(seconds, 3), "violations": []}
+        exc = task.exception()
+        result = task.result() if exc is None else {"error": str(exc)}
+        if "error" in result:
+            return {**outcome, "status": "error", "error": result["error"], "result": result}
+
+        common_schedule = jsonable_encoder(result["commonSchedule"])
+        evaluation = self.evaluator.evaluate(input_data, common_schedule)
+        return {
+            **outcome,
+            "status": "valid" if evaluation["valid"] else "invalid",
+            "objective": evaluation["objective"],
+            "violations": evaluation["violations"][:MAX_REPORTED_VIOLATIONS],
+            "result": result,
+        }
+
+    async def race(self, request: ScheduleRequest, options: SolveOptions,
+                   grace_seconds: Optional[float] = None) -> Dict[str, Any]:
+        grace = self.grace_seconds if grace_seconds is None else grace_seconds
+        input_data = compile_request(request)
+        started = time.monotonic()
+
+        tasks = {
+            asyncio.ensure_future(self._run_ai(request)): "ai",
+            asyncio.ensure_future(self._run_solver(request, input_data, options)): "solver",
+        }
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        pending = set(tasks)
+        deadline: Optional[float] = None
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    engine = tasks[task]
+                    outcomes[engine] = self._judge(engine, task, input_data, time.monotonic() - started)
+                    logger.info("Motor terminado en la carrera", motor=engine, estado=outcomes[engine]["status"],
+                               segundos=outcomes[engine]["seconds"])
+                if deadline is None and any(o["status"] == "valid" for o in outcomes.values()):
+                    # Primer horario válido: el otro motor tiene una ventana de gracia
+                    deadline = time.monotonic() + grace
+        finally:
+            for task in pending:
+                task.cancel()
+
+        for task, engine in tasks.items():
+            if engine not in outcomes:
+                outcomes[engine] = {"engine": engine, "status": "cancelled", "violations": []}
+
+        valid = [outcomes[e] for e in self.ENGINES if outcomes[e]["status"] == "valid"]
+        engines = [
+            {key: value for key, value in outcomes[e].items() if key != "result"}
+            for e in self.ENGINES
+        ]
+        if not valid:
+            logger.error("Ningún motor produjo un horario válido", motores=engines)
+            return {"error": "Ningún motor produjo un horario válido", "engines": engines}
+
+        # Mejor objetivo; en caso de empate, el solver
+        winner = max(valid, key=lambda o: (o["objective"], o["engine"] == "solver"))
+        logger.info("Carrera resuelta", ganador=winner["engine"], objetivo=winner["objective"])
+        return {
+            **winner["result"],
+            "raceInfo": {"winner": winner["engine"], "graceSeconds": grace, "engines": engines},
+        }
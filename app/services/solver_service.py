@@ -1,13 +1,127 @@
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from ortools.sat.python import cp_model
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
 import structlog
-from app.models.schedule import WorkerShift
+from app.models.solver import SolveOptions
+from app.utils.availability import (
+    NUM_DAYS, DayIntervals, SlotMasks, build_slot_masks, dilate_slots, equivalence_classes, slot_bounds
+)
+from app.utils.capacity import capacity_bounds, capacity_conflicts, capacity_slack
+from app.utils.compiled_request import CompiledRequest, RequestData, compile_request
 
 logger = structlog.get_logger()
 
+class ScheduleModel:
+    """
+    CP-SAT model of a schedule request together with the variables needed to
+    read a solution back.
+    """
+
+    def __init__(self, model: cp_model.CpModel, request: CompiledRequest, active_days_idx: List[int],
+                 hora_inicio_act: int, interval_length: int, num_slots: int, masks: SlotMasks):
+        self.model = model
+        self.request = request
+        self.active_days_idx = active_days_idx
+        self.hora_inicio_act = hora_inicio_act
+        self.interval_length = interval_length
+        self.num_slots = num_slots
+        self.masks = masks
+        self.work: Dict[Tuple[int, int, int], cp_model.IntVar] = {}
+        # Índice en el proto de cada variable work (-1 sin variable), para leer la solución en bloque
+        self.work_index = np.full((request.num_workers, 7, num_slots), -1, dtype=np.int64)
+        self.available_slots: Dict[Tuple[int, int], List[int]] = {}
+        self.has_work: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        self.num_shifts_per_day: Dict[Tuple[int, int], Any] = {}
+        # Trabajadores idénticos fusionados: miembros (índices en team_worker_ids) de cada
+        # trabajador modelado y su peso en el objetivo
+        self.team_worker_ids: List[str] = request.worker_ids
+        self.members: Optional[List[np.ndarray]] = None
+        self.weights = np.ones(request.num_workers, dtype=np.int64)
+        self.weekly_hours_vars: List[cp_model.IntVar] = []
+        self.weekly_deviations: List[cp_model.IntVar] = []
+        # Literal de cada regla (regla, trabajador, día) cuando el modelo se construye para
+        # explicar una infactibilidad; None en la resolución normal
+        self.assumptions: Optional[Dict[Tuple[str, int, Optional[int]], cp_model.IntVar]] = None
+
+    def size(self) -> Dict[str, int]:
+        proto = self.model.Proto()
+        return {"variables": len(proto.variables), "constraints": len(proto.constraints)}
+
+    def assume(self, rule: str, t_idx: int, d_idx: Optional[int] = None) -> List[cp_model.IntVar]:
+        """
+        Enforcement literals for one worker (and day) rule: the rule's assumption
+        literal when explaining infeasibility, no literal otherwise.
+        """
+        if self.assumptions is None:
+            return []
+        key = (rule, t_idx, d_idx)
+        if key not in self.assumptions:
+            self.assumptions[key] = self.model.NewBoolVar(f"assume_{rule}_t{t_idx}_d{d_idx}")
+        return [self.assumptions[key]]
+
+class SolutionStreamer(cp_model.CpSolverSolutionCallback):
+    """
+    Reports every improving solution found during the search and stops the
+    search early when the stop event is set.
+    """
+
+    def __init__(self, service: "SolverService", sm: ScheduleModel,
+                 on_solution: Callable[[Dict[str, Any]], None], stop_event: Optional[Any] = None):
+        super().__init__()
+        self._service = service
+        self._sm = sm
+        self._on_solution = on_solution
+        self._stop_event = stop_event
+        self.solutions = 0
+
+    def OnSolutionCallback(self) -> None:
+        self.solutions += 1
+        grid = self._service._work_grid(self._sm, self)
+        self._on_solution({
+            "commonSchedule": self._service._extract_schedule(self._sm, self, grid),
+            "objective": self._service._schedule_objective(self._sm, grid),
+            "bestBound": self.BestObjectiveBound(),
+            "wallTime": round(self.WallTime(), 3),
+            "solution": self.solutions,
+            "source": "solver",
+        })
+        if self._stop_event is not None and self._stop_event.is_set():
+            logger.info("Búsqueda detenida por el cliente", soluciones=self.solutions)
+            self.StopSearch()
+
 class SolverService:
     DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-    
+    FORMULATIONS = ("classic", "compact")
+    # Granularidades de la resolución multi-resolución y fracción del tiempo para cada nivel grueso
+    RESOLUTION_LEVELS = (60, 30)
+    RESOLUTION_TIME_SHARE = 0.25
+    # Búsqueda por vecindarios (LNS): a partir de cuántos trabajadores se usa por defecto,
+    # trabajadores por vecindario y tiempo máximo de cada sub-resolución
+    LNS_MIN_WORKERS = 300
+    LNS_NEIGHBOURHOOD_WORKERS = 2
+    LNS_SLICE_SECONDS = 2.0
+    # Tiempo máximo para explicar una infactibilidad con supuestos
+    EXPLAIN_SECONDS = 10.0
+    INFEASIBLE_ERROR = "No existe un horario factible: hay reglas de trabajadores incompatibles (ver conflicts)."
+
+    # Presupuestos por nivel: (límite de tiempo en segundos, hilos de búsqueda, gap relativo)
+    TIERS = {
+        "fast": (2.0, 2, 0.05),
+        "balanced": (60.0, 4, 0.0),
+        "thorough": (300.0, 8, 0.0),
+    }
+
+    # Pesos para diferentes objetivos
+    PREFERENCE_WEIGHT = 1
+    DEVIATION_WEIGHT = 10  # Mayor peso para minimizar desviaciones
+    FRAGMENTATION_WEIGHT = 15  # Penalizar mucho la fragmentación
+
     @staticmethod
     def time_str_to_minutes(t_str: str) -> int:
         h, m, s = map(int, t_str.split(':'))
@@ -19,386 +133,1254 @@ class SolverService:
         mm = m % 60
         return f"{h:02d}:{mm:02d}:00"
 
-    def solve_schedule(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        try:
-            logger.info("Iniciando proceso de resolución de horario")
-            equipo = input_data["equipo"]
-            trabajadores = input_data["scheduleTrabajadores"]
-
-            dias_actividad = equipo["diasActividad"]
-            hora_inicio_act = self.time_str_to_minutes(equipo["horaInicioActividad"])
-            hora_fin_act = self.time_str_to_minutes(equipo["horaFinActividad"])
-            horas_min_diaria = equipo["horasMinDiaria"] * 60
-            horas_max_diaria = equipo["horasMaxDiaria"] * 60
-
-            logger.info("Configuración inicial", 
-                       hora_inicio=equipo["horaInicioActividad"],
-                       hora_fin=equipo["horaFinActividad"],
-                       horas_min=equipo["horasMinDiaria"],
-                       horas_max=equipo["horasMaxDiaria"])
-
-            # Modelo
-            model = cp_model.CpModel()
-
-            # Variables
-            interval_length = 15  # bloques de 15 minutos
-            num_slots = (hora_fin_act - hora_inicio_act) // interval_length
-            logger.info(f"Número de slots calculados: {num_slots}")
-
-            # Map para buscar índice día según nombre
-            day_to_idx = {d: i for i, d in enumerate(self.DAYS)}
-
-            # Filtrar días activos
-            active_days_idx = [i for i, val in enumerate(dias_actividad) if val == '1']
-            logger.info(f"Días activos: {[self.DAYS[i] for i in active_days_idx]}")
-
-            # Variables por trabajador, día y slot
-            work = {}
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    for s in range(num_slots):
-                        work[(t_idx, d_idx, s)] = model.NewBoolVar(f"work_t{t_idx}_d{d_idx}_s{s}")
-
-            # Variables auxiliares para detectar inicios y finales de turnos
-            shift_start = {}
-            shift_end = {}
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    for s in range(num_slots):
-                        shift_start[(t_idx, d_idx, s)] = model.NewBoolVar(f"start_t{t_idx}_d{d_idx}_s{s}")
-                        shift_end[(t_idx, d_idx, s)] = model.NewBoolVar(f"end_t{t_idx}_d{d_idx}_s{s}")
-
-            # Variables para contar número de turnos por día (para minimizar fragmentación)
-            num_shifts_per_day = {}
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    num_shifts_per_day[(t_idx, d_idx)] = model.NewIntVar(0, num_slots, f"num_shifts_t{t_idx}_d{d_idx}")
-
-            # Variables para desviación de horas semanales (solo por debajo)
-            weekly_deviations = []
-            weekly_hours_vars = []
-
-            # Restricciones diarias con flexibilidad de ±1 hora
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    slots_vars = [work[(t_idx, d_idx, s)] for s in range(num_slots)]
-                    total_minutes = model.NewIntVar(0, horas_max_diaria + 60, f"total_minutes_t{t_idx}_d{d_idx}")
-                    model.Add(total_minutes == sum(slots_vars) * interval_length)
-                    
-                    # Variable para la desviación diaria
-                    daily_deviation_up = model.NewIntVar(0, 60, f"daily_deviation_up_t{t_idx}_d{d_idx}")  # Máximo 1 hora arriba
-                    daily_deviation_down = model.NewIntVar(0, 60, f"daily_deviation_down_t{t_idx}_d{d_idx}")  # Máximo 1 hora abajo
-                    
-                    # Si hay horas trabajadas ese día (total_minutes > 0), aplicar límites con flexibilidad
-                    has_work = model.NewBoolVar(f"has_work_t{t_idx}_d{d_idx}")
-                    model.Add(total_minutes > 0).OnlyEnforceIf(has_work)
-                    model.Add(total_minutes == 0).OnlyEnforceIf(has_work.Not())
-                    
-                    # Restricción de máximo diario con flexibilidad hacia arriba
-                    model.Add(total_minutes <= horas_max_diaria + daily_deviation_up).OnlyEnforceIf(has_work)
-                    
-                    # Restricción de mínimo diario con flexibilidad hacia abajo
-                    model.Add(total_minutes >= horas_min_diaria - daily_deviation_down).OnlyEnforceIf(has_work)
-                    
-                    # Logging de las desviaciones diarias
-                    logger.info(f"Configurando límites diarios flexibles para trabajador {t['id']} en {self.DAYS[d_idx]}", 
-                               min_diario=(horas_min_diaria - 60)/60,
-                               max_diario=(horas_max_diaria + 60)/60)
-
-            # Restricciones semanales con desviación permitida solo por debajo
-            for t_idx, t in enumerate(trabajadores):
-                slots_vars = []
-                for d_idx in active_days_idx:
-                    slots_vars.extend([work[(t_idx, d_idx, s)] for s in range(num_slots)])
-                
-                horas_semanales = t["horarioGeneral"]["horasSemanales"] * 60
-                total_week_minutes = model.NewIntVar(0, horas_semanales, f"total_week_minutes_t{t_idx}")  # Limitado a horas semanales
-                model.Add(total_week_minutes == sum(slots_vars) * interval_length)
-                weekly_hours_vars.append(total_week_minutes)
-                
-                min_semanal = int(horas_semanales * 0.7)  # Reducimos el mínimo al 70%
-                
-                logger.info(f"Configurando restricciones semanales para trabajador {t['id']}", 
-                           horas_semanales=horas_semanales,
-                           min_semanal=min_semanal)
-                
-                # Variable para la desviación (solo por debajo)
+    def build_slot_masks(self, request: CompiledRequest, num_slots: int, interval_length: int) -> SlotMasks:
+        """
+        Precomputes availability, mandatory-window and preference masks for every
+        (worker, day, slot) before the model is built.
+        """
+        slot_starts, slot_ends = slot_bounds(request.start_minute, num_slots, interval_length)
+        return build_slot_masks(
+            request.num_workers,
+            slot_starts,
+            slot_ends,
+            np.array(request.active_days, dtype=np.int64),
+            restrictions=request.restrictions,
+            mandatory=request.mandatory,
+            preferences=request.preferences
+        )
+
+    @staticmethod
+    def _merge_identical_workers(request: CompiledRequest,
+                                 masks: SlotMasks) -> Tuple[CompiledRequest, SlotMasks, Optional[List[np.ndarray]]]:
+        """
+        Workers never interact in this model, so identical workers (same masks and weekly
+        hours) have the same optimal shifts. Keeps the first worker of each group and
+        returns, per kept worker, the team indices it stands for (None when nothing merges).
+        """
+        classes = equivalence_classes(masks, request.weekly_minutes)
+        if not classes:
+            return request, masks, None
+        representative = np.arange(request.num_workers)
+        for group in classes:
+            representative[group] = group[0]
+        kept = np.flatnonzero(representative == np.arange(request.num_workers))
+        position = np.searchsorted(kept, representative)
+        members = np.split(np.argsort(position, kind="stable"), np.cumsum(np.bincount(position))[:-1])
+        logger.info("Trabajadores idénticos fusionados",
+                   trabajadores=request.num_workers,
+                   modelados=len(kept),
+                   grupos=len(classes))
+        return request.select(kept), SlotMasks(*(mask[kept] for mask in masks)), members
+
+    @staticmethod
+    def _explanation_masks(request: CompiledRequest, masks: SlotMasks, num_slots: int,
+                           interval_length: int) -> Tuple[SlotMasks, Dict[str, np.ndarray]]:
+        """
+        Makes every slot of the active days available and returns, per rule, the slots
+        that restrictions and mandatory windows exclude, so an explanation model can
+        forbid them under the rule's literal instead of leaving them out.
+        """
+        slot_starts, slot_ends = slot_bounds(request.start_minute, num_slots, interval_length)
+        no_intervals = DayIntervals.from_rows([])
+        unrestricted = build_slot_masks(
+            request.num_workers, slot_starts, slot_ends, np.array(request.active_days, dtype=np.int64),
+            restrictions=no_intervals, mandatory=no_intervals, preferences=no_intervals
+        ).available
+        without_windows = build_slot_masks(
+            request.num_workers, slot_starts, slot_ends, np.array(request.active_days, dtype=np.int64),
+            restrictions=request.restrictions, mandatory=no_intervals, preferences=no_intervals
+        ).available
+        blocked = {"restriction": unrestricted & ~without_windows, "mandatoryDay": without_windows & ~masks.available}
+        return masks._replace(available=unrestricted), blocked
+
+    def build_model(self, input_data: RequestData, options: Optional[SolveOptions] = None,
+                    neighbourhood: Optional[Tuple[Dict[str, List[Dict[str, Any]]], int]] = None,
+                    fixed_days: Optional[Tuple[List[int], np.ndarray]] = None,
+                    explain: bool = False) -> ScheduleModel:
+        """
+        Builds the CP-SAT model. `input_data` is a request payload or its compiled form.
+        `neighbourhood` is a (commonSchedule, radius in minutes) pair: work variables are
+        only created for slots within the radius of a slot worked in that schedule.
+        `fixed_days` is a (day indices, (workers, 7, slots) grid) pair: on those days every
+        worker's work is fixed to the grid. With `explain`, every worker and day rule is
+        enforced by its own literal in `sm.assumptions` (see explain_infeasibility).
+        """
+        options = options or SolveOptions()
+        logger.info("Iniciando proceso de resolución de horario", formulacion=options.formulation)
+        request = compile_request(input_data)
+        worker_ids = request.worker_ids
+
+        hora_inicio_act = request.start_minute
+        horas_min_diaria = request.min_daily_minutes
+        horas_max_diaria = request.max_daily_minutes
+
+        logger.info("Configuración inicial",
+                   hora_inicio=self.minutes_to_time_str(request.start_minute),
+                   hora_fin=self.minutes_to_time_str(request.end_minute),
+                   horas_min=horas_min_diaria // 60,
+                   horas_max=horas_max_diaria // 60)
+
+        # Modelo
+        model = cp_model.CpModel()
+
+        # Variables
+        interval_length = options.slotMinutes  # bloques de 15 minutos por defecto
+        num_slots = request.num_slots(interval_length)
+        logger.info(f"Número de slots calculados: {num_slots}")
+
+        # Filtrar días activos
+        active_days_idx = request.active_days
+        logger.info(f"Días activos: {[self.DAYS[i] for i in active_days_idx]}")
+
+        # Máscaras de disponibilidad: restricciones, ventanas obligatorias y ventana del equipo
+        masks = self.build_slot_masks(request, num_slots, interval_length)
+        team_request, members = request, None
+        if options.mergeIdenticalWorkers:
+            request, masks, members = self._merge_identical_workers(request, masks)
+            worker_ids = request.worker_ids
+        if neighbourhood is not None:
+            # Vecindario restringido: solo slots cercanos a los trabajados en la solución de referencia
+            reference, radius_minutes = neighbourhood
+            worked = self._schedule_slots(worker_ids, reference, hora_inicio_act, interval_length, num_slots)
+            masks = masks._replace(available=masks.available & dilate_slots(worked, radius_minutes // interval_length))
+        if fixed_days is not None:
+            # Días fijos: solo hay variable en los slots trabajados, y se fuerzan a 1 más abajo
+            days, worked = fixed_days
+            available = masks.available.copy()
+            available[:, days] &= worked[:, days]
+            masks = masks._replace(available=available)
+        blocked: Dict[str, np.ndarray] = {}
+        if explain:
+            masks, blocked = self._explanation_masks(request, masks, num_slots, interval_length)
+        logger.info("Máscaras de disponibilidad calculadas",
+                   slots_totales=len(worker_ids) * len(active_days_idx) * num_slots,
+                   slots_disponibles=int(masks.available.sum()))
+
+        sm = ScheduleModel(model, request, active_days_idx, hora_inicio_act, interval_length, num_slots, masks)
+        if members is not None:
+            sm.team_worker_ids = team_request.worker_ids
+            sm.members = members
+            sm.weights = np.array([len(group) for group in members], dtype=np.int64)
+        if explain:
+            sm.assumptions = {}
+        work = sm.work
+
+        # Variables por trabajador, día y slot (solo para slots disponibles)
+        for t_idx in range(len(worker_ids)):
+            for d_idx in active_days_idx:
+                slots = np.flatnonzero(masks.available[t_idx, d_idx]).tolist()
+                if not slots:
+                    # Día sin slots disponibles: no se crea ninguna variable
+                    continue
+                sm.available_slots[(t_idx, d_idx)] = slots
+                for s in slots:
+                    var = model.NewBoolVar(f"work_t{t_idx}_d{d_idx}_s{s}")
+                    work[(t_idx, d_idx, s)] = var
+                    sm.work_index[t_idx, d_idx, s] = var.Index()
+        if fixed_days is not None:
+            fixed_vars = [var for (_, d_idx, _), var in work.items() if d_idx in fixed_days[0]]
+            if fixed_vars:
+                model.AddBoolAnd(fixed_vars)
+        for rule, mask in blocked.items():
+            # Slots que excluyen las restricciones o las ventanas obligatorias, prohibidos bajo el literal de la regla
+            for (t_idx, d_idx), slots in sm.available_slots.items():
+                excluded = [work[(t_idx, d_idx, s)].Not() for s in np.flatnonzero(mask[t_idx, d_idx]).tolist()]
+                if excluded:
+                    model.AddBoolAnd(excluded).OnlyEnforceIf(sm.assume(rule, t_idx, d_idx))
+
+        # Restricciones diarias con flexibilidad de ±1 hora (al explicar, los límites solo
+        # se imponen con las restricciones, no con los dominios)
+        day_limit = num_slots * interval_length if explain else horas_max_diaria + 60
+        for (t_idx, d_idx), slots in sm.available_slots.items():
+            slots_vars = [work[(t_idx, d_idx, s)] for s in slots]
+            total_minutes = model.NewIntVar(0, day_limit, f"total_minutes_t{t_idx}_d{d_idx}")
+            model.Add(total_minutes == sum(slots_vars) * interval_length)
+
+            # Variable para la desviación diaria
+            daily_deviation_up = model.NewIntVar(0, 60, f"daily_deviation_up_t{t_idx}_d{d_idx}")  # Máximo 1 hora arriba
+            daily_deviation_down = model.NewIntVar(0, 60, f"daily_deviation_down_t{t_idx}_d{d_idx}")  # Máximo 1 hora abajo
+
+            # Si hay horas trabajadas ese día (total_minutes > 0), aplicar límites con flexibilidad
+            has_work = model.NewBoolVar(f"has_work_t{t_idx}_d{d_idx}")
+            model.Add(total_minutes > 0).OnlyEnforceIf(has_work)
+            model.Add(total_minutes == 0).OnlyEnforceIf(has_work.Not())
+            sm.has_work[(t_idx, d_idx)] = has_work
+
+            # Restricción de máximo diario con flexibilidad hacia arriba
+            model.Add(total_minutes <= horas_max_diaria + daily_deviation_up).OnlyEnforceIf(
+                [has_work, *sm.assume("dailyMaximum", t_idx, d_idx)])
+
+            # Restricción de mínimo diario con flexibilidad hacia abajo
+            model.Add(total_minutes >= horas_min_diaria - daily_deviation_down).OnlyEnforceIf(
+                [has_work, *sm.assume("dailyMinimum", t_idx, d_idx)])
+
+            # Logging de las desviaciones diarias
+            logger.info(f"Configurando límites diarios flexibles para trabajador {worker_ids[t_idx]} en {self.DAYS[d_idx]}",
+                       min_diario=(horas_min_diaria - 60)/60,
+                       max_diario=(horas_max_diaria + 60)/60)
+
+        # Restricciones semanales con desviación permitida solo por debajo
+        for t_idx, worker_id in enumerate(worker_ids):
+            slots_vars = []
+            for d_idx in active_days_idx:
+                slots_vars.extend([work[(t_idx, d_idx, s)] for s in sm.available_slots.get((t_idx, d_idx), [])])
+
+            horas_semanales = int(request.weekly_minutes[t_idx])
+            week_limit = len(active_days_idx) * day_limit if explain else horas_semanales
+            total_week_minutes = model.NewIntVar(0, week_limit, f"total_week_minutes_t{t_idx}")  # Limitado a horas semanales
+            model.Add(total_week_minutes == sum(slots_vars) * interval_length)
+            sm.weekly_hours_vars.append(total_week_minutes)
+
+            min_semanal = int(horas_semanales * 0.7)  # Reducimos el mínimo al 70%
+
+            logger.info(f"Configurando restricciones semanales para trabajador {worker_id}",
+                       horas_semanales=horas_semanales,
+                       min_semanal=min_semanal)
+
+            # Variable para la desviación (solo por debajo)
+            if explain:
+                deviation = model.NewIntVar(horas_semanales - week_limit, horas_semanales, f"deviation_t{t_idx}")
+                model.Add(total_week_minutes <= horas_semanales).OnlyEnforceIf(sm.assume("weeklyMaximum", t_idx))
+            else:
                 deviation = model.NewIntVar(0, horas_semanales - min_semanal, f"deviation_t{t_idx}")
-                weekly_deviations.append(deviation)
-                
-                # La desviación ahora solo mide cuánto falta para llegar al objetivo
-                model.Add(total_week_minutes + deviation == horas_semanales)
-                
-                # Asegurar un mínimo de horas
-                model.Add(total_week_minutes >= min_semanal)
-
-            # Restricciones para detectar inicios y finales de turnos
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    for s in range(num_slots):
-                        # Detectar inicio de turno
-                        if s == 0:
-                            # Primer slot del día
-                            model.Add(shift_start[(t_idx, d_idx, s)] == work[(t_idx, d_idx, s)])
-                        else:
-                            # Un turno empieza si este slot está trabajando pero el anterior no
-                            model.AddBoolOr([
-                                shift_start[(t_idx, d_idx, s)].Not(),
-                                work[(t_idx, d_idx, s)]
-                            ])
-                            model.AddBoolOr([
-                                shift_start[(t_idx, d_idx, s)].Not(),
-                                work[(t_idx, d_idx, s-1)].Not()
-                            ])
-                            model.AddBoolAnd([
-                                work[(t_idx, d_idx, s)],
-                                work[(t_idx, d_idx, s-1)].Not()
-                            ]).OnlyEnforceIf(shift_start[(t_idx, d_idx, s)])
-                        
-                        # Detectar final de turno
-                        if s == num_slots - 1:
-                            # Último slot del día
-                            model.Add(shift_end[(t_idx, d_idx, s)] == work[(t_idx, d_idx, s)])
-                        else:
-                            # Un turno termina si este slot está trabajando pero el siguiente no
-                            model.AddBoolOr([
-                                shift_end[(t_idx, d_idx, s)].Not(),
-                                work[(t_idx, d_idx, s)]
-                            ])
-                            model.AddBoolOr([
-                                shift_end[(t_idx, d_idx, s)].Not(),
-                                work[(t_idx, d_idx, s+1)].Not()
-                            ])
-                            model.AddBoolAnd([
-                                work[(t_idx, d_idx, s)],
-                                work[(t_idx, d_idx, s+1)].Not()
-                            ]).OnlyEnforceIf(shift_end[(t_idx, d_idx, s)])
-                    
-                    # Contar número de turnos por día (número de inicios)
-                    model.Add(num_shifts_per_day[(t_idx, d_idx)] == sum(shift_start[(t_idx, d_idx, s)] for s in range(num_slots)))
-
-            # Restricciones para turnos mínimos de 1 hora (4 bloques de 15 min)
-            min_shift_blocks = 4  # 1 hora = 4 bloques de 15 minutos
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    # Para cada posible inicio de turno, si empieza debe durar al menos min_shift_blocks
-                    for s in range(num_slots - min_shift_blocks + 1):
-                        # Si hay un inicio en s, debe haber trabajo en los siguientes min_shift_blocks-1 slots
-                        for offset in range(1, min_shift_blocks):
-                            if s + offset < num_slots:
-                                model.Add(work[(t_idx, d_idx, s + offset)] == 1).OnlyEnforceIf(shift_start[(t_idx, d_idx, s)])
-                    
-                    # Para turnos que empiezan muy cerca del final del día, aplicar restricción más flexible
-                    for s in range(max(0, num_slots - min_shift_blocks + 1), num_slots):
-                        # Si hay un inicio muy cerca del final, debe trabajar hasta el final del día disponible
-                        remaining_slots = num_slots - s
-                        for offset in range(1, remaining_slots):
-                            model.Add(work[(t_idx, d_idx, s + offset)] == 1).OnlyEnforceIf(shift_start[(t_idx, d_idx, s)])
-
-            # Días obligatorios con ventanas de tiempo
-            for t_idx, t in enumerate(trabajadores):
-                dias_obligatorios = t["horarioGeneral"]["diasObligatorios"]
-                for dia_str, horario in dias_obligatorios.items():
-                    if dia_str in day_to_idx and day_to_idx[dia_str] in active_days_idx:
-                        d_idx = day_to_idx[dia_str]
-                        hora_inicio_obl = self.time_str_to_minutes(horario["horaInicio"])
-                        hora_fin_obl = self.time_str_to_minutes(horario["horaFin"])
-                        
-                        logger.info(f"Procesando día obligatorio para trabajador {t['id']}", 
-                                   dia=dia_str,
-                                   hora_inicio=horario["horaInicio"],
-                                   hora_fin=horario["horaFin"])
-                        
-                        # Variables para los slots dentro de la ventana obligatoria
-                        mandatory_slots = []
-                        for s in range(num_slots):
-                            slot_start = hora_inicio_act + s * interval_length
-                            slot_end = slot_start + interval_length
-                            if slot_start >= hora_inicio_obl and slot_end <= hora_fin_obl:
-                                mandatory_slots.append(work[(t_idx, d_idx, s)])
-                        
-                        if mandatory_slots:
-                            # Asegurar mínimo de horas en días obligatorios
-                            total_minutes = model.NewIntVar(0, hora_fin_obl - hora_inicio_obl, 
-                                                         f"total_minutes_mandatory_t{t_idx}_d{d_idx}")
-                            model.Add(total_minutes == sum(mandatory_slots) * interval_length)
-                            min_required = min(horas_min_diaria, hora_fin_obl - hora_inicio_obl)
-                            model.Add(total_minutes >= min_required)
-                            
-                            logger.info(f"Configurando mínimo para día obligatorio", 
-                                       trabajador=t['id'],
-                                       dia=dia_str,
-                                       min_required=min_required)
-                            
-                        # Prohibir trabajo fuera de la ventana obligatoria en días obligatorios
-                        for s in range(num_slots):
-                            slot_start = hora_inicio_act + s * interval_length
-                            slot_end = slot_start + interval_length
-                            if slot_end <= hora_inicio_obl or slot_start >= hora_fin_obl:
-                                model.Add(work[(t_idx, d_idx, s)] == 0)
-
-            # Restricciones horarias
-            for t_idx, t in enumerate(trabajadores):
-                restricciones = t["restricciones"]["dias"]
-                for dia_str, horas in restricciones.items():
-                    if dia_str in day_to_idx and day_to_idx[dia_str] in active_days_idx:
-                        d_idx = day_to_idx[dia_str]
-                        restr_inicio = self.time_str_to_minutes(horas["horaInicio"])
-                        restr_fin = self.time_str_to_minutes(horas["horaFin"])
-                        
-                        logger.info(f"Aplicando restricción horaria", 
-                                   trabajador=t['id'],
-                                   dia=dia_str,
-                                   inicio=horas["horaInicio"],
-                                   fin=horas["horaFin"])
-                        
-                        for s in range(num_slots):
-                            slot_start = hora_inicio_act + s * interval_length
-                            slot_end = slot_start + interval_length
-                            if not (slot_end <= restr_inicio or slot_start >= restr_fin):
-                                model.Add(work[(t_idx, d_idx, s)] == 0)
-
-            # Preferencias
-            preference_literals = []
-            for t_idx, t in enumerate(trabajadores):
-                preferencias = t["preferencias"]["dias"]
-                for dia_str, horas in preferencias.items():
-                    if dia_str in day_to_idx and day_to_idx[dia_str] in active_days_idx:
-                        d_idx = day_to_idx[dia_str]
-                        pref_inicio = self.time_str_to_minutes(horas["horaInicio"])
-                        pref_fin = self.time_str_to_minutes(horas["horaFin"])
-                        
-                        logger.info(f"Procesando preferencia", 
-                                   trabajador=t['id'],
-                                   dia=dia_str,
-                                   inicio=horas["horaInicio"],
-                                   fin=horas["horaFin"])
-                        
-                        for s in range(num_slots):
-                            slot_start = hora_inicio_act + s * interval_length
-                            slot_end = slot_start + interval_length
-                            if slot_start >= pref_inicio and slot_end <= pref_fin:
-                                preference_literals.append(work[(t_idx, d_idx, s)])
-
-            # Función objetivo: minimizar desviaciones, maximizar preferencias y minimizar fragmentación
-            logger.info(f"Número de preferencias a optimizar: {len(preference_literals) if preference_literals else 0}")
-            
-            # Pesos para diferentes objetivos
-            preference_weight = 1
-            deviation_weight = 10  # Mayor peso para minimizar desviaciones
-            fragmentation_weight = 15  # Penalizar mucho la fragmentación
-            
-            objective_terms = []
-            
-            # Añadir términos de preferencia (positivos)
-            if preference_literals:
-                for pref in preference_literals:
-                    objective_terms.append(preference_weight * pref)
-            
-            # Añadir términos de desviación (negativos)
-            for dev in weekly_deviations:
-                objective_terms.append(-deviation_weight * dev)
-            
-            # Añadir términos de anti-fragmentación (negativos - penalizar múltiples turnos por día)
-            for t_idx, t in enumerate(trabajadores):
-                for d_idx in active_days_idx:
-                    # Penalizar cada turno adicional después del primero
-                    # Si hay 1 turno = 0 penalización, 2 turnos = -15, 3 turnos = -30, etc.
-                    penalty_var = model.NewIntVar(0, num_slots * fragmentation_weight, f"frag_penalty_t{t_idx}_d{d_idx}")
-                    # penalty = max(0, (num_shifts - 1) * fragmentation_weight)
-                    shifts_minus_one = model.NewIntVar(-1, num_slots - 1, f"shifts_minus_one_t{t_idx}_d{d_idx}")
-                    model.Add(shifts_minus_one == num_shifts_per_day[(t_idx, d_idx)] - 1)
-                    model.AddMaxEquality(penalty_var, [0, shifts_minus_one * fragmentation_weight])
-                    objective_terms.append(-penalty_var)
-            
-            logger.info(f"Configurando función objetivo con {len(objective_terms)} términos")
-            model.Maximize(sum(objective_terms))
+            sm.weekly_deviations.append(deviation)
+
+            # La desviación ahora solo mide cuánto falta para llegar al objetivo
+            model.Add(total_week_minutes + deviation == horas_semanales)
+
+            # Asegurar un mínimo de horas
+            model.Add(total_week_minutes >= min_semanal).OnlyEnforceIf(sm.assume("weeklyMinimum", t_idx))
+
+        # Estructura de turnos: contigüidad, duración mínima y fragmentación
+        if options.formulation == "compact":
+            fragmentation_penalties = self._add_compact_shift_constraints(sm)
+        else:
+            fragmentation_penalties = self._add_classic_shift_constraints(sm)
+
+        # Días obligatorios con ventanas de tiempo (el trabajo fuera de la ventana ya
+        # quedó excluido por la máscara de disponibilidad)
+        for t_idx, worker_id in enumerate(worker_ids):
+            for d_idx in active_days_idx:
+                if not masks.mandatory_day[t_idx, d_idx]:
+                    continue
+                dia_str = self.DAYS[d_idx]
+                window_length = int(masks.mandatory_length[t_idx, d_idx])
+
+                logger.info(f"Procesando día obligatorio para trabajador {worker_id}",
+                           dia=dia_str,
+                           minutos_ventana=window_length)
+
+                mandatory_slots = np.flatnonzero(masks.mandatory[t_idx, d_idx]).tolist()
+                if mandatory_slots:
+                    # Asegurar mínimo de horas en días obligatorios; los slots restringidos
+                    # no tienen variable y cuentan como no trabajados
+                    mandatory_vars = [work[(t_idx, d_idx, s)] for s in mandatory_slots if (t_idx, d_idx, s) in work]
+                    total_minutes = model.NewIntVar(0, window_length,
+                                                 f"total_minutes_mandatory_t{t_idx}_d{d_idx}")
+                    model.Add(total_minutes == sum(mandatory_vars) * interval_length)
+                    min_required = min(horas_min_diaria, window_length)
+                    model.Add(total_minutes >= min_required).OnlyEnforceIf(sm.assume("mandatoryDay", t_idx, d_idx))
+
+                    logger.info(f"Configurando mínimo para día obligatorio",
+                               trabajador=worker_id,
+                               dia=dia_str,
+                               min_required=min_required)
+
+        # Preferencias
+        preference_literals = []
+        preferred = masks.preferred & masks.available
+        for (t_idx, d_idx) in sm.available_slots:
+            for s in np.flatnonzero(preferred[t_idx, d_idx]).tolist():
+                preference_literals.append((t_idx, work[(t_idx, d_idx, s)]))
+
+        # Función objetivo: minimizar desviaciones, maximizar preferencias y minimizar fragmentación
+        logger.info(f"Número de preferencias a optimizar: {len(preference_literals) if preference_literals else 0}")
+
+        objective_terms = []
+
+        # Añadir términos de preferencia (positivos), en unidades de 15 minutos para que el
+        # objetivo sea comparable entre granularidades. Cada término pesa por los trabajadores
+        # que representa, así el objetivo es el del equipo completo
+        weights = sm.weights.tolist()
+        preference_weight = self.PREFERENCE_WEIGHT * interval_length // 15
+        if preference_literals:
+            for t_idx, pref in preference_literals:
+                objective_terms.append(preference_weight * weights[t_idx] * pref)
+
+        # Añadir términos de desviación (negativos)
+        for t_idx, dev in enumerate(sm.weekly_deviations):
+            objective_terms.append(-self.DEVIATION_WEIGHT * weights[t_idx] * dev)
+
+        # Añadir términos de anti-fragmentación (negativos - penalizar múltiples turnos por día)
+        for (t_idx, _), penalty_var in fragmentation_penalties.items():
+            objective_terms.append(-weights[t_idx] * penalty_var)
+
+        logger.info(f"Configurando función objetivo con {len(objective_terms)} términos")
+        model.Maximize(sum(objective_terms))
+        return sm
+
+    @staticmethod
+    def _min_shift_blocks(interval_length: int) -> int:
+        # 1 hora = 4 bloques de 15 minutos
+        return max(1, -(-60 // interval_length))
+
+    def _add_classic_shift_constraints(self, sm: ScheduleModel) -> Dict[Tuple[int, int], cp_model.IntVar]:
+        """
+        Per-slot start/end reification. A worker may split a day into several shifts,
+        each penalized after the first.
+        """
+        model, work, num_slots = sm.model, sm.work, sm.num_slots
+        shift_start = {}
+        shift_end = {}
+
+        # Restricciones para detectar inicios y finales de turnos.
+        # Un slot no disponible equivale a un slot sin trabajo, así que las cláusulas
+        # que lo mencionan son constantes y se omiten.
+        for (t_idx, d_idx), slots in sm.available_slots.items():
+            for s in slots:
+                # Detectar inicio de turno
+                if (t_idx, d_idx, s - 1) not in work:
+                    # Primer slot del día o precedido por un slot no disponible
+                    shift_start[(t_idx, d_idx, s)] = work[(t_idx, d_idx, s)]
+                else:
+                    shift_start[(t_idx, d_idx, s)] = model.NewBoolVar(f"start_t{t_idx}_d{d_idx}_s{s}")
+                    # Un turno empieza si y solo si este slot está trabajando pero el anterior no
+                    model.AddBoolOr([
+                        shift_start[(t_idx, d_idx, s)].Not(),
+                        work[(t_idx, d_idx, s)]
+                    ])
+                    model.AddBoolOr([
+                        shift_start[(t_idx, d_idx, s)].Not(),
+                        work[(t_idx, d_idx, s-1)].Not()
+                    ])
+                    model.AddBoolOr([
+                        shift_start[(t_idx, d_idx, s)],
+                        work[(t_idx, d_idx, s)].Not(),
+                        work[(t_idx, d_idx, s-1)]
+                    ])
+
+                # Detectar final de turno
+                if (t_idx, d_idx, s + 1) not in work:
+                    # Último slot del día o seguido por un slot no disponible
+                    shift_end[(t_idx, d_idx, s)] = work[(t_idx, d_idx, s)]
+                else:
+                    shift_end[(t_idx, d_idx, s)] = model.NewBoolVar(f"end_t{t_idx}_d{d_idx}_s{s}")
+                    # Un turno termina si este slot está trabajando pero el siguiente no
+                    model.AddBoolOr([
+                        shift_end[(t_idx, d_idx, s)].Not(),
+                        work[(t_idx, d_idx, s)]
+                    ])
+                    model.AddBoolOr([
+                        shift_end[(t_idx, d_idx, s)].Not(),
+                        work[(t_idx, d_idx, s+1)].Not()
+                    ])
+                    model.AddBoolAnd([
+                        work[(t_idx, d_idx, s)],
+                        work[(t_idx, d_idx, s+1)].Not()
+                    ]).OnlyEnforceIf(shift_end[(t_idx, d_idx, s)])
+
+            # Contar número de turnos por día (número de inicios)
+            num_shifts = model.NewIntVar(0, num_slots, f"num_shifts_t{t_idx}_d{d_idx}")
+            model.Add(num_shifts == sum(shift_start[(t_idx, d_idx, s)] for s in slots))
+            sm.num_shifts_per_day[(t_idx, d_idx)] = num_shifts
+
+        # Restricciones para turnos mínimos de 1 hora (4 bloques de 15 min)
+        min_shift_blocks = self._min_shift_blocks(sm.interval_length)
+        for (t_idx, d_idx), slots in sm.available_slots.items():
+            for s in slots:
+                start = shift_start[(t_idx, d_idx, s)]
+                if s < num_slots - min_shift_blocks + 1:
+                    # Si hay un inicio en s, debe haber trabajo en los siguientes min_shift_blocks-1 slots
+                    required = range(s + 1, s + min_shift_blocks)
+                else:
+                    # Si hay un inicio muy cerca del final, debe trabajar hasta el final del día disponible
+                    required = range(s + 1, num_slots)
+                for s_next in required:
+                    if (t_idx, d_idx, s_next) in work:
+                        model.Add(work[(t_idx, d_idx, s_next)] == 1).OnlyEnforceIf(
+                            [start, *sm.assume("minimumShift", t_idx, d_idx)])
+                    else:
+                        # El turno chocaría con un slot no disponible: no puede empezar aquí
+                        model.Add(start == 0).OnlyEnforceIf(sm.assume("minimumShift", t_idx, d_idx))
+                        break
+
+        penalties: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        for (t_idx, d_idx) in sm.available_slots:
+            # Penalizar cada turno adicional después del primero
+            # Si hay 1 turno = 0 penalización, 2 turnos = -15, 3 turnos = -30, etc.
+            penalty_var = model.NewIntVar(0, num_slots * self.FRAGMENTATION_WEIGHT, f"frag_penalty_t{t_idx}_d{d_idx}")
+            # penalty = max(0, (num_shifts - 1) * fragmentation_weight)
+            shifts_minus_one = model.NewIntVar(-1, num_slots - 1, f"shifts_minus_one_t{t_idx}_d{d_idx}")
+            model.Add(shifts_minus_one == sm.num_shifts_per_day[(t_idx, d_idx)] - 1)
+            model.AddMaxEquality(penalty_var, [0, shifts_minus_one * self.FRAGMENTATION_WEIGHT])
+            penalties[(t_idx, d_idx)] = penalty_var
+        return penalties
+
+    def _add_compact_shift_constraints(self, sm: ScheduleModel) -> Dict[Tuple[int, int], cp_model.IntVar]:
+        """
+        One start literal per slot, one linear minimum-length row per start and a
+        linear fragmentation penalty. Same rules and optimum as the classic
+        formulation, without end variables, shift counters or max-equalities.
+        """
+        model, work, num_slots = sm.model, sm.work, sm.num_slots
+        min_shift_blocks = self._min_shift_blocks(sm.interval_length)
+        penalties: Dict[Tuple[int, int], cp_model.IntVar] = {}
+
+        for (t_idx, d_idx), slots in sm.available_slots.items():
+            starts = []
+            for s in slots:
+                if (t_idx, d_idx, s - 1) not in work:
+                    # Primer slot del día o precedido por un slot no disponible
+                    start = work[(t_idx, d_idx, s)]
+                else:
+                    # start <=> work[s] and not work[s-1]
+                    start = model.NewBoolVar(f"start_t{t_idx}_d{d_idx}_s{s}")
+                    model.AddBoolOr([start, work[(t_idx, d_idx, s)].Not(), work[(t_idx, d_idx, s-1)]])
+                    model.AddImplication(start, work[(t_idx, d_idx, s)])
+                    model.AddImplication(start, work[(t_idx, d_idx, s-1)].Not())
+                starts.append(start)
+
+                # Duración mínima: 1 hora, o hasta el final del día si empieza muy cerca del final
+                required = range(s + 1, min(s + min_shift_blocks, num_slots))
+                if all((t_idx, d_idx, s_next) in work for s_next in required):
+                    if required:
+                        model.Add(sum(work[(t_idx, d_idx, s_next)] for s_next in required) >= len(required) * start
+                                  ).OnlyEnforceIf(sm.assume("minimumShift", t_idx, d_idx))
+                else:
+                    # El turno chocaría con un slot no disponible: no puede empezar aquí
+                    model.Add(start == 0).OnlyEnforceIf(sm.assume("minimumShift", t_idx, d_idx))
+
+            # Turnos del día = número de inicios
+            num_shifts = sum(starts)
+            sm.num_shifts_per_day[(t_idx, d_idx)] = num_shifts
+
+            # penalty == max(0, num_shifts - 1) * fragmentation_weight sin AddMaxEquality: un día
+            # con trabajo tiene al menos un inicio, así que num_shifts - has_work nunca es negativo.
+            # Con igualdad, el objetivo de una solución FEASIBLE es el del horario devuelto
+            penalty_var = model.NewIntVar(0, num_slots * self.FRAGMENTATION_WEIGHT, f"frag_penalty_t{t_idx}_d{d_idx}")
+            model.Add(penalty_var == (num_shifts - sm.has_work[(t_idx, d_idx)]) * self.FRAGMENTATION_WEIGHT)
+            penalties[(t_idx, d_idx)] = penalty_var
+        return penalties
+
+    def _configure_solver(self, options: Optional[SolveOptions] = None) -> cp_model.CpSolver:
+        options = options or SolveOptions()
+        time_limit, num_workers, relative_gap = self.TIERS[options.tier]
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = options.timeLimit or time_limit
+        solver.parameters.num_search_workers = num_workers
+        solver.parameters.relative_gap_limit = options.relativeGap if options.relativeGap is not None else relative_gap
+        return solver
+
+    def _solver_info(self, solver: cp_model.CpSolver, status: int, options: Optional[SolveOptions] = None,
+                     objective: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Summarizes the solve and which stop criterion ended it. `objective` is the
+        value of the returned schedule, when it was recomputed from it.
+        """
+        options = options or SolveOptions()
+        found = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+        if found and objective is None:
+            objective = solver.ObjectiveValue()
+        bound = solver.BestObjectiveBound() if found else None
+        gap = abs(bound - objective) / max(1.0, abs(objective)) if found else None
+
+        if status == cp_model.OPTIMAL:
+            # CP-SAT reporta OPTIMAL también cuando se alcanza el gap relativo
+            stop_reason = "optimal" if gap == 0 else "relative_gap"
+        elif status == cp_model.INFEASIBLE or status == cp_model.MODEL_INVALID:
+            stop_reason = "infeasible"
+        elif solver.WallTime() < solver.parameters.max_time_in_seconds * 0.99:
+            stop_reason = "stopped"
+        else:
+            stop_reason = "time_limit"
+
+        return {
+            "status": solver.StatusName(status),
+            "stopReason": stop_reason,
+            "tier": options.tier,
+            "timeLimit": solver.parameters.max_time_in_seconds,
+            "relativeGapLimit": solver.parameters.relative_gap_limit,
+            "numWorkers": solver.parameters.num_search_workers,
+            "objective": objective,
+            "bestBound": bound,
+            "relativeGap": round(gap, 6) if gap is not None else None,
+            "wallTime": round(solver.WallTime(), 3),
+        }
+
+    @staticmethod
+    def _work_grid(sm: ScheduleModel, solver: Any) -> np.ndarray:
+        """
+        Reads every work literal of the solution in one bulk call into a boolean
+        (worker, day, slot) array. `solver` is a CpSolver after Solve or a solution
+        callback during the search.
+        """
+        response = solver.Response() if isinstance(solver, cp_model.CpSolverSolutionCallback) else solver.ResponseProto()
+        values = np.asarray(response.solution, dtype=np.int64)
+        has_var = sm.work_index >= 0
+        grid = np.zeros(sm.work_index.shape, dtype=bool)
+        grid[has_var] = values[sm.work_index[has_var]] == 1
+        return grid
+
+    @staticmethod
+    def _shift_runs(grid: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        Run-length decodes a (days, workers, slots) grid: returns the day, worker,
+        first slot and end slot (exclusive) of every run of worked slots, ordered by
+        day, worker and start.
+        """
+        padded = np.zeros(grid.shape[:2] + (grid.shape[2] + 2,), dtype=np.int8)
+        padded[:, :, 1:-1] = grid
+        edges = np.diff(padded, axis=2)
+        days, workers, starts = np.nonzero(edges == 1)
+        ends = np.nonzero(edges == -1)[2]
+        return days, workers, starts, ends
+
+    def _log_summary(self, sm: ScheduleModel, grid: np.ndarray) -> None:
+        # Logging de las horas asignadas y fragmentación, derivado de la rejilla de slots trabajados
+        assigned = grid.sum(axis=(1, 2)) * sm.interval_length
+        shifts_per_day = np.count_nonzero(np.diff(grid.astype(np.int8), axis=2, prepend=0) == 1, axis=2)
+        for t_idx, worker_id in enumerate(sm.request.worker_ids):
+            total_assigned = int(assigned[t_idx])
+            target_hours = int(sm.request.weekly_minutes[t_idx])
+            total_shifts = int(shifts_per_day[t_idx].sum())
+            days_working = int(np.count_nonzero(shifts_per_day[t_idx]))
+
+            logger.info(f"Resumen para trabajador {worker_id}",
+                       horas_objetivo=target_hours/60,
+                       horas_asignadas=total_assigned/60,
+                       horas_faltantes=(target_hours - total_assigned)/60,
+                       dias_trabajando=days_working,
+                       turnos_totales=total_shifts,
+                       promedio_turnos_por_dia=round(total_shifts/max(days_working, 1), 2))
+
+    def _extract_schedule(self, sm: ScheduleModel, solver: Any,
+                          grid: Optional[np.ndarray] = None) -> Dict[str, List[Dict[str, str]]]:
+        if grid is None:
+            grid = self._work_grid(sm, solver)
+        worker_ids = sm.request.worker_ids
+        if sm.members is not None:
+            # Cada trabajador modelado transmite sus turnos a todos los que representa
+            owner = np.empty(len(sm.team_worker_ids), dtype=np.int64)
+            for t_idx, group in enumerate(sm.members):
+                owner[group] = t_idx
+            grid, worker_ids = grid[owner], sm.team_worker_ids
+        return self._grid_schedule(grid, worker_ids, sm.active_days_idx, sm.hora_inicio_act, sm.interval_length)
+
+    def _grid_schedule(self, grid: np.ndarray, worker_ids: List[str], active_days_idx: List[int],
+                       hora_inicio_act: int, interval_length: int) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Converts a (worker, day, slot) grid of worked slots into a commonSchedule,
+        ordered by day, worker and start time.
+        """
+        # Turnos como dicts planos: la respuesta se serializa una sola vez, sin modelos por turno
+        days, workers, starts, ends = self._shift_runs(grid.transpose(1, 0, 2))
+        times = [self.minutes_to_time_str(hora_inicio_act + k * interval_length)
+                 for k in range(grid.shape[2] + 1)]
+
+        common_schedule: Dict[str, List[Dict[str, str]]] = {}
+        day_bounds = np.searchsorted(days, np.arange(NUM_DAYS + 1))
+        for d_idx in active_days_idx:
+            lo, hi = day_bounds[d_idx], day_bounds[d_idx + 1]
+            if lo == hi:
+                continue  # Only add days with shifts
+            common_schedule[self.DAYS[d_idx]] = [
+                {"workerId": worker_ids[t_idx], "startTime": times[start], "endTime": times[end]}
+                for t_idx, start, end in zip(workers[lo:hi].tolist(), starts[lo:hi].tolist(), ends[lo:hi].tolist())
+            ]
+            logger.info("Turnos generados", dia=self.DAYS[d_idx], num_turnos=int(hi - lo),
+                        trabajadores=len(np.unique(workers[lo:hi])))
+        return common_schedule
+
+    def _schedule_slots(self, worker_ids: List[str], schedule: Dict[str, List[Dict[str, Any]]],
+                        hora_inicio_act: int, interval_length: int, num_slots: int) -> np.ndarray:
+        """
+        Maps a commonSchedule onto a (workers, 7, slots) mask of worked slots. Slots
+        partly covered by a shift count as worked, so any granularity can be mapped.
+        """
+        day_to_idx = {d: i for i, d in enumerate(self.DAYS)}
+        worker_idx = {worker_id: t_idx for t_idx, worker_id in enumerate(worker_ids)}
+        worked = np.zeros((len(worker_ids), NUM_DAYS, num_slots), dtype=bool)
+        for dia_str, shifts in schedule.items():
+            d_idx = day_to_idx.get(dia_str)
+            if d_idx is None:
+                continue
+            for shift in shifts:
+                t_idx = worker_idx.get(shift["workerId"])
+                if t_idx is None:
+                    continue
+                first = (self.time_str_to_minutes(shift["startTime"]) - hora_inicio_act) // interval_length
+                last = -(-(self.time_str_to_minutes(shift["endTime"]) - hora_inicio_act) // interval_length)
+                worked[t_idx, d_idx, max(first, 0):max(min(last, num_slots), 0)] = True
+        return worked
+
+    def _add_hints(self, sm: ScheduleModel, previous_schedule: Dict[str, List[Dict[str, Any]]]) -> None:
+        worked = self._schedule_slots(sm.request.worker_ids, previous_schedule, sm.hora_inicio_act,
+                                      sm.interval_length, sm.num_slots)
+        self._add_grid_hints(sm, worked)
+
+    def _add_grid_hints(self, sm: ScheduleModel, worked: np.ndarray) -> None:
+        # Pista slot a slot desde una rejilla (trabajadores modelados, día, slot); solo para trabajadores con turnos
+        hinted_workers = worked.any(axis=(1, 2))
+        for key, var in sm.work.items():
+            if hinted_workers[key[0]]:
+                sm.model.AddHint(var, bool(worked[key]))
+        logger.info("Solución previa usada como punto de partida",
+                   trabajadores=int(hinted_workers.sum()),
+                   slots_trabajados=int(worked.sum()))
+
+    def solve_schedule(self, input_data: RequestData, options: Optional[SolveOptions] = None,
+                       on_solution: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       stop_event: Optional[Any] = None,
+                       hints: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+                       neighbourhood: Optional[Tuple[Dict[str, List[Dict[str, Any]]], int]] = None,
+                       check_feasibility: bool = True) -> Dict[str, Any]:
+        """
+        Builds and solves the schedule model. When `on_solution` is given it receives
+        every improving solution (schedule, objective and bound) as the search runs.
+        `hints` is a previous commonSchedule used to warm-start the search and
+        `neighbourhood` restricts the search around one (see build_model).
+        With `check_feasibility`, requests that fail the capacity pre-check are rejected
+        without a search and a proven infeasibility comes with its conflicting rules.
+        """
+        check_feasibility = check_feasibility and neighbourhood is None
+        try:
+            if check_feasibility:
+                input_data = compile_request(input_data)
+                rejected = self.check_capacity(input_data, options)
+                if rejected is not None:
+                    return rejected
+            if options is not None and options.multiResolution:
+                return self.solve_multiresolution(input_data, options, on_solution, stop_event, hints)
+            if neighbourhood is None:
+                input_data = compile_request(input_data)
+                use_lns = (options.lns if options is not None and options.lns is not None
+                           else input_data.num_workers >= self.LNS_MIN_WORKERS)
+                if use_lns:
+                    return self.solve_lns(input_data, options or SolveOptions(), on_solution, stop_event, hints)
+
+            build_started = time.perf_counter()
+            sm = self.build_model(input_data, options, neighbourhood)
+            if hints:
+                self._add_hints(sm, hints)
+            build_seconds = time.perf_counter() - build_started
 
             # Resolver
-            solver = cp_model.CpSolver()
-            solver.parameters.max_time_in_seconds = 60.0  # Límite de tiempo de 60 segundos para mejores soluciones
-            solver.parameters.num_search_workers = 4  # Usar múltiples hilos para acelerar la búsqueda
-            logger.info("Iniciando resolución del modelo")
-            status = solver.Solve(model)
-            logger.info(f"Estado de la resolución: {status}")
+            solver = self._configure_solver(options)
+            logger.info("Iniciando resolución del modelo",
+                       tier=(options or SolveOptions()).tier,
+                       limite_tiempo=solver.parameters.max_time_in_seconds,
+                       hilos=solver.parameters.num_search_workers)
+            solve_started = time.perf_counter()
+            if on_solution is not None:
+                status = solver.Solve(sm.model, SolutionStreamer(self, sm, on_solution, stop_event))
+            else:
+                status = solver.Solve(sm.model)
+            solve_seconds = time.perf_counter() - solve_started
+
+            # El objetivo se recalcula desde el horario devuelto: en paradas FEASIBLE,
+            # ObjectiveValue() puede no corresponder a los valores de la solución reportada
+            found = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+            grid = self._work_grid(sm, solver) if found else None
+            objective = self._schedule_objective(sm, grid) if found else None
+            solver_info = {**self._solver_info(solver, status, options, objective), **sm.size()}
+            if sm.members is not None:
+                solver_info["modelledWorkers"] = sm.request.num_workers
+            solver_info["phaseSeconds"] = {"build": round(build_seconds, 4), "solve": round(solve_seconds, 4)}
+            logger.info(f"Estado de la resolución: {status}", **solver_info)
 
-            if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+            if found:
                 logger.info("Solución encontrada, procesando resultados")
-                
-                # Logging de las horas asignadas y fragmentación
-                for t_idx, t in enumerate(trabajadores):
-                    total_assigned = solver.Value(weekly_hours_vars[t_idx])
-                    deviation = solver.Value(weekly_deviations[t_idx])
-                    target_hours = t["horarioGeneral"]["horasSemanales"] * 60
-                    
-                    # Calcular fragmentación total
-                    total_shifts = sum(solver.Value(num_shifts_per_day[(t_idx, d_idx)]) for d_idx in active_days_idx)
-                    days_working = sum(1 for d_idx in active_days_idx if solver.Value(num_shifts_per_day[(t_idx, d_idx)]) > 0)
-                    
-                    logger.info(f"Resumen para trabajador {t['id']}", 
-                               horas_objetivo=target_hours/60,
-                               horas_asignadas=total_assigned/60,
-                               horas_faltantes=deviation/60,
-                               dias_trabajando=days_working,
-                               turnos_totales=total_shifts,
-                               promedio_turnos_por_dia=round(total_shifts/max(days_working, 1), 2))
-                
-                # Initialize response structure
-                common_schedule: Dict[str, List[WorkerShift]] = {}
-                
-                # Process results for each active day
-                for d_idx in active_days_idx:
-                    dia_nombre = self.DAYS[d_idx]
-                    day_shifts: List[WorkerShift] = []
-                    
-                    # Process each worker's schedule for this day
-                    for t_idx, t in enumerate(trabajadores):
-                        bloques_trabajados = []
-                        for s in range(num_slots):
-                            if solver.Value(work[(t_idx, d_idx, s)]) == 1:
-                                bloques_trabajados.append(s)
-                                
-                        if bloques_trabajados:
-                            # Group consecutive blocks
-                            bloques_trabajados.sort()
-                            intervals = []
-                            start = bloques_trabajados[0]
-                            prev = start
-                            
-                            for b in bloques_trabajados[1:]:
-                                if b == prev + 1:
-                                    prev = b
-                                else:
-                                    intervals.append((start, prev))
-                                    start = b
-                                    prev = b
-                            intervals.append((start, prev))
-                            
-                            # Convert blocks to time intervals
-                            for (inicio, fin) in intervals:
-                                start_time = self.minutes_to_time_str(hora_inicio_act + inicio * interval_length)
-                                end_time = self.minutes_to_time_str(hora_inicio_act + (fin + 1) * interval_length)
-                                
-                                day_shifts.append(WorkerShift(
-                                    workerId=t["id"],
-                                    startTime=start_time,
-                                    endTime=end_time
-                                ))
-                                
-                            logger.info(f"Turnos generados para trabajador", 
-                                       trabajador=t['id'],
-                                       dia=dia_nombre,
-                                       num_turnos=len(intervals))
-                    
-                    if day_shifts:  # Only add days with shifts
-                        common_schedule[dia_nombre] = day_shifts
-                
-                logger.info("Proceso completado exitosamente")
-                return {"commonSchedule": common_schedule}
+                extract_started = time.perf_counter()
+                self._log_summary(sm, grid)
+                common_schedule = self._extract_schedule(sm, solver, grid)
+                solver_info["phaseSeconds"]["extract"] = round(time.perf_counter() - extract_started, 4)
+                logger.info("Proceso completado exitosamente", fases=solver_info["phaseSeconds"])
+                return {"commonSchedule": common_schedule, "solverInfo": solver_info}
             else:
                 logger.error("No se pudo encontrar una solución factible", status=status)
-                return {"error": "No se pudo encontrar una solución factible."}
-                
+                result = {"error": "No se pudo encontrar una solución factible.", "solverInfo": solver_info}
+                if status == cp_model.INFEASIBLE and check_feasibility:
+                    explain_started = time.perf_counter()
+                    conflicts = self.explain_infeasibility(input_data, options)
+                    solver_info["phaseSeconds"]["explain"] = round(time.perf_counter() - explain_started, 4)
+                    if conflicts:
+                        result.update({"error": self.INFEASIBLE_ERROR, "conflicts": conflicts})
+                return result
+
         except Exception as e:
             logger.error("Error al resolver el horario", error=str(e))
-            return {"error": f"Error al resolver el horario: {str(e)}"} 
\ No newline at end of file
+            return {"error": f"Error al resolver el horario: {str(e)}"}
+
+    def check_capacity(self, request: CompiledRequest, options: Optional[SolveOptions] = None) -> Optional[Dict[str, Any]]:
+        """
+        Arithmetic pre-check of every worker's workable minutes against the daily,
+        weekly and mandatory-day rules at the requested slot size. Returns the error
+        result of a request no schedule can satisfy, or None.
+        """
+        options = options or SolveOptions()
+        started = time.perf_counter()
+        interval_length = options.slotMinutes
+        masks = self.build_slot_masks(request, request.num_slots(interval_length), interval_length)
+        bounds = capacity_bounds(request, masks, interval_length, self._min_shift_blocks(interval_length))
+        conflicts = capacity_conflicts(request, bounds)
+        if not conflicts:
+            return None
+        seconds = time.perf_counter() - started
+        time_limit, num_workers, relative_gap = self.TIERS[options.tier]
+        logger.error("Petición sin solución por capacidad",
+                    conflictos=len(conflicts),
+                    trabajadores=len({conflict["workerId"] for conflict in conflicts}),
+                    segundos=round(seconds, 4))
+        return {
+            "error": self.INFEASIBLE_ERROR,
+            "conflicts": conflicts,
+            "solverInfo": {
+                "status": "INFEASIBLE",
+                "stopReason": "capacity_check",
+                "tier": options.tier,
+                "timeLimit": options.timeLimit or time_limit,
+                "relativeGapLimit": options.relativeGap if options.relativeGap is not None else relative_gap,
+                "numWorkers": num_workers,
+                "wallTime": round(seconds, 3),
+                "phaseSeconds": {"precheck": round(seconds, 4)},
+            },
+        }
+
+    def explain_infeasibility(self, input_data: RequestData, options: Optional[SolveOptions] = None) -> List[Dict[str, Any]]:
+        """
+        Finds a minimal set of rules that cannot hold together. Rules of different
+        workers never interact, so every such set belongs to one worker: workers are
+        checked one at a time (one per group of identical workers) and the first
+        infeasible one is explained, tightest capacity first. Returns [] if none is found
+        within EXPLAIN_SECONDS.
+        """
+        request = compile_request(input_data)
+        options = options or SolveOptions()
+        deadline = time.perf_counter() + self.EXPLAIN_SECONDS
+        interval_length = options.slotMinutes
+        masks = self.build_slot_masks(request, request.num_slots(interval_length), interval_length)
+        representatives, masks, _ = self._merge_identical_workers(request, masks)
+        bounds = capacity_bounds(representatives, masks, interval_length, self._min_shift_blocks(interval_length))
+        for t_idx in np.argsort(capacity_slack(bounds, representatives), kind="stable").tolist():
+            if time.perf_counter() >= deadline:
+                break
+            conflicts = self._explain_worker(representatives.select(np.array([t_idx])), options, deadline)
+            if conflicts:
+                logger.info("Reglas en conflicto identificadas",
+                           trabajador=representatives.worker_ids[t_idx],
+                           reglas=len(conflicts),
+                           segundos=round(self.EXPLAIN_SECONDS - (deadline - time.perf_counter()), 3))
+                return conflicts
+        logger.info("Infactibilidad sin reglas en conflicto identificadas")
+        return []
+
+    def _explain_worker(self, request: CompiledRequest, options: SolveOptions, deadline: float) -> List[Dict[str, Any]]:
+        """
+        Explains a one-worker request. Every rule is enforced by an assumption literal;
+        CP-SAT reports a subset of them that is already infeasible, which is then shrunk
+        one rule at a time while it stays infeasible. Returns [] if the worker is feasible.
+        """
+        explain_options = options.model_copy(update={
+            "mergeIdenticalWorkers": False, "multiResolution": False, "lns": False
+        })
+        sm = self.build_model(request, explain_options, explain=True)
+        sm.model.ClearObjective()
+        rules = {var.Index(): (key, var) for key, var in sm.assumptions.items()}
+
+        def infeasible_core(indices: List[int]) -> Optional[List[int]]:
+            # Supuestos que bastan para la infactibilidad, o None si hay solución o se agota el tiempo
+            sm.model.ClearAssumptions()
+            sm.model.AddAssumptions([rules[index][1] for index in indices])
+            solver = cp_model.CpSolver()
+            solver.parameters.max_time_in_seconds = max(deadline - time.perf_counter(), 0.1)
+            solver.parameters.num_search_workers = 1
+            if solver.Solve(sm.model) != cp_model.INFEASIBLE:
+                return None
+            return list(solver.SufficientAssumptionsForInfeasibility())
+
+        core = infeasible_core(list(rules))
+        if not core:
+            return []
+        for index in list(core):
+            if time.perf_counter() >= deadline:
+                break
+            if index not in core:
+                continue
+            # Si sigue siendo infactible sin esta regla, la regla sobra
+            reduced = infeasible_core([other for other in core if other != index])
+            if reduced:
+                core = reduced
+
+        conflicts = []
+        for rule, _, d_idx in sorted((rules[index][0] for index in core),
+                                     key=lambda key: (-1 if key[2] is None else key[2], key[0])):
+            conflict = {"rule": rule, "workerId": request.worker_ids[0]}
+            if d_idx is not None:
+                conflict["day"] = self.DAYS[d_idx]
+            conflicts.append(conflict)
+        return conflicts
+
+    def solve_multiresolution(self, input_data: RequestData, options: SolveOptions,
+                              on_solution: Optional[Callable[[Dict[str, Any]], None]] = None,
+                              stop_event: Optional[Any] = None,
+                              hints: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Coarse-to-fine solve: 60-minute slots first, then 30, then `slotMinutes`.
+
+        The first level is hinted with `hints`, if given. Each finer level is hinted
+        with the previous schedule and only gets variables within one coarse slot of it. If that neighbourhood yields no solution, the
+        level is solved again without the restriction. The time limit is shared
+        across levels.
+        """
+        levels = [g for g in self.RESOLUTION_LEVELS if g > options.slotMinutes] + [options.slotMinutes]
+        total_time = options.timeLimit or self.TIERS[options.tier][0]
+        started = time.perf_counter()
+        logger.info("Resolución multi-resolución", niveles=levels, limite_tiempo=total_time)
+        # Todos los niveles comparten la misma petición compilada
+        input_data = compile_request(input_data)
+
+        best: Optional[Dict[str, Any]] = None
+        history = []
+        for i, slot_minutes in enumerate(levels):
+            remaining = total_time - (time.perf_counter() - started)
+            final = i == len(levels) - 1
+            time_limit = remaining if final else total_time * self.RESOLUTION_TIME_SHARE
+            level_options = options.model_copy(update={
+                "slotMinutes": slot_minutes,
+                "multiResolution": False,
+                "timeLimit": max(time_limit, 1.0),
+            })
+
+            reference = None
+            if best is not None:
+                reference = best["commonSchedule"]
+            neighbourhood = (reference, levels[i - 1]) if reference is not None else None
+            result = self.solve_schedule(input_data, level_options, on_solution, stop_event,
+                                         hints=reference or hints, neighbourhood=neighbourhood,
+                                         check_feasibility=False)
+            if "error" in result and neighbourhood is not None:
+                logger.info("Vecindario sin solución, resolviendo el nivel completo", slot_minutes=slot_minutes)
+                remaining = total_time - (time.perf_counter() - started)
+                level_options = level_options.model_copy(update={"timeLimit": max(remaining, 1.0)})
+                result = self.solve_schedule(input_data, level_options, on_solution, stop_event, hints=reference,
+                                             check_feasibility=False)
+
+            info = result.get("solverInfo") or {}
+            history.append({
+                "slotMinutes": slot_minutes,
+                "status": info.get("status"),
+                "objective": info.get("objective"),
+                "wallTime": info.get("wallTime"),
+            })
+            if "error" not in result:
+                best = result
+            if stop_event is not None and stop_event.is_set():
+                break
+
+        if best is None:
+            return result
+        best["solverInfo"] = {
+            **best["solverInfo"],
+            "tier": options.tier,
+            "timeLimit": total_time,
+            "wallTime": round(time.perf_counter() - started, 3),
+            "resolutionLevels": history,
+        }
+        return best
+
+    def _schedule_objective(self, sm: ScheduleModel, grid: np.ndarray) -> int:
+        """
+        Solver objective of a solution grid of `sm`, with merged workers counted once
+        per member.
+        """
+        values = self._worker_objectives(grid, sm.masks, sm.request.weekly_minutes, sm.interval_length)
+        return int(np.dot(sm.weights, values))
+
+    def _worker_objectives(self, grid: np.ndarray, masks: SlotMasks, weekly_minutes: np.ndarray,
+                           interval_length: int) -> np.ndarray:
+        """
+        Per-worker value of the solver objective for a (worker, day, slot) grid, with the
+        fragmentation penalty at its minimum. Workers never interact, so the team
+        objective is the sum of these values.
+        """
+        preferred = np.count_nonzero(grid & masks.preferred, axis=(1, 2))
+        deviation = np.maximum(weekly_minutes - grid.sum(axis=(1, 2)) * interval_length, 0)
+        shifts = np.count_nonzero(np.diff(grid.astype(np.int8), axis=2, prepend=0) == 1, axis=2)
+        extra_shifts = np.maximum(shifts - 1, 0).sum(axis=1)
+        return (self.PREFERENCE_WEIGHT * interval_length // 15 * preferred
+                - self.DEVIATION_WEIGHT * deviation
+                - self.FRAGMENTATION_WEIGHT * extra_shifts)
+
+    def _solve_neighbourhood(self, request: CompiledRequest, free_day: Optional[int], incumbent: np.ndarray,
+                             hint: np.ndarray, options: SolveOptions, time_limit: float) -> Tuple[str, Optional[np.ndarray], float]:
+        """
+        Re-optimizes every worker of `request` (a neighbourhood of the team) with one
+        search thread. With `free_day`, only that day is re-optimized and the other days
+        stay as in `incumbent`. Returns the status name, the new (workers, 7, slots) grid
+        (None without a solution) and the seconds used.
+        """
+        started = time.perf_counter()
+        sub_options = options.model_copy(update={"multiResolution": False, "lns": False,
+                                                 "mergeIdenticalWorkers": False})
+        fixed_days = None
+        if free_day is not None:
+            fixed_days = ([d_idx for d_idx in request.active_days if d_idx != free_day], incumbent)
+        sm = self.build_model(request, sub_options, fixed_days=fixed_days)
+        self._add_grid_hints(sm, hint)
+
+        solver = self._configure_solver(sub_options)
+        # El tiempo de construcción cuenta contra la porción de tiempo del vecindario
+        solver.parameters.max_time_in_seconds = max(time_limit - (time.perf_counter() - started), 0.01)
+        solver.parameters.num_search_workers = 1
+        status = solver.Solve(sm.model)
+        grid = self._work_grid(sm, solver) if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None
+        return solver.StatusName(status), grid, time.perf_counter() - started
+
+    def solve_lns(self, input_data: RequestData, options: SolveOptions,
+                  on_solution: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  stop_event: Optional[Any] = None,
+                  hints: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+        """
+        Large-neighbourhood search for teams too large for one model. Starts from the
+        greedy schedule and repeatedly re-optimizes a neighbourhood while everything
+        else stays fixed: a few workers, or one day across more workers. Each round
+        solves disjoint neighbourhoods on separate processes (one per core of the tier's
+        search workers), with time slices of at most LNS_SLICE_SECONDS. The kind that
+        has been improving the objective faster is picked more often. The processes
+        belong to a pool shared by every search in this process; while it is still
+        starting, neighbourhoods are solved here one at a time, so pool startup never
+        runs past the time limit.
+
+        Workers never interact, so an OPTIMAL worker neighbourhood proves those workers
+        optimal and the search stops early once every worker is proven. `hints`, if
+        given, guide each worker's first sub-solve.
+        """
+        # Import diferido: heuristic_service importa este módulo
+        from app.services.heuristic_service import HeuristicService
+
+        started = time.perf_counter()
+        total_time = options.timeLimit or self.TIERS[options.tier][0]
+        parallel = max(1, min(self.TIERS[options.tier][1], os.cpu_count() or 1))
+        interval_length = options.slotMinutes
+        team_request = compile_request(input_data)
+        num_slots = team_request.num_slots(interval_length)
+        masks = self.build_slot_masks(team_request, num_slots, interval_length)
+        request, members = team_request, None
+        if options.mergeIdenticalWorkers:
+            request, masks, members = self._merge_identical_workers(team_request, masks)
+        weights = (np.array([len(group) for group in members], dtype=np.int64)
+                   if members is not None else np.ones(request.num_workers, dtype=np.int64))
+        num_workers = request.num_workers
+        rng = random.Random(team_request.team_id)
+
+        # Solución inicial: la heurística voraz; si falla, los trabajadores quedan pendientes
+        incumbent = np.zeros((num_workers, NUM_DAYS, num_slots), dtype=bool)
+        assigned = np.zeros(num_workers, dtype=bool)
+        greedy = HeuristicService().build_schedule(request, interval_length)
+        if "error" not in greedy:
+            incumbent = self._schedule_slots(request.worker_ids, greedy["commonSchedule"],
+                                             request.start_minute, interval_length, num_slots)
+            assigned[:] = True
+        values = self._worker_objectives(incumbent, masks, request.weekly_minutes, interval_length)
+        hint = (self._schedule_slots(request.worker_ids, hints, request.start_minute, interval_length, num_slots)
+                if hints else incumbent.copy())
+        proven = np.zeros(num_workers, dtype=bool)
+        logger.info("Búsqueda por vecindarios",
+                   trabajadores=team_request.num_workers,
+                   modelados=num_workers,
+                   inicial="heurística" if assigned.all() else "vacía",
+                   procesos=parallel,
+                   limite_tiempo=total_time)
+
+        owner = None
+        if members is not None:
+            owner = np.empty(team_request.num_workers, dtype=np.int64)
+            for t_idx, group in enumerate(members):
+                owner[group] = t_idx
+
+        def team_schedule() -> Dict[str, List[Dict[str, str]]]:
+            if owner is None:
+                return self._grid_schedule(incumbent, request.worker_ids, request.active_days,
+                                           request.start_minute, interval_length)
+            return self._grid_schedule(incumbent[owner], team_request.worker_ids, request.active_days,
+                                       request.start_minute, interval_length)
+
+        def objective() -> int:
+            return int((values * weights)[assigned].sum())
+
+        size = min(self.LNS_NEIGHBOURHOOD_WORKERS, num_workers)
+        queue: List[np.ndarray] = []
+        scores: Dict[str, Optional[float]] = {"workers": None, "day": None}
+        history: List[Dict[str, Any]] = []
+        stop_reason = "time_limit"
+        solutions = 0
+        while True:
+            remaining = total_time - (time.perf_counter() - started)
+            if proven.all():
+                stop_reason = "optimal"
+                break
+            if stop_event is not None and stop_event.is_set():
+                stop_reason = "stopped"
+                break
+            if remaining < 0.05:
+                break
+
+            # Con un solo núcleo, o mientras el pool arranca, se resuelve un vecindario por ronda aquí
+            pool = _lns_pool(parallel) if parallel > 1 else None
+            # Vecindarios disjuntos de la ronda; mientras haya trabajadores sin asignar
+            # solo se usan vecindarios de trabajadores. Sin historial, se prueban ambos
+            rounds: List[Tuple[str, np.ndarray, Optional[int]]] = []
+            used = np.zeros(num_workers, dtype=bool)
+            for _ in range(parallel if pool is not None else 1):
+                if not assigned.all():
+                    kind = "workers"
+                else:
+                    kind = max(scores, key=lambda k: (scores[k] is None, scores[k] or 0.0, rng.random()))
+                if kind == "workers":
+                    if not queue:
+                        pending = np.flatnonzero(~proven)
+                        unassigned = pending[~assigned[pending]].tolist()
+                        others = pending[assigned[pending]].tolist()
+                        order = unassigned + rng.sample(others, len(others))
+                        queue = [np.array(order[i:i + size], dtype=np.int64) for i in range(0, len(order), size)]
+                    group = queue.pop(0)
+                    group = group[~used[group] & ~proven[group]]
+                    free_day = None
+                else:
+                    candidates = np.flatnonzero(~used & ~proven).tolist()
+                    group = np.array(sorted(rng.sample(candidates, min(len(candidates), size * len(request.active_days)))),
+                                     dtype=np.int64)
+                    free_day = rng.choice(request.active_days)
+                if len(group):
+                    used[group] = True
+                    rounds.append((kind, group, free_day))
+
+            time_limit = max(min(self.LNS_SLICE_SECONDS, remaining), 0.05)
+            tasks = [(request.select(group), free_day, incumbent[group], hint[group], options, time_limit)
+                     for _, group, free_day in rounds]
+            if pool is None:
+                results = [self._solve_neighbourhood(*task) for task in tasks]
+            else:
+                try:
+                    futures = [pool.submit(_solve_lns_neighbourhood, *task) for task in tasks]
+                    results = [future.result() for future in futures]
+                except BrokenProcessPool:
+                    logger.warning("Pool de la búsqueda por vecindarios roto, se reinicia")
+                    _reset_lns_pool()
+                    continue
+                except CancelledError:
+                    # Otra búsqueda del proceso amplió el pool; se repite la ronda con el nuevo
+                    continue
+            improved = False
+            for (kind, group, free_day), (status, grid, seconds) in zip(rounds, results):
+                gain = 0
+                if grid is not None:
+                    new_values = self._worker_objectives(grid, SlotMasks(*(mask[group] for mask in masks)),
+                                                         request.weekly_minutes[group], interval_length)
+                    gain = int(((new_values - values[group]) * weights[group]).sum())
+                    if not assigned[group].all() or gain > 0:
+                        incumbent[group] = grid
+                        values[group] = new_values
+                        assigned[group] = True
+                        improved = True
+                    else:
+                        gain = 0
+                    if kind == "workers" and status == "OPTIMAL":
+                        proven[group] = True
+                hint[group] = incumbent[group]
+                # Mejora por segundo, suavizada, de cada tipo de vecindario
+                rate = gain / max(seconds, 1e-3)
+                scores[kind] = rate if scores[kind] is None else 0.7 * scores[kind] + 0.3 * rate
+                history.append({
+                    "iteration": len(history) + 1,
+                    "kind": kind,
+                    "workers": int(len(group)),
+                    "day": self.DAYS[free_day] if free_day is not None else None,
+                    "status": status,
+                    "improvement": gain,
+                    "objective": objective() if assigned.all() else None,
+                    "seconds": round(seconds, 3),
+                })
+
+            if improved and on_solution is not None and assigned.all():
+                solutions += 1
+                on_solution({
+                    "commonSchedule": team_schedule(),
+                    "objective": float(objective()),
+                    "bestBound": float(objective()) if proven.all() else None,
+                    "wallTime": round(time.perf_counter() - started, 3),
+                    "solution": solutions,
+                    "source": "lns",
+                })
+
+        wall_time = round(time.perf_counter() - started, 3)
+        logger.info("Búsqueda por vecindarios terminada",
+                   iteraciones=len(history),
+                   objetivo=objective(),
+                   probados=int(proven.sum()),
+                   motivo=stop_reason,
+                   segundos=wall_time)
+        solver_info = {
+            "status": "OPTIMAL" if proven.all() else ("FEASIBLE" if assigned.all() else "UNKNOWN"),
+            "stopReason": stop_reason,
+            "tier": options.tier,
+            "timeLimit": total_time,
+            "relativeGapLimit": options.relativeGap if options.relativeGap is not None else self.TIERS[options.tier][2],
+            "numWorkers": parallel,
+            "objective": float(objective()) if assigned.all() else None,
+            "bestBound": float(objective()) if proven.all() else None,
+            "relativeGap": 0.0 if proven.all() else None,
+            "wallTime": wall_time,
+            "lnsIterations": history,
+        }
+        if members is not None:
+            solver_info["modelledWorkers"] = num_workers
+        if not assigned.all():
+            return {"error": "No se pudo encontrar una solución factible.", "solverInfo": solver_info}
+        return {"commonSchedule": team_schedule(), "solverInfo": solver_info}
+
+    def compare_formulations(self, input_data: RequestData, options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+        """
+        Builds and solves the same request with every shift formulation and reports
+        model size, build time, solve time and solution quality for each.
+        """
+        options = options or SolveOptions()
+        input_data = compile_request(input_data)
+        report = {}
+        for formulation in self.FORMULATIONS:
+            build_started = time.perf_counter()
+            sm = self.build_model(input_data, options.model_copy(update={"formulation": formulation}))
+            build_seconds = time.perf_counter() - build_started
+
+            solver = self._configure_solver(options)
+            solve_started = time.perf_counter()
+            status = solver.Solve(sm.model)
+            solve_seconds = time.perf_counter() - solve_started
+
+            found = status in [cp_model.OPTIMAL, cp_model.FEASIBLE]
+            report[formulation] = {
+                **sm.size(),
+                "buildSeconds": round(build_seconds, 4),
+                "solveSeconds": round(solve_seconds, 4),
+                "status": solver.StatusName(status),
+                "objective": solver.ObjectiveValue() if found else None,
+                "bestBound": solver.BestObjectiveBound() if found else None,
+            }
+            logger.info("Comparación de formulaciones", formulacion=formulation, **report[formulation])
+        return report
+
+    @staticmethod
+    def apply_changes(input_data: Dict[str, Any], changes: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Applies a change set to a request and returns the new request together with
+        the IDs of the added or updated workers.
+        """
+        removed = set(changes.get("removedWorkerIds", []))
+        replacements = {w["id"]: w for w in changes.get("updatedWorkers", []) + changes.get("addedWorkers", [])}
+
+        trabajadores = []
+        for t in input_data["scheduleTrabajadores"]:
+            if t["id"] in removed:
+                continue
+            trabajadores.append(replacements.pop(t["id"], t))
+        # Los trabajadores actualizados que no existían se tratan como nuevos
+        trabajadores.extend(w for w in replacements.values() if w["id"] not in removed)
+
+        changed_ids = [w["id"] for w in changes.get("updatedWorkers", []) + changes.get("addedWorkers", [])
+                       if w["id"] not in removed]
+        return {**input_data, "scheduleTrabajadores": trabajadores}, changed_ids
+
+    def resolve_schedule(self, input_data: Dict[str, Any], previous_schedule: Dict[str, List[Dict[str, Any]]],
+                         changed_ids: List[str], freeze_unchanged: bool = True,
+                         options: Optional[SolveOptions] = None) -> Dict[str, Any]:
+        """
+        Re-solves a schedule after a change set, warm-started from the previous schedule.
+
+        Workers are independent in this model, so with `freeze_unchanged` only the
+        changed workers are modelled and the previous shifts of everyone else are kept
+        as they were; solverInfo then describes the re-solved workers only.
+        """
+        trabajadores = input_data["scheduleTrabajadores"]
+        changed = set(changed_ids)
+        if freeze_unchanged:
+            to_solve = [t for t in trabajadores if t["id"] in changed]
+            frozen_ids = {t["id"] for t in trabajadores if t["id"] not in changed}
+        else:
+            to_solve = trabajadores
+            frozen_ids = set()
+        logger.info("Re-resolución incremental",
+                   trabajadores_resueltos=len(to_solve),
+                   trabajadores_congelados=len(frozen_ids))
+
+        if to_solve:
+            # Sin fusionar idénticos: cada trabajador conserva su propio horario previo como pista
+            options = (options or SolveOptions()).model_copy(update={"mergeIdenticalWorkers": False})
+            result = self.solve_schedule({**input_data, "scheduleTrabajadores": to_solve}, options, hints=previous_schedule)
+            if "error" in result:
+                return result
+            solver_info = result["solverInfo"]
+            solved_schedule = result["commonSchedule"]
+        else:
+            solver_info = None
+            solved_schedule = {}
+
+        # Combinar los turnos conservados con los recalculados, en el orden de días y trabajadores
+        worker_order = {t["id"]: i for i, t in enumerate(trabajadores)}
+        common_schedule: Dict[str, List[Dict[str, str]]] = {}
+        for dia_nombre in self.DAYS:
+            day_shifts = [dict(shift) for shift in previous_schedule.get(dia_nombre, [])
+                          if shift["workerId"] in frozen_ids]
+            day_shifts.extend(solved_schedule.get(dia_nombre, []))
+            if day_shifts:
+                day_shifts.sort(key=lambda shift: (worker_order[shift["workerId"]], shift["startTime"]))
+                common_schedule[dia_nombre] = day_shifts
+
+        if solver_info is not None:
+            solver_info = {**solver_info, "resolvedWorkers": len(to_solve), "frozenWorkers": len(frozen_ids)}
+        return {"commonSchedule": common_schedule, "solverInfo": solver_info}
+
+
+# Pool de procesos de la búsqueda por vecindarios, compartido por todas las búsquedas del
+# proceso: cada hijo importa ortools y numpy una sola vez, no en cada resolución. Su tamaño
+# es el de la búsqueda más paralela pedida, que nunca pasa de los hilos de su tier, los
+# que el control de admisión ya reservó para el trabajo
+_LNS_POOL: Optional[ProcessPoolExecutor] = None
+_LNS_POOL_READY: List[Future] = []
+
+
+def _lns_pool(size: int) -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the shared LNS process pool with at least `size` processes, or None while
+    its processes are still starting. A call that needs more processes than the pool
+    has starts a new one ("spawn", like the job pool) in the background.
+    """
+    global _LNS_POOL, _LNS_POOL_READY
+    if _LNS_POOL is not None and size > len(_LNS_POOL_READY):
+        _reset_lns_pool()
+    if _LNS_POOL is None:
+        _LNS_POOL = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+        _LNS_POOL_READY = [_LNS_POOL.submit(_lns_worker_ready) for _ in range(size)]
+    if not all(future.done() for future in _LNS_POOL_READY):
+        return None
+    if any(future.exception() is not None for future in _LNS_POOL_READY):
+        # Los procesos no llegan a arrancar: no se reintenta, se resuelve en este proceso
+        return None
+    return _LNS_POOL
+
+
+def _reset_lns_pool() -> None:
+    global _LNS_POOL, _LNS_POOL_READY
+    if _LNS_POOL is not None:
+        _LNS_POOL.shutdown(wait=False, cancel_futures=True)
+    _LNS_POOL, _LNS_POOL_READY = None, []
+
+
+def _lns_worker_ready() -> int:
+    # Deserializar esta tarea ya importó este módulo (ortools y numpy) en el hijo
+    return os.getpid()
+
+
+def _solve_lns_neighbourhood(request: CompiledRequest, free_day: Optional[int], incumbent: np.ndarray,
+                             hint: np.ndarray, options: SolveOptions, time_limit: float) -> Tuple[str, Optional[np.ndarray], float]:
+    # Punto de entrada de los procesos de la búsqueda por vecindarios
+    return SolverService()._solve_neighbourhood(request, free_day, incumbent, hint, options, time_limit)
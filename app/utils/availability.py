@@ -0,0 +1,119 @@
+from typing import Iterable, List, NamedTuple, Tuple
+import numpy as np
+
+NUM_DAYS = 7
+
+
+class DayIntervals(NamedTuple):
+    """
+    Flat arrays of (worker, day, start minute, end minute) intervals.
+    """
+    worker: np.ndarray
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, int, int]]) -> "DayIntervals":
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 4)
+        return cls(data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+
+
+class SlotMasks(NamedTuple):
+    """
+    Boolean slot masks with shape (workers, 7, slots), indexed by day of the week.
+    """
+    available: np.ndarray
+    mandatory: np.ndarray
+    preferred: np.ndarray
+    mandatory_day: np.ndarray
+    mandatory_length: np.ndarray
+
+
+def slot_bounds(start_minute: int, num_slots: int, interval_length: int) -> Tuple[np.ndarray, np.ndarray]:
+    starts = start_minute + np.arange(num_slots, dtype=np.int64) * interval_length
+    return starts, starts + interval_length
+
+
+def overlap_mask(slot_starts: np.ndarray, slot_ends: np.ndarray, intervals: DayIntervals) -> np.ndarray:
+    # (intervalos, slots): el slot se solapa con [inicio, fin)
+    return (slot_ends[None, :] > intervals.start[:, None]) & (slot_starts[None, :] < intervals.end[:, None])
+
+
+def within_mask(slot_starts: np.ndarray, slot_ends: np.ndarray, intervals: DayIntervals) -> np.ndarray:
+    # (intervalos, slots): el slot cae completamente dentro de [inicio, fin]
+    return (slot_starts[None, :] >= intervals.start[:, None]) & (slot_ends[None, :] <= intervals.end[:, None])
+
+
+def build_slot_masks(
+    num_workers: int,
+    slot_starts: np.ndarray,
+    slot_ends: np.ndarray,
+    active_days: np.ndarray,
+    restrictions: DayIntervals,
+    mandatory: DayIntervals,
+    preferences: DayIntervals
+) -> SlotMasks:
+    """
+    Builds every per-worker slot mask in one pass of interval-to-slot arithmetic.
+
+    A slot is available when its day is active, it does not overlap any restriction
+    and, on mandatory days, it overlaps the mandatory window. Each worker has at most
+    one interval per day and kind, so fancy-index assignment never collides.
+    """
+    num_slots = len(slot_starts)
+    shape = (num_workers, NUM_DAYS, num_slots)
+
+    available = np.zeros(shape, dtype=bool)
+    available[:, active_days, :] = True
+
+    if len(restrictions.worker):
+        available[restrictions.worker, restrictions.day] &= ~overlap_mask(slot_starts, slot_ends, restrictions)
+
+    mandatory_mask = np.zeros(shape, dtype=bool)
+    mandatory_day = np.zeros((num_workers, NUM_DAYS), dtype=bool)
+    mandatory_length = np.zeros((num_workers, NUM_DAYS), dtype=np.int64)
+    if len(mandatory.worker):
+        available[mandatory.worker, mandatory.day] &= overlap_mask(slot_starts, slot_ends, mandatory)
+        mandatory_mask[mandatory.worker, mandatory.day] = within_mask(slot_starts, slot_ends, mandatory)
+        mandatory_day[mandatory.worker, mandatory.day] = True
+        mandatory_length[mandatory.worker, mandatory.day] = mandatory.end - mandatory.start
+
+    preferred = np.zeros(shape, dtype=bool)
+    if len(preferences.worker):
+        preferred[preferences.worker, preferences.day] = within_mask(slot_starts, slot_ends, preferences)
+
+    return SlotMasks(available, mandatory_mask, preferred, mandatory_day, mandatory_length)
+
+
+def dilate_slots(mask: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Extends every True slot of a (..., slots) mask by `radius` slots on each side.
+    """
+    dilated = mask.copy()
+    for k in range(1, min(radius, mask.shape[-1]) + 1):
+        dilated[..., k:] |= mask[..., :-k]
+        dilated[..., :-k] |= mask[..., k:]
+    return dilated
+
+
+def equivalence_classes(masks: SlotMasks, weekly_minutes: np.ndarray) -> List[np.ndarray]:
+    """
+    Groups workers whose slot masks and weekly minutes are identical, so any of
+    them can take the other's shifts. Returns the worker indices of every class
+    with two or more members, in ascending order.
+    """
+    num_workers = len(weekly_minutes)
+    if num_workers < 2:
+        return []
+    signature = np.concatenate([
+        np.packbits(masks.available.reshape(num_workers, -1), axis=1),
+        np.packbits(masks.mandatory.reshape(num_workers, -1), axis=1),
+        np.packbits(masks.preferred.reshape(num_workers, -1), axis=1),
+        np.packbits(masks.mandatory_day.reshape(num_workers, -1), axis=1),
+        masks.mandatory_length.reshape(num_workers, -1).astype(np.int64).view(np.uint8),
+        weekly_minutes.astype(np.int64).reshape(num_workers, 1).view(np.uint8),
+    ], axis=1)
+    _, inverse, counts = np.unique(signature, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    return [np.flatnonzero(inverse == label) for label in np.flatnonzero(counts > 1)]
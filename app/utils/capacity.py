@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, NamedTuple
+import numpy as np
+from app.utils.availability import SlotMasks
+from app.utils.compiled_request import DAYS, CompiledRequest
+
+
+def usable_slots(available: np.ndarray, min_shift_blocks: int) -> np.ndarray:
+    """
+    Marks the available slots of a (..., slots) mask that a shift can cover: runs of
+    available slots at least `min_shift_blocks` long, or that reach the end of the day.
+    """
+    num_slots = available.shape[-1]
+    padded = np.zeros(available.shape[:-1] + (num_slots + 2,), dtype=np.int8)
+    padded[..., 1:-1] = available
+    edges = np.diff(padded, axis=-1)
+    *index, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[-1]
+    keep = (ends - starts >= min_shift_blocks) | (ends == num_slots)
+
+    # +1 al inicio y -1 al final de cada tramo utilizable; la suma acumulada marca sus slots
+    delta = np.zeros(padded.shape, dtype=np.int64)
+    np.add.at(delta, (*(i[keep] for i in index), starts[keep]), 1)
+    np.add.at(delta, (*(i[keep] for i in index), ends[keep]), -1)
+    return np.cumsum(delta, axis=-1)[..., :num_slots] > 0
+
+
+class CapacityBounds(NamedTuple):
+    """
+    Per-worker bounds in minutes, over the active days: the most a schedule can work
+    and the least the rules make it work.
+    """
+    days: np.ndarray
+    day_max: np.ndarray
+    required: np.ndarray
+    window_max: np.ndarray
+    weekly_floor: np.ndarray
+    week_max: np.ndarray
+    week_min: np.ndarray
+
+
+def capacity_bounds(request: CompiledRequest, masks: SlotMasks, interval_length: int,
+                    min_shift_blocks: int) -> CapacityBounds:
+    """
+    Computes every worker's capacity bounds from the slot masks in one vectorized pass.
+    """
+    days = np.array(request.active_days, dtype=np.int64)
+    min_daily, max_daily = request.min_daily_minutes, request.max_daily_minutes
+    usable = usable_slots(masks.available[:, days], min_shift_blocks)
+
+    # Máximo trabajable por día: slots utilizables hasta el máximo diario (+1 hora); si no
+    # llega al mínimo diario (-1 hora) ese día no se puede trabajar
+    day_max = np.minimum(usable.sum(axis=2) * interval_length,
+                         (max_daily + 60) // interval_length * interval_length)
+    day_max[day_max < max(min_daily - 60, 1)] = 0
+
+    # Un día obligatorio cuya ventana no contiene ningún slot entero no exige nada en el modelo
+    mandatory_day = masks.mandatory_day[:, days] & masks.mandatory[:, days].any(axis=2)
+    required = np.where(mandatory_day, np.minimum(min_daily, masks.mandatory_length[:, days]), 0)
+    window_max = np.minimum((masks.mandatory[:, days] & usable).sum(axis=2) * interval_length, day_max)
+    # Un día obligatorio con trabajo exige al menos el mínimo diario (-1 hora), en slots enteros
+    day_min = np.where(required > 0, np.maximum(required, min_daily - 60), 0)
+    day_min = -(-day_min // interval_length) * interval_length
+
+    weekly = request.weekly_minutes
+    weekly_floor = (weekly * 0.7).astype(np.int64)
+    week_max = day_max.sum(axis=1)
+    # Con mínimo semanal hay al menos un día trabajado, y ningún día trabajado baja del mínimo diario
+    shortest_day = -(-max(min_daily - 60, 1) // interval_length) * interval_length
+    week_min = np.maximum(day_min.sum(axis=1), np.where(weekly_floor > 0, shortest_day, 0))
+    return CapacityBounds(days, day_max, required, window_max, weekly_floor, week_max, week_min)
+
+
+def capacity_slack(bounds: CapacityBounds, request: CompiledRequest) -> np.ndarray:
+    """
+    Smallest margin, in minutes, between each worker's bounds and the rules; the
+    tightest workers are the likeliest to be infeasible.
+    """
+    window_slack = np.where(bounds.required > 0, bounds.window_max - bounds.required, np.iinfo(np.int64).max)
+    return np.minimum.reduce([
+        window_slack.min(axis=1, initial=np.iinfo(np.int64).max),
+        bounds.week_max - bounds.weekly_floor,
+        request.weekly_minutes - bounds.week_min,
+    ])
+
+
+def capacity_conflicts(request: CompiledRequest, bounds: CapacityBounds) -> List[Dict[str, Any]]:
+    """
+    Compares each worker's available time with the minutes the solver's rules
+    require, without building a model. Only reports conflicts that no schedule can
+    satisfy: an upper bound of the workable minutes below a requirement, or a lower
+    bound of the required minutes above a limit.
+    """
+    days, day_max, required, window_max, weekly_floor, week_max, week_min = bounds
+    min_daily = request.min_daily_minutes
+    weekly = request.weekly_minutes
+    conflicts: List[Dict[str, Any]] = []
+    for t_idx, day_pos in zip(*np.nonzero((required > 0) & (window_max < required))):
+        conflicts.append({
+            "rule": "mandatoryDay",
+            "workerId": request.worker_ids[t_idx],
+            "day": DAYS[days[day_pos]],
+            "requiredMinutes": int(max(required[t_idx, day_pos], min_daily - 60)),
+            "availableMinutes": int(window_max[t_idx, day_pos]),
+        })
+    for t_idx in np.flatnonzero(week_max < weekly_floor):
+        conflicts.append({
+            "rule": "weeklyMinimum",
+            "workerId": request.worker_ids[t_idx],
+            "requiredMinutes": int(weekly_floor[t_idx]),
+            "availableMinutes": int(week_max[t_idx]),
+        })
+    for t_idx in np.flatnonzero(week_min > weekly):
+        conflicts.append({
+            "rule": "weeklyMaximum",
+            "workerId": request.worker_ids[t_idx],
+            "requiredMinutes": int(week_min[t_idx]),
+            "availableMinutes": int(weekly[t_idx]),
+        })
+    return conflicts
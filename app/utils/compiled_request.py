@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+from app.models.schedule import ScheduleRequest
+from app.utils.availability import DayIntervals
+
+DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+
+
+class InvalidScheduleRequest(ValueError):
+    """
+    Raised while compiling a request that fails validation; the message is the
+    client-facing detail.
+    """
+
+
+def parse_time(time_str: str) -> int:
+    """
+    Parses "HH:MM:SS" (same rules as strptime's %H:%M:%S) into minutes since midnight.
+    """
+    parts = time_str.split(":")
+    if len(parts) != 3 or not all(p.isdigit() and 1 <= len(p) <= 2 for p in parts):
+        raise ValueError(f"Invalid time: {time_str!r}")
+    h, m, s = (int(p) for p in parts)
+    if h > 23 or m > 59 or s > 61:
+        raise ValueError(f"Invalid time: {time_str!r}")
+    return h * 60 + m
+
+
+class CompiledRequest:
+    """
+    Parse-once form of a ScheduleRequest shared by validation, the solver, the
+    heuristic and the evaluator: times as minutes since midnight, days as indices
+    and worker windows as flat interval arrays restricted to the active days.
+    """
+
+    __slots__ = (
+        "team_id", "active_days", "start_minute", "end_minute", "min_daily_minutes", "max_daily_minutes",
+        "worker_ids", "weekly_minutes", "restrictions", "mandatory", "preferences",
+    )
+
+    def __init__(self, team_id: int, active_days: List[int], start_minute: int, end_minute: int,
+                 min_daily_minutes: int, max_daily_minutes: int, worker_ids: List[str],
+                 weekly_minutes: np.ndarray, restrictions: DayIntervals, mandatory: DayIntervals,
+                 preferences: DayIntervals):
+        self.team_id = team_id
+        self.active_days = active_days
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.min_daily_minutes = min_daily_minutes
+        self.max_daily_minutes = max_daily_minutes
+        self.worker_ids = worker_ids
+        self.weekly_minutes = weekly_minutes
+        self.restrictions = restrictions
+        self.mandatory = mandatory
+        self.preferences = preferences
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.worker_ids)
+
+    def num_slots(self, slot_minutes: int) -> int:
+        return (self.end_minute - self.start_minute) // slot_minutes
+
+    def select(self, indices: np.ndarray) -> "CompiledRequest":
+        """
+        Returns the request restricted to the workers at `indices`, renumbered in that order.
+        """
+        remap = np.full(self.num_workers, -1, dtype=np.int64)
+        remap[indices] = np.arange(len(indices))
+
+        def pick(intervals: DayIntervals) -> DayIntervals:
+            keep = remap[intervals.worker] >= 0
+            return DayIntervals(remap[intervals.worker[keep]], intervals.day[keep],
+                                intervals.start[keep], intervals.end[keep])
+
+        return CompiledRequest(
+            team_id=self.team_id,
+            active_days=self.active_days,
+            start_minute=self.start_minute,
+            end_minute=self.end_minute,
+            min_daily_minutes=self.min_daily_minutes,
+            max_daily_minutes=self.max_daily_minutes,
+            worker_ids=[self.worker_ids[i] for i in indices],
+            weekly_minutes=self.weekly_minutes[indices],
+            restrictions=pick(self.restrictions),
+            mandatory=pick(self.mandatory),
+            preferences=pick(self.preferences),
+        )
+
+
+RequestData = Union[ScheduleRequest, Dict[str, Any], CompiledRequest]
+
+
+def _get(obj: Any, name: str) -> Any:
+    # Acepta tanto el modelo Pydantic como su model_dump()
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def _windows(t_idx: int, dias: Dict[str, Any], active: List[bool], rows: List[Tuple[int, int, int, int]],
+             detail: str) -> None:
+    for dia_str, slot in dias.items():
+        try:
+            start = parse_time(_get(slot, "horaInicio"))
+            end = parse_time(_get(slot, "horaFin"))
+        except ValueError:
+            raise InvalidScheduleRequest(detail) from None
+        # Días desconocidos o inactivos se validan pero no generan intervalos
+        d_idx = DAY_INDEX.get(dia_str)
+        if d_idx is not None and active[d_idx]:
+            rows.append((t_idx, d_idx, start, end))
+
+
+def compile_request(request: RequestData) -> CompiledRequest:
+    """
+    Validates a request and compiles it, parsing every time string exactly once.
+    Raises InvalidScheduleRequest with the first problem found. An already compiled
+    request is returned as is, so services can accept either form.
+    """
+    if isinstance(request, CompiledRequest):
+        return request
+    equipo = _get(request, "equipo")
+    try:
+        start_minute = parse_time(_get(equipo, "horaInicioActividad"))
+        end_minute = parse_time(_get(equipo, "horaFinActividad"))
+    except ValueError:
+        raise InvalidScheduleRequest("Invalid time format in team schedule") from None
+
+    dias_actividad = _get(equipo, "diasActividad")
+    if not dias_actividad.isdigit() or len(dias_actividad) != 7:
+        raise InvalidScheduleRequest("diasActividad must be 7 digits of 0/1")
+
+    if _get(equipo, "horasMinDiaria") >= _get(equipo, "horasMaxDiaria"):
+        raise InvalidScheduleRequest("Minimum daily hours must be less than maximum daily hours")
+
+    active = [flag == "1" for flag in dias_actividad]
+    worker_ids: List[str] = []
+    weekly_minutes: List[int] = []
+    restrictions: List[Tuple[int, int, int, int]] = []
+    mandatory: List[Tuple[int, int, int, int]] = []
+    preferences: List[Tuple[int, int, int, int]] = []
+    for t_idx, worker in enumerate(_get(request, "scheduleTrabajadores")):
+        worker_id = _get(worker, "id")
+        general = _get(worker, "horarioGeneral")
+        if _get(general, "horasSemanales") <= 0:
+            raise InvalidScheduleRequest(f"Invalid weekly hours for worker {worker_id}")
+        _windows(t_idx, _get(general, "diasObligatorios"), active, mandatory,
+                 f"Invalid time format in worker {worker_id}'s required days")
+        _windows(t_idx, _get(_get(worker, "preferencias"), "dias"), active, preferences,
+                 f"Invalid time format in worker {worker_id}'s preferences")
+        _windows(t_idx, _get(_get(worker, "restricciones"), "dias"), active, restrictions,
+                 f"Invalid time format in worker {worker_id}'s restrictions")
+        worker_ids.append(worker_id)
+        weekly_minutes.append(_get(general, "horasSemanales") * 60)
+
+    return CompiledRequest(
+        team_id=_get(equipo, "idEquipo"),
+        active_days=[i for i, flag in enumerate(active) if flag],
+        start_minute=start_minute,
+        end_minute=end_minute,
+        min_daily_minutes=_get(equipo, "horasMinDiaria") * 60,
+        max_daily_minutes=_get(equipo, "horasMaxDiaria") * 60,
+        worker_ids=worker_ids,
+        weekly_minutes=np.array(weekly_minutes, dtype=np.int64),
+        restrictions=DayIntervals.from_rows(restrictions),
+        mandatory=DayIntervals.from_rows(mandatory),
+        preferences=DayIntervals.from_rows(preferences),
+    )
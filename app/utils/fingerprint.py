@@ -0,0 +1,66 @@
+import hashlib
+import json
+from typing import Any, Dict
+from app.models.schedule import ScheduleRequest
+
+def normalize_time(time_str: str) -> str:
+    """
+    Normalizes "H:MM", "HH:MM" and "HH:MM:SS" strings to "HH:MM:SS".
+    Unparseable values are returned stripped so validation can still reject them.
+    """
+    parts = time_str.strip().split(':')
+    try:
+        values = [int(p) for p in parts]
+    except ValueError:
+        return time_str.strip()
+    if len(values) == 2:
+        values.append(0)
+    if len(values) != 3:
+        return time_str.strip()
+    return f"{values[0]:02d}:{values[1]:02d}:{values[2]:02d}"
+
+def _normalize_days(dias: Dict[str, Any]) -> Dict[str, Any]:
+    # El nombre del día se conserva tal cual: el solver ignora los días que no reconoce
+    # (p. ej. "Lunes "), así que normalizarlo igualaría peticiones distintas
+    return {
+        dia: [normalize_time(slot["horaInicio"]), normalize_time(slot["horaFin"])]
+        for dia, slot in dias.items()
+    }
+
+def canonical_request(request: ScheduleRequest) -> Dict[str, Any]:
+    """
+    Builds a canonical representation of a schedule request: workers sorted by id,
+    times normalized to HH:MM:SS and day maps reduced to plain [start, end] pairs
+    keyed by the day names as given.
+    """
+    data = request.model_dump()
+    equipo = dict(data["equipo"])
+    equipo["horaInicioActividad"] = normalize_time(equipo["horaInicioActividad"])
+    equipo["horaFinActividad"] = normalize_time(equipo["horaFinActividad"])
+
+    trabajadores = []
+    for t in data["scheduleTrabajadores"]:
+        trabajadores.append({
+            "id": t["id"],
+            "nombre": t["nombre"],
+            "preferencias": _normalize_days(t["preferencias"]["dias"]),
+            "restricciones": _normalize_days(t["restricciones"]["dias"]),
+            "diasObligatorios": _normalize_days(t["horarioGeneral"]["diasObligatorios"]),
+            "horasSemanales": t["horarioGeneral"]["horasSemanales"],
+        })
+    trabajadores.sort(key=lambda t: (t["id"], json.dumps(t, sort_keys=True, ensure_ascii=False)))
+
+    return {"equipo": equipo, "scheduleTrabajadores": trabajadores}
+
+def schedule_request_fingerprint(request: ScheduleRequest, namespace: str = "") -> str:
+    """
+    Returns a stable SHA-256 fingerprint of a schedule request. Requests that only
+    differ in worker order, key order or time formatting share the same fingerprint.
+    """
+    payload = json.dumps(
+        canonical_request(request),
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(f"{namespace}|{payload}".encode("utf-8")).hexdigest()
@@ -0,0 +1,75 @@
+import random
+from typing import Any, Dict, List, Optional
+
+DAYS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+LAST_MINUTE = 23 * 60 + 59
+
+
+def _time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def generate_instance(
+    num_workers: int,
+    seed: int = 0,
+    active_days: str = "1111100",
+    window_hours: int = 9,
+    start_hour: int = 8,
+    restriction_density: float = 0.2,
+    preference_density: float = 0.5,
+    mandatory_density: float = 0.3,
+    min_daily_hours: int = 4,
+    max_daily_hours: int = 8,
+    team_id: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Generates a reproducible ScheduleRequest payload for benchmarks.
+
+    Each density is the probability that a worker has a restriction, preference
+    or mandatory window on a given active day. Mandatory and restricted days never
+    coincide and weekly hours stay below the available capacity, so instances are
+    normally feasible.
+    """
+    rng = random.Random(seed)
+    start = start_hour * 60 if window_hours < 24 else 0
+    end = min(start + window_hours * 60, LAST_MINUTE)
+    days = [d for d, flag in zip(DAYS, active_days) if flag == "1"]
+
+    def window(min_minutes: int) -> Dict[str, str]:
+        min_minutes = min(min_minutes, end - start)
+        first = rng.randrange(start, end - min_minutes + 1, 15)
+        last = rng.randrange(first + min_minutes, end + 1, 15) if first + min_minutes < end else end
+        return {"horaInicio": _time(first), "horaFin": _time(last)}
+
+    capacity = len(days) * max_daily_hours
+    weekly_options = [h for h in (20, 30, 40) if h <= capacity * 0.8] or [max(1, int(capacity * 0.5))]
+
+    workers: List[Dict[str, Any]] = []
+    for i in range(num_workers):
+        mandatory = {d: window(max_daily_hours * 60) for d in days if rng.random() < mandatory_density}
+        restrictions = {
+            d: window(60) for d in days
+            if d not in mandatory and rng.random() < restriction_density
+        }
+        preferences = {d: window(60) for d in days if rng.random() < preference_density}
+        workers.append({
+            "id": f"T{i:04d}",
+            "nombre": f"Trabajador {i}",
+            "preferencias": {"dias": preferences},
+            "restricciones": {"dias": restrictions},
+            "horarioGeneral": {"diasObligatorios": mandatory, "horasSemanales": rng.choice(weekly_options)},
+        })
+
+    return {
+        "equipo": {
+            "idEquipo": team_id if team_id is not None else seed,
+            "tipo": "Benchmark",
+            "nombre": f"Equipo sintético {seed}",
+            "diasActividad": active_days,
+            "horaInicioActividad": _time(start),
+            "horaFinActividad": _time(end),
+            "horasMinDiaria": min_daily_hours,
+            "horasMaxDiaria": max_daily_hours,
+        },
+        "scheduleTrabajadores": workers,
+    }
@@ -0,0 +1,57 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+from prometheus_client import Counter, Gauge, Histogram
+
+PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (100, 500, 1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+TOKEN_BUCKETS = (500, 1_000, 2_000, 5_000, 10_000, 20_000, 50_000, 100_000, 200_000)
+GAP_BUCKETS = (0, 0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1)
+
+PHASE_SECONDS = Histogram(
+    "schedule_phase_seconds",
+    "Duration of each phase of schedule generation",
+    ["operation", "phase"],
+    buckets=PHASE_BUCKETS
+)
+SOLVER_MODEL_VARIABLES = Histogram("solver_model_variables", "CP-SAT model variables per solve", buckets=SIZE_BUCKETS)
+SOLVER_MODEL_CONSTRAINTS = Histogram("solver_model_constraints", "CP-SAT model constraints per solve", buckets=SIZE_BUCKETS)
+SOLVER_SOLVES = Counter("solver_solves_total", "Finished solves by CP-SAT status and stop reason", ["status", "stop_reason"])
+SOLVER_RELATIVE_GAP = Histogram("solver_relative_gap", "Relative gap between objective and bound", buckets=GAP_BUCKETS)
+SOLVER_QUEUE_WAIT = Histogram("solver_queue_wait_seconds", "Time solves waited for admission", buckets=PHASE_BUCKETS)
+SOLVER_QUEUE_DEPTH = Gauge("solver_queue_depth", "Solves waiting for admission")
+SOLVER_RUNNING = Gauge("solver_running", "Admitted solves running")
+SOLVER_ADMISSIONS = Counter("solver_admissions_total", "Solver admission decisions: immediate, queued or rejected", ["outcome"])
+CACHE_REQUESTS = Counter("schedule_cache_requests_total", "Result cache lookups", ["cache", "result"])
+GEMINI_SECONDS = Histogram("gemini_request_seconds", "Gemini generate_content latency", ["outcome"], buckets=PHASE_BUCKETS)
+AI_CHUNKS = Counter("ai_chunk_requests_total", "AI sub-requests by outcome: ok, retried or failed", ["outcome"])
+AI_PROMPT_TOKENS = Histogram("ai_prompt_tokens", "Estimated prompt tokens per AI request", ["format"], buckets=TOKEN_BUCKETS)
+
+
+@contextmanager
+def observe_phase(operation: str, phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASE_SECONDS.labels(operation, phase).observe(time.perf_counter() - started)
+
+
+def record_solve(result: Dict[str, Any]) -> None:
+    """
+    Records the phase timings and statistics carried in a solver result's solverInfo.
+
+    Solves run in pool processes, so metrics are recorded here, in the API process,
+    from the result instead of inside the solver.
+    """
+    info = result.get("solverInfo")
+    if not info:
+        return
+    for phase, seconds in (info.get("phaseSeconds") or {}).items():
+        PHASE_SECONDS.labels("solver", phase).observe(seconds)
+    if info.get("variables") is not None:
+        SOLVER_MODEL_VARIABLES.observe(info["variables"])
+        SOLVER_MODEL_CONSTRAINTS.observe(info["constraints"])
+    SOLVER_SOLVES.labels(info["status"], info["stopReason"]).inc()
+    if info.get("relativeGap") is not None:
+        SOLVER_RELATIVE_GAP.observe(info["relativeGap"])
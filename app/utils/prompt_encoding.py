@@ -0,0 +1,154 @@
+import math
+import re
+from typing import Any, Dict, List, Tuple
+from app.utils.fingerprint import normalize_time
+
+PROMPT_DATA_MARKER = "Input Data:\n"
+
+DAY_CODES = {
+    "Lunes": "Lu", "Martes": "Ma", "Miércoles": "Mi", "Jueves": "Ju",
+    "Viernes": "Vi", "Sábado": "Sa", "Domingo": "Do",
+}
+CODE_DAYS = {code: day for day, code in DAY_CODES.items()}
+
+COMPACT_LEGEND = """Input encoding:
+- Team line: T|<id>|<diasActividad, 7 digits Lunes..Domingo, 1=active>|<start HHMM>-<end HHMM>|<horasMinDiaria>|<horasMaxDiaria>
+- Profile line: P<n>|<weekly hours>|m=<diasObligatorios>|p=<preferences>|r=<restrictions>
+- Day windows are comma-separated <day><HHMM>-<HHMM>; days: Lu=Lunes, Ma=Martes, Mi=Miércoles, Ju=Jueves, Vi=Viernes, Sa=Sábado, Do=Domingo
+- Worker line: W|P<n>|<comma-separated worker IDs sharing that profile>"""
+
+_WINDOW = re.compile(r"^(.+?)(\d{4})-(\d{4})$")
+_TOKEN = re.compile(r"\d|[^\W\d_]+|[^\w\s]")
+
+
+def _hhmm(time_str: str) -> str:
+    return normalize_time(time_str)[:5].replace(":", "")
+
+
+def _time_str(hhmm: str) -> str:
+    return f"{hhmm[:2]}:{hhmm[2:]}:00"
+
+
+def _windows(dias: Dict[str, Dict[str, str]]) -> str:
+    return ",".join(
+        f"{DAY_CODES.get(dia, dia)}{_hhmm(slot['horaInicio'])}-{_hhmm(slot['horaFin'])}"
+        for dia, slot in dias.items()
+    )
+
+
+def _parse_windows(text: str) -> Dict[str, Dict[str, str]]:
+    dias = {}
+    for item in filter(None, text.split(",")):
+        match = _WINDOW.match(item)
+        if match is None:
+            raise ValueError(f"Ventana horaria inválida: {item}")
+        code, start, end = match.groups()
+        dias[CODE_DAYS.get(code, code)] = {"horaInicio": _time_str(start), "horaFin": _time_str(end)}
+    return dias
+
+
+def _encodable_id(worker_id: str) -> bool:
+    # Un ID con separadores o saltos de línea rompería la línea W al decodificarla
+    return bool(worker_id) and worker_id == worker_id.strip() and not any(
+        delimiter in worker_id for delimiter in "|,"
+    ) and len(worker_id.splitlines()) == 1
+
+
+def can_encode(input_data: Dict[str, Any]) -> bool:
+    """
+    Whether every worker ID survives the compact encoding; IDs are free-form and
+    must not contain '|', ',' or line breaks, nor be empty or padded.
+    """
+    return all(_encodable_id(t["id"]) for t in input_data["scheduleTrabajadores"])
+
+
+def encode_request(input_data: Dict[str, Any]) -> str:
+    """
+    Encodes a ScheduleRequest payload as a few compact lines: times as HHMM, day names
+    as two-letter codes, and workers with identical hours, mandatory days, preferences
+    and restrictions grouped under one profile.
+
+    Seconds and names are dropped: neither affects the schedule. Raises ValueError
+    if a worker ID cannot be encoded (see can_encode).
+    """
+    for t in input_data["scheduleTrabajadores"]:
+        if not _encodable_id(t["id"]):
+            raise ValueError(f"ID de trabajador no codificable: {t['id']!r}")
+    equipo = input_data["equipo"]
+    lines = [
+        f"T|{equipo['idEquipo']}|{equipo['diasActividad']}|"
+        f"{_hhmm(equipo['horaInicioActividad'])}-{_hhmm(equipo['horaFinActividad'])}|"
+        f"{equipo['horasMinDiaria']}|{equipo['horasMaxDiaria']}"
+    ]
+
+    profiles: Dict[Tuple[Any, ...], List[str]] = {}
+    for t in input_data["scheduleTrabajadores"]:
+        key = (
+            t["horarioGeneral"]["horasSemanales"],
+            _windows(t["horarioGeneral"]["diasObligatorios"]),
+            _windows(t["preferencias"]["dias"]),
+            _windows(t["restricciones"]["dias"]),
+        )
+        profiles.setdefault(key, []).append(t["id"])
+
+    for n, ((hours, mandatory, preferences, restrictions), ids) in enumerate(profiles.items(), start=1):
+        lines.append(f"P{n}|{hours}|m={mandatory}|p={preferences}|r={restrictions}")
+        lines.append(f"W|P{n}|{','.join(ids)}")
+    return "\n".join(lines)
+
+
+def decode_request(text: str) -> Dict[str, Any]:
+    """
+    Inverse of encode_request. Names are filled in with the team and worker IDs.
+    """
+    equipo: Dict[str, Any] = {}
+    profiles: Dict[str, Dict[str, Any]] = {}
+    trabajadores: List[Dict[str, Any]] = []
+    for line in filter(None, (line.strip() for line in text.splitlines())):
+        fields = line.split("|")
+        if fields[0] == "T":
+            start, end = fields[3].split("-")
+            equipo = {
+                "idEquipo": int(fields[1]),
+                "tipo": "",
+                "nombre": fields[1],
+                "diasActividad": fields[2],
+                "horaInicioActividad": _time_str(start),
+                "horaFinActividad": _time_str(end),
+                "horasMinDiaria": int(fields[4]),
+                "horasMaxDiaria": int(fields[5]),
+            }
+        elif fields[0].startswith("P"):
+            profiles[fields[0]] = {
+                "horasSemanales": int(fields[1]),
+                "mandatory": _parse_windows(fields[2][2:]),
+                "preferences": _parse_windows(fields[3][2:]),
+                "restrictions": _parse_windows(fields[4][2:]),
+            }
+        elif fields[0] == "W":
+            profile = profiles[fields[1]]
+            for worker_id in filter(None, fields[2].split(",")):
+                trabajadores.append({
+                    "id": worker_id,
+                    "nombre": worker_id,
+                    "preferencias": {"dias": dict(profile["preferences"])},
+                    "restricciones": {"dias": dict(profile["restrictions"])},
+                    "horarioGeneral": {
+                        "diasObligatorios": dict(profile["mandatory"]),
+                        "horasSemanales": profile["horasSemanales"],
+                    },
+                })
+        else:
+            raise ValueError(f"Línea desconocida: {line}")
+    return {"equipo": equipo, "scheduleTrabajadores": trabajadores}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximates the model's token count without a tokenizer round trip: one token
+    per digit and punctuation mark, and one per four letters of each word.
+    """
+    return sum(
+        math.ceil(len(piece) / 4) if piece[0].isalpha() else 1
+        for piece in _TOKEN.findall(text)
+    )
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, Literal, Union
+from fastapi.responses import ORJSONResponse
+from app.models.schedule import ScheduleResponse
+from app.utils.compiled_request import CompiledRequest, parse_time
+
+ResponseFormat = Literal["full", "columnar"]
+
+_RESPONSE_FIELDS = tuple(ScheduleResponse.model_fields)
+
+
+def _drop_none(value: Any) -> Any:
+    # Equivalente a response_model_exclude_none para los bloques de estadísticas
+    if isinstance(value, dict):
+        return {k: _drop_none(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_drop_none(v) for v in value]
+    return value
+
+
+def columnar_schedule(common_schedule: Dict[str, List[Dict[str, str]]],
+                      request: CompiledRequest) -> Dict[str, Any]:
+    """
+    Converts a commonSchedule into per-day columns: worker indices into `workers`
+    and start/end offsets in minutes from the team's activity start.
+    """
+    workers = list(request.worker_ids)
+    index = {worker_id: i for i, worker_id in enumerate(workers)}
+    offsets: Dict[str, int] = {}
+    days: Dict[str, Dict[str, List[int]]] = {}
+
+    def offset(time_str: str) -> int:
+        # Pocas horas distintas en la rejilla: cada cadena se convierte una sola vez
+        if time_str not in offsets:
+            offsets[time_str] = parse_time(time_str) - request.start_minute
+        return offsets[time_str]
+
+    for dia, shifts in common_schedule.items():
+        worker_col, start_col, end_col = [], [], []
+        for shift in shifts:
+            worker_id = shift["workerId"]
+            if worker_id not in index:
+                # Un horario de la IA puede traer IDs que no están en la petición
+                index[worker_id] = len(workers)
+                workers.append(worker_id)
+            worker_col.append(index[worker_id])
+            start_col.append(offset(shift["startTime"]))
+            end_col.append(offset(shift["endTime"]))
+        days[dia] = {"worker": worker_col, "start": start_col, "end": end_col}
+    return {
+        "format": "columnar",
+        "origin": f"{request.start_minute // 60:02d}:{request.start_minute % 60:02d}:00",
+        "workers": workers,
+        "commonSchedule": days,
+    }
+
+
+def error_detail(result: Dict[str, Any]) -> Union[str, Dict[str, Any]]:
+    """
+    HTTPException detail for a failed service result: the error message, together
+    with the conflicting rules when the solver identified them.
+    """
+    if result.get("conflicts"):
+        return {"message": result["error"], "conflicts": result["conflicts"]}
+    return result["error"]
+
+
+def schedule_response(result: Dict[str, Any], request: CompiledRequest,
+                      response_format: ResponseFormat = "full") -> ORJSONResponse:
+    """
+    Serializes a service result in the ScheduleResponse shape straight to JSON with
+    orjson. The services already produce plain dicts, so the result is not run
+    through the Pydantic models again.
+    """
+    content = {
+        field: _drop_none(result[field]) if field != "commonSchedule" else result[field]
+        for field in _RESPONSE_FIELDS if result.get(field) is not None
+    }
+    if response_format == "columnar":
+        content.update(columnar_schedule(content["commonSchedule"], request))
+    return ORJSONResponse(content)
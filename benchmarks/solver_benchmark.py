@@ -0,0 +1,217 @@
+"""
+Scaling benchmark for SolverService.
+
+Runs each case of a suite in a fresh process and records build/solve/extract
+time, peak memory, model size, status and objective to a JSON results file.
+
+    python -m benchmarks.solver_benchmark run --suite scaling --tier fast --output results.json
+    python -m benchmarks.solver_benchmark run --suite smoke --baseline results.json
+    python -m benchmarks.solver_benchmark compare old.json new.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+SUITES: Dict[str, List[Dict[str, Any]]] = {
+    "smoke": [
+        {"num_workers": 5},
+        {"num_workers": 20},
+    ],
+    "scaling": [
+        {"num_workers": 10},
+        {"num_workers": 50},
+        {"num_workers": 200},
+        {"num_workers": 500},
+    ],
+    "window": [
+        {"num_workers": 50, "window_hours": 9},
+        {"num_workers": 50, "window_hours": 16},
+        {"num_workers": 50, "window_hours": 24, "active_days": "1111111"},
+    ],
+    "density": [
+        {"num_workers": 50, "restriction_density": 0.0, "preference_density": 0.0},
+        {"num_workers": 50, "restriction_density": 0.5, "preference_density": 0.5},
+        {"num_workers": 50, "restriction_density": 0.0, "preference_density": 1.0},
+        {"num_workers": 50, "restriction_density": 0.8, "preference_density": 1.0},
+    ],
+}
+SUITES["all"] = SUITES["scaling"] + SUITES["window"] + SUITES["density"]
+
+# Diferencias por debajo de este umbral se consideran ruido de medición
+MIN_SECONDS_DELTA = 0.05
+MIN_MEMORY_DELTA_MB = 5.0
+
+
+def case_name(params: Dict[str, Any]) -> str:
+    return ",".join(f"{key}={value}" for key, value in sorted(params.items()))
+
+
+def _peak_memory_mb() -> float:
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(params: Dict[str, Any], seed: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generates and solves one instance. Runs in its own process so peak memory
+    belongs to this case only.
+    """
+    import structlog
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    from app.models.solver import SolveOptions
+    from app.services.solver_service import SolverService
+    from app.utils.instances import generate_instance
+
+    input_data = generate_instance(seed=seed, **params)
+    started = time.perf_counter()
+    result = SolverService().solve_schedule(input_data, SolveOptions(**options))
+    total_seconds = time.perf_counter() - started
+
+    info = result.get("solverInfo") or {}
+    phases = info.get("phaseSeconds") or {}
+    return {
+        "name": case_name(params),
+        "params": params,
+        "seed": seed,
+        "status": info.get("status", "ERROR"),
+        "stopReason": info.get("stopReason"),
+        "error": result.get("error"),
+        "objective": info.get("objective"),
+        "bestBound": info.get("bestBound"),
+        "relativeGap": info.get("relativeGap"),
+        "variables": info.get("variables"),
+        "constraints": info.get("constraints"),
+        "buildSeconds": phases.get("build"),
+        "solveSeconds": phases.get("solve"),
+        "extractSeconds": phases.get("extract"),
+        "totalSeconds": round(total_seconds, 4),
+        "peakMemoryMb": _peak_memory_mb(),
+    }
+
+
+def run_suite(suite: str, seed: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    import ortools
+
+    cases = []
+    for params in SUITES[suite]:
+        # Un proceso nuevo por caso: la memoria pico no se arrastra entre casos
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            case = pool.submit(run_case, params, seed, options).result()
+        cases.append(case)
+        print(f"{case['name']:<70} {case['status']:<10} solve={case['solveSeconds']}s "
+              f"vars={case['variables']} mem={case['peakMemoryMb']}MB obj={case['objective']}")
+
+    return {
+        "meta": {
+            "suite": suite,
+            "seed": seed,
+            "options": options,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "ortools": ortools.__version__,
+            "cpuCount": os.cpu_count(),
+            "machine": platform.machine(),
+        },
+        "cases": cases,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Returns one message per regression of `current` against `baseline`: slower
+    build or solve, higher peak memory, a worse objective or a lost status.
+    """
+    regressions = []
+    previous = {case["name"]: case for case in baseline["cases"]}
+    for case in current["cases"]:
+        old = previous.get(case["name"])
+        if old is None:
+            continue
+        name = case["name"]
+
+        for key in ("buildSeconds", "solveSeconds"):
+            if old.get(key) is None or case.get(key) is None:
+                continue
+            if case[key] > old[key] * (1 + threshold) and case[key] - old[key] > MIN_SECONDS_DELTA:
+                regressions.append(f"{name}: {key} {old[key]} -> {case[key]}")
+
+        if case["peakMemoryMb"] > old["peakMemoryMb"] * (1 + threshold) and \
+           case["peakMemoryMb"] - old["peakMemoryMb"] > MIN_MEMORY_DELTA_MB:
+            regressions.append(f"{name}: peakMemoryMb {old['peakMemoryMb']} -> {case['peakMemoryMb']}")
+
+        if old["status"] in ("OPTIMAL", "FEASIBLE") and case["status"] not in ("OPTIMAL", "FEASIBLE"):
+            regressions.append(f"{name}: status {old['status']} -> {case['status']}")
+        elif old["status"] == "OPTIMAL" and case["status"] != "OPTIMAL":
+            regressions.append(f"{name}: status {old['status']} -> {case['status']}")
+
+        # El modelo maximiza: un objetivo menor es peor
+        if old.get("objective") is not None and case.get("objective") is not None:
+            tolerance = abs(old["objective"]) * threshold / 10
+            if case["objective"] < old["objective"] - tolerance:
+                regressions.append(f"{name}: objective {old['objective']} -> {case['objective']}")
+    return regressions
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _report(baseline_path: str, current: Dict[str, Any], threshold: float) -> int:
+    regressions = compare(_load(baseline_path), current, threshold)
+    if not regressions:
+        print(f"Sin regresiones frente a {baseline_path}")
+        return 0
+    print(f"{len(regressions)} regresiones frente a {baseline_path}:")
+    for line in regressions:
+        print(f"  {line}")
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SolverService scaling benchmark")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run a benchmark suite")
+    run.add_argument("--suite", choices=sorted(SUITES), default="smoke")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--tier", choices=["fast", "balanced", "thorough"], default="fast")
+    run.add_argument("--time-limit", type=float, default=None)
+    run.add_argument("--formulation", choices=["classic", "compact"], default="classic")
+    run.add_argument("--output", default="bench_results.json")
+    run.add_argument("--baseline", default=None, help="Results file to compare against")
+    run.add_argument("--threshold", type=float, default=0.2, help="Relative change flagged as regression")
+
+    cmp = subparsers.add_parser("compare", help="Compare two results files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _report(args.baseline, _load(args.current), args.threshold)
+
+    options = {"tier": args.tier, "formulation": args.formulation}
+    if args.time_limit is not None:
+        options["timeLimit"] = args.time_limit
+    results = run_suite(args.suite, args.seed, options)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        return _report(args.baseline, results, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
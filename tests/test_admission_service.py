@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from app.services.admission_service import AdmissionController, AdmissionRejected
+
+
+def test_admits_in_arrival_order_within_cpu_budget():
+    async def scenario():
+        controller = AdmissionController(cpu_budget=4, max_running=4, max_queue=2)
+        first = controller.reserve(4, 60.0)
+        second = controller.reserve(2, 60.0)
+        third = controller.reserve(2, 60.0)
+        assert first.admitted and not second.admitted and not third.admitted
+        with pytest.raises(AdmissionRejected):
+            controller.reserve(2, 60.0)
+
+        first.release()
+        first.release()
+        await asyncio.gather(second.wait(), third.wait())
+        assert controller.running == 2 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_follows_the_running_time_limits():
+    async def scenario():
+        controller = AdmissionController(cpu_budget=2, max_running=1, max_queue=0)
+        controller.reserve(2, 2.0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.reserve(2, 2.0)
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after <= 2
+        assert rejected.value.headers["Retry-After"] == str(rejected.value.retry_after)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_wait_gives_up_the_place():
+    async def scenario():
+        controller = AdmissionController(cpu_budget=1, max_running=1)
+        running = controller.reserve(1, 60.0)
+        waiting = asyncio.ensure_future(controller.reserve(1, 60.0).wait())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert controller.queued == 0
+        running.release()
+        assert controller.running == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+import pytest
+from app.models.solver import SolveOptions
+from app.services.evaluation_service import ScheduleEvaluator
+from app.services.solver_service import SolverService
+from app.utils.compiled_request import compile_request
+from app.utils.instances import generate_instance
+
+
+def _single_worker(mandatory_start: str, mandatory_end: str):
+    input_data = generate_instance(1, seed=1, mandatory_density=0, restriction_density=0)
+    input_data["scheduleTrabajadores"][0]["horarioGeneral"]["diasObligatorios"] = {
+        "Lunes": {"horaInicio": mandatory_start, "horaFin": mandatory_end}
+    }
+    return input_data
+
+
+@pytest.mark.parametrize("slot_minutes, window", [
+    (15, ("09:00:00", "09:10:00")),
+    (30, ("09:00:00", "09:20:00")),
+    (15, ("09:05:00", "09:25:00")),
+])
+def test_sub_slot_mandatory_window_is_not_rejected(slot_minutes, window):
+    # La ventana no contiene ningún slot entero: el modelo no exige nada ese día
+    input_data = _single_worker(*window)
+    options = SolveOptions(tier="fast", slotMinutes=slot_minutes)
+    service = SolverService()
+    assert service.check_capacity(compile_request(input_data), options) is None
+    result = service.solve_schedule(input_data, options)
+    assert "error" not in result
+    # El evaluador tampoco exige el día y puntúa el horario igual que el solver
+    evaluation = ScheduleEvaluator(service).evaluate(input_data, result["commonSchedule"], slot_minutes)
+    assert evaluation["violations"] == []
+    assert evaluation["objective"] == result["solverInfo"]["objective"]
+
+
+def test_short_mandatory_window_is_rejected():
+    input_data = _single_worker("09:00:00", "10:00:00")
+    result = SolverService().check_capacity(compile_request(input_data), SolveOptions(slotMinutes=15))
+    assert result is not None
+    assert result["solverInfo"]["stopReason"] == "capacity_check"
+    assert [conflict["rule"] for conflict in result["conflicts"]] == ["mandatoryDay"]
+
+
+def test_pre_check_errors_are_returned_as_results(monkeypatch):
+    service = SolverService()
+
+    def failing_check(request, options=None):
+        raise ValueError("fallo en la comprobación")
+
+    monkeypatch.setattr(service, "check_capacity", failing_check)
+    result = service.solve_schedule(generate_instance(2, seed=1), SolveOptions(tier="fast"))
+    assert result == {"error": "Error al resolver el horario: fallo en la comprobación"}
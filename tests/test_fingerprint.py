@@ -0,0 +1,33 @@
+import copy
+import pytest
+from app.models.schedule import ScheduleRequest
+from app.utils.fingerprint import schedule_request_fingerprint
+from app.utils.instances import generate_instance
+
+
+def _with_mandatory(days):
+    input_data = generate_instance(1, seed=1, mandatory_density=0, restriction_density=0, preference_density=0)
+    input_data["scheduleTrabajadores"][0]["horarioGeneral"]["diasObligatorios"] = {
+        day: {"horaInicio": "09:00", "horaFin": "13:00"} for day in days
+    }
+    return ScheduleRequest(**input_data)
+
+
+@pytest.mark.parametrize("first, second", [
+    (["Lunes"], ["Martes"]),
+    (["Lunes"], ["Lunes "]),
+    (["Lunes", "Lunes "], ["Lunes"]),
+])
+def test_requests_differing_only_by_day_do_not_share_a_fingerprint(first, second):
+    assert schedule_request_fingerprint(_with_mandatory(first)) != schedule_request_fingerprint(_with_mandatory(second))
+
+
+def test_time_format_and_worker_order_do_not_change_the_fingerprint():
+    input_data = generate_instance(3, seed=2)
+    reordered = copy.deepcopy(input_data)
+    reordered["scheduleTrabajadores"].reverse()
+    for worker in reordered["scheduleTrabajadores"]:
+        for slot in worker["preferencias"]["dias"].values():
+            slot["horaInicio"] = slot["horaInicio"][:5]
+    assert (schedule_request_fingerprint(ScheduleRequest(**input_data))
+            == schedule_request_fingerprint(ScheduleRequest(**reordered)))
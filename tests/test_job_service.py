@@ -0,0 +1,60 @@
+import asyncio
+from app.models.solver import SolveOptions
+from app.services.job_service import JobManager, JobStatus
+from app.utils.compiled_request import compile_request
+from app.utils.instances import generate_instance
+
+
+def test_waiting_on_a_cancelled_queued_job_returns_an_error():
+    async def scenario():
+        manager = JobManager(max_workers=1, job_ttl_seconds=60, cpu_budget=1)
+        # Ocupa la única plaza para que el trabajo quede en cola sin llegar al pool
+        running = manager.admission.reserve(1, 60.0)
+        job = manager.submit(compile_request(generate_instance(2, seed=1)))
+        assert job.status == JobStatus.PENDING
+
+        waiter = asyncio.ensure_future(manager.wait(job))
+        await asyncio.sleep(0)
+        manager.cancel(job.id)
+        result = await waiter
+        assert result == {"error": "El trabajo de resolución fue cancelado."}
+        assert manager.admission.queued == 0
+        running.release()
+
+    asyncio.run(scenario())
+
+
+def test_batch_waits_for_capacity_instead_of_failing():
+    async def scenario():
+        manager = JobManager(max_workers=1, job_ttl_seconds=60, cpu_budget=1, max_queue=0)
+        # Sin plazas ni cola: la primera admisión del lote se rechaza
+        running = manager.admission.reserve(1, 0.5)
+        asyncio.get_running_loop().call_later(0.2, running.release)
+        results = [result async for result in manager.batch(
+            [(compile_request(generate_instance(2, seed=1)), None)], SolveOptions(tier="fast"))]
+        assert len(results) == 1
+        index, result = results[0]
+        assert index == 0
+        assert "commonSchedule" in result
+        manager.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_batch_task_still_reports_its_item():
+    async def scenario():
+        manager = JobManager(max_workers=1, job_ttl_seconds=60, cpu_budget=1, max_queue=0)
+        running = manager.admission.reserve(1, 60.0)
+        batch = manager.batch([(compile_request(generate_instance(2, seed=1)), None)])
+        pending = asyncio.ensure_future(batch.__anext__())
+        await asyncio.sleep(0.05)
+        # El lote está esperando capacidad; cancelar su tarea no debe dejarlo colgado
+        for task in asyncio.all_tasks():
+            if task is not pending and task is not asyncio.current_task():
+                task.cancel()
+        index, result = await asyncio.wait_for(pending, 1.0)
+        assert (index, result) == (0, {"error": "El trabajo de resolución fue cancelado."})
+        await batch.aclose()
+        running.release()
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+import json
+import pytest
+from app.config import get_settings
+from app.models.schedule import ScheduleRequest
+from app.services.ai_service import AIService
+from app.utils.instances import generate_instance
+from app.utils.prompt_encoding import PROMPT_DATA_MARKER, can_encode, decode_request, encode_request
+
+
+def _worker_ids(input_data):
+    return [t["id"] for t in input_data["scheduleTrabajadores"]]
+
+
+def test_round_trip_keeps_workers():
+    input_data = generate_instance(6, seed=3)
+    decoded = decode_request(encode_request(input_data))
+    assert _worker_ids(decoded) == _worker_ids(input_data)
+    for original, worker in zip(input_data["scheduleTrabajadores"], decoded["scheduleTrabajadores"]):
+        assert worker["horarioGeneral"]["horasSemanales"] == original["horarioGeneral"]["horasSemanales"]
+
+
+@pytest.mark.parametrize("worker_id", ["A,B", "A|B", "A\nB", " A", ""])
+def test_delimiter_ids_are_not_encoded(worker_id):
+    input_data = generate_instance(3, seed=3)
+    input_data["scheduleTrabajadores"][1]["id"] = worker_id
+    assert not can_encode(input_data)
+    with pytest.raises(ValueError):
+        encode_request(input_data)
+
+
+def test_prompt_falls_back_to_json_for_delimiter_ids(monkeypatch):
+    monkeypatch.setenv("AI_BACKEND", "local")
+    monkeypatch.setenv("AI_PROMPT_FORMAT", "compact")
+    get_settings.cache_clear()
+    try:
+        service = AIService()
+    finally:
+        get_settings.cache_clear()
+    input_data = generate_instance(3, seed=3)
+    input_data["scheduleTrabajadores"][1]["id"] = "T|1,2"
+    prompt, prompt_format = service._create_prompt(ScheduleRequest(**input_data))
+    # El formato devuelto es el usado de verdad, con el que se etiqueta la métrica de tokens
+    assert prompt_format == "json"
+    encoded = json.loads(prompt.split(PROMPT_DATA_MARKER, 1)[1])
+    assert _worker_ids(encoded) == _worker_ids(input_data)